@@ -1,31 +1,56 @@
-from flask import Flask, render_template, request, jsonify, redirect, url_for, session
-from datetime import datetime, timedelta
+from flask import Flask, render_template, request, jsonify, redirect, url_for, session, g, has_request_context
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
 import os
 import json
-import smtplib
+import math
+import re
 from email.message import EmailMessage
 
 
 
 
 import psycopg
+from psycopg import IsolationLevel
 from psycopg.rows import dict_row
+from psycopg_pool import ConnectionPool
 from itsdangerous import URLSafeTimedSerializer
+from jinja2 import TemplateError
+from markupsafe import Markup
+from werkzeug.datastructures import MultiDict
 from werkzeug.utils import secure_filename
 
+from migrations import apply_migrations
+from outbox import (
+    CAMPAIGN_MAX_RATE,
+    CAMPAIGN_MERGE_FIELDS,
+    CAMPAIGN_MIN_RATE,
+    CAMPAIGN_RATE,
+    POLL_SECONDS as OUTBOX_POLL_SECONDS,
+    compile_campaign,
+    deliver_due as deliver_due_mail,
+    enqueue_email,
+    notify_workers,
+    render_campaign_email,
+    replace_queued_email,
+    smtp_pool,
+)
+from images import (
+    VARIANTS as IMAGE_VARIANTS,
+    InvalidImage,
+    ProcessedImage,
+    collect_garbage as collect_image_garbage,
+    fallback_format,
+    process_image,
+    set_opportunity_image,
+)
+
 import base64
+import hashlib
+from collections import OrderedDict
 
 import threading
-
-def run_async(func, *args):
-    def wrapper():
-        # Ensure Flask application context exists in background thread
-        with app.app_context():
-            func(*args)
-
-    thread = threading.Thread(target=wrapper)
-    thread.daemon = True
-    thread.start()
+import time
 
 
 # =====
@@ -37,6 +62,11 @@ app.secret_key = "supersecretkey"
 # Fix: Enable url_for(...) inside background threads
 app.config["SERVER_NAME"] = "kras-volunteer-app.onrender.com"
 
+# Where people reach the app, for absolute URLs in email. Never taken from
+# the request: a worker's requests may come from a health check, a preview
+# host or plain http behind the proxy.
+PUBLIC_BASE_URL = os.getenv("PUBLIC_BASE_URL", f"https://{app.config['SERVER_NAME']}").rstrip("/")
+
 
 # Required so admin session survives on Render
 app.config["SESSION_COOKIE_SAMESITE"] = "None"
@@ -66,14 +96,204 @@ def is_admin(email):
 DATABASE_URL = os.getenv("DATABASE_URL")
 
 
+# Connections each worker holds outside its pool: the cache invalidation
+# listener, whose LISTEN needs a session of its own for the worker's life.
+DB_CONNECTIONS_OUTSIDE_POOL = 1
+
+
+def _db_pool_max_size() -> int:
+    """
+    Pool size for this worker process.
+
+    DB_POOL_MAX_SIZE wins when set; the worker then uses up to that many
+    plus DB_CONNECTIONS_OUTSIDE_POOL. Otherwise the DB_MAX_CONNECTIONS budget
+    for the whole service is split evenly across the gunicorn workers
+    (WEB_CONCURRENCY), less each worker's connections outside the pool, so
+    adding workers never exceeds the database limit. A separate
+    `python outbox.py` worker needs one more connection of its own.
+    """
+    explicit = os.getenv("DB_POOL_MAX_SIZE")
+    if explicit:
+        return max(1, int(explicit))
+
+    budget = int(os.getenv("DB_MAX_CONNECTIONS", "20"))
+    workers = int(os.getenv("WEB_CONCURRENCY", "1"))
+    return max(1, budget // max(1, workers) - DB_CONNECTIONS_OUTSIDE_POOL)
+
+
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", "1"))
+DB_POOL_MAX_SIZE = max(DB_POOL_MIN_SIZE, _db_pool_max_size())
+DB_POOL_MAX_IDLE = float(os.getenv("DB_POOL_MAX_IDLE", "300"))          # seconds
+DB_POOL_MAX_LIFETIME = float(os.getenv("DB_POOL_MAX_LIFETIME", "1800"))  # seconds
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))              # seconds
+
+_db_pool = None
+_db_pool_pid = None
+_db_pool_lock = threading.Lock()
+
+
+def _reset_connection(conn) -> None:
+    """
+    Pool reset hook, run on every connection handed back in a usable state.
+    get_db() raises GET requests to REPEATABLE READ; put the default back.
+    If this raises, the pool discards the connection.
+    """
+    conn.isolation_level = None
+
+
+def get_db_pool() -> ConnectionPool:
+    """
+    Return the connection pool for the current process, creating it on first use.
+
+    The pool is tied to the pid that created it. Under gunicorn's pre-fork
+    model a worker never reuses sockets inherited from the master: the first
+    call in a new process builds a fresh pool.
+    """
+    global _db_pool, _db_pool_pid
+
+    pid = os.getpid()
+    if _db_pool is not None and _db_pool_pid == pid:
+        return _db_pool
+
+    with _db_pool_lock:
+        if _db_pool is None or _db_pool_pid != pid:
+            if not DATABASE_URL:
+                raise RuntimeError("DATABASE_URL environment variable is not set.")
+            _db_pool = ConnectionPool(
+                DATABASE_URL,
+                min_size=DB_POOL_MIN_SIZE,
+                max_size=DB_POOL_MAX_SIZE,
+                max_idle=DB_POOL_MAX_IDLE,
+                max_lifetime=DB_POOL_MAX_LIFETIME,
+                timeout=DB_POOL_TIMEOUT,
+                kwargs={"row_factory": dict_row},
+                # Health check: connections are validated before being handed out
+                check=ConnectionPool.check_connection,
+                reset=_reset_connection,
+                name=f"kras-{pid}",
+                open=True,
+            )
+            _db_pool_pid = pid
+    return _db_pool
+
+
+def close_db_pool() -> None:
+    """
+    Close the pool owned by this process, if any.
+
+    Called by the gunicorn hooks so the master releases its connections
+    before forking and workers close theirs on exit.
+    """
+    global _db_pool, _db_pool_pid
+
+    with _db_pool_lock:
+        if _db_pool is not None and _db_pool_pid == os.getpid():
+            _db_pool.close()
+        _db_pool = None
+        _db_pool_pid = None
+
+
 def get_db_connection():
     """
-    Open a new Postgres connection with rows returned as dicts.
+    Borrow a pooled Postgres connection with rows returned as dicts.
+
+    Use it as a context manager; the transaction is committed (or rolled
+    back on error) and the connection goes back to the pool on exit:
+
+        with get_db_connection() as conn:
+            ...
+
+    Request handlers should use get_db() instead so every query in the
+    request shares one connection and one transaction.
+    """
+    return get_db_pool().connection()
+
+
+def get_db():
+    """
+    Return the connection for the current request, checking one out of the
+    pool the first time it is needed.
+
+    The connection lives on flask.g for the rest of the request, so route
+    code and helpers such as user_is_champion_for_opportunity share it.
+    GET requests run in a REPEATABLE READ transaction so every query on the
+    page sees the same snapshot. commit_db / release_db below finish the
+    transaction and return the connection to the pool.
     """
-    if not DATABASE_URL:
-        raise RuntimeError("DATABASE_URL environment variable is not set.")
-    conn = psycopg.connect(DATABASE_URL, row_factory=dict_row)
-    return conn
+    if "db" not in g:
+        conn = get_db_pool().getconn()
+        if has_request_context() and request.method in ("GET", "HEAD"):
+            conn.isolation_level = IsolationLevel.REPEATABLE_READ
+            # Before the snapshot is taken, so cached() can tell which
+            # invalidations it might not see
+            g.cache_clock = cache.clock()
+        g.db = conn
+    return g.db
+
+
+@app.after_request
+def commit_db(response):
+    """
+    Commit the request transaction before the response goes out, or roll it
+    back when the handler returned an error response.
+    """
+    conn = g.get("db")
+    if conn is not None:
+        if response.status_code >= 400:
+            conn.rollback()
+            g.pop("after_commit", None)
+        else:
+            conn.commit()
+            run_after_commit()
+    return response
+
+
+@app.teardown_appcontext
+def release_db(exc):
+    """
+    Return the request connection to the pool.
+
+    Work done in app contexts without a request (background threads) is
+    committed here; an unhandled exception rolls everything back.
+    """
+    conn = g.pop("db", None)
+    if conn is None:
+        return
+
+    try:
+        if exc is None:
+            conn.commit()
+            run_after_commit()
+        else:
+            try:
+                conn.rollback()
+            except psycopg.Error:
+                # Typically the backend is gone; the pool discards it below
+                app.logger.warning("Rollback failed while releasing a connection", exc_info=True)
+    finally:
+        g.pop("after_commit", None)
+        # Never raises: broken connections are closed, and the isolation
+        # level is reset by _reset_connection once the pool has it back
+        get_db_pool().putconn(conn)
+
+
+def after_commit(callback) -> None:
+    """
+    Run callback once the current request's transaction has committed, e.g.
+    to drop a cache entry the request just made stale. Dropped on rollback.
+    Invalidating before the commit would let another request re-cache the
+    old rows in between.
+    """
+    g.setdefault("after_commit", []).append(callback)
+
+
+def run_after_commit() -> None:
+    callbacks = g.pop("after_commit", [])
+    for callback in callbacks:
+        try:
+            callback()
+        except Exception:
+            app.logger.exception("after_commit callback failed")
 
 
 def dictify_rows(rows):
@@ -93,7 +313,476 @@ def dictify_rows(rows):
     return result
 
 
+# =====
+# Column sets
+# =====
+# Listing and detail queries name their columns instead of SELECT *, so they
+# never drag along image blobs or the applications.search_vector tsvector.
+# Each map is API field name -> SQL expression; sparse ?fields= requests
+# pick from the same maps.
+
+OPPORTUNITY_FIELDS = {
+    "id": "id",
+    "title": "title",
+    "time": "time",
+    "duration": "duration",
+    "mode": "mode",
+    "description": "description",
+    "requirements": "requirements",
+    "location": "location",
+    "image": "image",
+    "image_hash": "image_hash",
+    # From the image store, so templates can pick the right fallback format
+    "image_mime": "(SELECT b.mime FROM image_blobs b WHERE b.hash = opportunities.image_hash)",
+    "tags": "tags",
+    "closed": "closed",
+    "closed_date": "closed_date",
+    "updated_at": "updated_at",
+}
+
+APPLICATION_FIELDS = {
+    "id": "id",
+    "first_name": "first_name",
+    "last_name": "last_name",
+    "email": "email",
+    "phone": "phone",
+    "contact": "contact",
+    "title": "title",
+    "status": "status",
+    "timestamp": "timestamp",
+    "opportunity_id": "opportunity_id",
+    "time": "time",
+    "duration": "duration",
+    "mode": "mode",
+    "location": "location",
+    "comments": "comments",
+    "is_champion": "is_champion",
+}
+
+
+def select_columns(field_map: dict, names) -> str:
+    """SQL select list for the given field names of a *_FIELDS map."""
+    parts = []
+    for name in names:
+        expr = field_map[name]
+        parts.append(name if expr == name else f"{expr} AS {name}")
+    return ", ".join(parts)
+
+
+def fields_from_args(args, allowed) -> list[str] | None:
+    """
+    Parse ?fields=a,b,c. Returns None when absent (meaning "everything").
+    Raises ValueError naming any field not in allowed.
+    """
+    raw = args.get("fields")
+    if raw is None:
+        return None
+    names = [f.strip() for f in raw.split(",") if f.strip()]
+    unknown = [f for f in names if f not in allowed]
+    if unknown:
+        raise ValueError("Unknown field(s): " + ", ".join(unknown))
+    return names
+
+
+# Open opportunity cards (index, manage) and opportunity_fragment's key
+# (id, updated_at). The cards show every text field; the legacy image path
+# and closed_date are only for closed cards.
+OPPORTUNITY_LIST_COLUMNS = select_columns(OPPORTUNITY_FIELDS, [
+    "id", "title", "time", "duration", "mode", "description", "requirements",
+    "location", "image_hash", "image_mime", "tags", "closed", "updated_at",
+])
+
+# Closed opportunity cards show the legacy image path, not the image store,
+# so they skip the image_blobs lookup for image_mime
+CLOSED_OPPORTUNITY_LIST_COLUMNS = select_columns(OPPORTUNITY_FIELDS, [
+    "id", "title", "time", "duration", "mode", "description", "requirements",
+    "location", "image", "tags", "closed", "closed_date", "updated_at",
+])
+
+# Detail APIs, the apply flow and its emails
+OPPORTUNITY_DETAIL_COLUMNS = select_columns(OPPORTUNITY_FIELDS, OPPORTUNITY_FIELDS)
+
+# Tables and search results
+APPLICATION_LIST_COLUMNS = select_columns(APPLICATION_FIELDS, [
+    "id", "first_name", "last_name", "email", "phone", "contact",
+    "title", "status", "timestamp", "opportunity_id",
+])
+
+# Review cards, applicant panels and the detail page
+APPLICATION_DETAIL_COLUMNS = select_columns(APPLICATION_FIELDS, APPLICATION_FIELDS)
+
+
+# =====
+# In-process caches
+# =====
+class VersionedCache:
+    """
+    Small thread-safe per-process cache with a TTL.
+
+    get_or_build(key, builder) returns the cached value, or calls builder()
+    to make it. Only one thread builds a given key at a time; others asking
+    for it meanwhile wait for that result (single-flight), so a burst of
+    requests after an invalidation costs one query, not one per request.
+
+    invalidate(key) drops the entry and bumps the key's version. A build
+    that started before the bump still returns its value to its own caller
+    but is not stored, so stale rows are never cached after a write.
+
+    Versions come from one clock shared by every key. A builder that reads
+    through a snapshot taken earlier than the build itself (a REPEATABLE
+    READ request transaction) passes as_of=clock() read before that
+    snapshot; if the key was invalidated since, the snapshot may predate
+    the write, so the value is returned but not stored.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._entries = {}      # key -> (value, version, expires_at)
+        self._versions = {}     # key -> clock at its last invalidation
+        self._clock = 0
+        self._building = set()
+        self._cond = threading.Condition()
+
+    def version(self, key) -> int:
+        with self._cond:
+            return self._versions.get(key, 0)
+
+    def clock(self) -> int:
+        with self._cond:
+            return self._clock
+
+    def get_or_build(self, key, builder, as_of: int | None = None):
+        with self._cond:
+            while True:
+                entry = self._entries.get(key)
+                if entry and entry[2] > time.monotonic():
+                    return entry[0]
+                if key not in self._building:
+                    break
+                # Someone else is building it; wait for them (bounded, in
+                # case that build is slow or fails)
+                self._cond.wait(timeout=5)
+            self._building.add(key)
+            version = self._versions.get(key, 0)
+
+        try:
+            value = builder()
+        except Exception:
+            with self._cond:
+                self._building.discard(key)
+                self._cond.notify_all()
+            raise
+
+        with self._cond:
+            self._building.discard(key)
+            current = self._versions.get(key, 0)
+            if current == version and (as_of is None or current <= as_of):
+                self._entries[key] = (value, version, time.monotonic() + self.ttl)
+            self._cond.notify_all()
+        return value
+
+    def invalidate(self, key) -> None:
+        with self._cond:
+            self._bump(key)
+
+    def invalidate_prefix(self, prefix: str) -> None:
+        with self._cond:
+            for key in self._known_keys():
+                if key.startswith(prefix):
+                    self._bump(key)
+
+    def clear(self) -> None:
+        with self._cond:
+            for key in self._known_keys():
+                self._bump(key)
+
+    def _known_keys(self) -> set:
+        return set(self._entries) | set(self._versions) | self._building
+
+    def _bump(self, key) -> None:
+        self._clock += 1
+        self._versions[key] = self._clock
+        self._entries.pop(key, None)
+
+
+class LRUCache:
+    """
+    Thread-safe least-recently-used cache of at most maxsize entries.
+
+    For values whose key already says which version they are (e.g. a row's
+    updated_at), so nothing needs invalidating: stale entries just stop
+    being asked for and age out.
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_build(self, key, builder):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+
+        # Built outside the lock; two threads may both build a missing key,
+        # which is harmless since they produce the same value
+        value = builder()
+
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return value
+
+
+OPEN_OPPORTUNITIES_KEY = "open_opportunities"
+CHAMPIONS_KEY = "champions"
+
+
+# Per-opportunity keys; pass "*" to name the keys of every opportunity
+def opportunity_champions_key(opp_id: int | str) -> str:
+    return f"opportunity_champions:{opp_id}"
+
+
+def champion_candidates_key(opp_id: int | str) -> str:
+    return f"champion_candidates:{opp_id}"
+
+
+cache = VersionedCache(ttl=float(os.getenv("CACHE_TTL_SECONDS", "60")))
+
+# Rendered opportunity cards and email blocks (see opportunity_fragment)
+fragment_cache = LRUCache(maxsize=int(os.getenv("FRAGMENT_CACHE_SIZE", "512")))
+
+
+# =====
+# Cross-worker cache invalidation (Postgres LISTEN/NOTIFY)
+# =====
+# Every gunicorn worker (on every node) has its own cache. Writes publish the
+# keys they made stale on this channel, and a listener thread in each worker
+# evicts them. A key ending in "*" evicts every key with that prefix.
+CACHE_CHANNEL = "kras_cache"
+CACHE_LISTENER_RETRY_SECONDS = float(os.getenv("CACHE_LISTENER_RETRY_SECONDS", "5"))
+
+_cache_listener_pid = None
+_cache_listener_lock = threading.Lock()
+
+
+def evict_cache_keys(keys) -> None:
+    for key in keys:
+        if key.endswith("*"):
+            cache.invalidate_prefix(key[:-1])
+        else:
+            cache.invalidate(key)
+
+
+def invalidate_cache(*keys: str) -> None:
+    """
+    Evict keys from the caches of all workers once this request commits.
+
+    NOTIFY is transactional: Postgres only delivers it if the request's
+    transaction commits, so a rolled-back write evicts nothing. This worker
+    also evicts locally after the commit rather than waiting for its
+    listener, so the writer's next page is fresh.
+    """
+    conn = get_db()
+    with conn.cursor() as cur:
+        for key in keys:
+            cur.execute("SELECT pg_notify(%s, %s)", (CACHE_CHANNEL, key))
+    after_commit(lambda: evict_cache_keys(keys))
+
+
+def _listen_for_invalidations() -> None:
+    while True:
+        try:
+            # Not from the pool: counted in DB_CONNECTIONS_OUTSIDE_POOL
+            with psycopg.connect(DATABASE_URL, autocommit=True) as conn:
+                conn.execute(f"LISTEN {CACHE_CHANNEL}")
+                # Anything published while we were not listening is lost
+                cache.clear()
+                for notify in conn.notifies():
+                    evict_cache_keys([notify.payload])
+        except Exception:
+            app.logger.warning("Cache listener lost its connection; retrying", exc_info=True)
+
+        # Until we are listening again nothing cached can be trusted
+        cache.clear()
+        time.sleep(CACHE_LISTENER_RETRY_SECONDS)
+
+
+def ensure_cache_listener() -> None:
+    """
+    Start this process's invalidation listener if it is not running yet.
+
+    Tied to the pid like the connection pool: threads do not survive
+    gunicorn's fork, so each worker starts its own on first cache use.
+    """
+    global _cache_listener_pid
+
+    pid = os.getpid()
+    if _cache_listener_pid == pid or not DATABASE_URL:
+        return
+
+    with _cache_listener_lock:
+        if _cache_listener_pid == pid:
+            return
+        threading.Thread(
+            target=_listen_for_invalidations,
+            name=f"kras-cache-listener-{pid}",
+            daemon=True,
+        ).start()
+        _cache_listener_pid = pid
+
+
+def cached(key: str, builder):
+    """
+    cache.get_or_build() with this worker's invalidation listener running.
+
+    builder may query through get_db(). In a GET request that transaction's
+    snapshot can be older than the build, so the cache clock read before
+    its first query (see get_db) decides whether the result may be stored.
+    """
+    ensure_cache_listener()
+    as_of = g.get("cache_clock") if has_request_context() else None
+    return cache.get_or_build(key, builder, as_of=as_of)
+
+
+# =====
+# Conditional GET (ETag / Last-Modified)
+# =====
+def _release_id() -> str:
+    """
+    Identifies the deployed code, so rendered pages get new ETags when the
+    templates change. APP_RELEASE wins; otherwise a hash of app.py and the
+    templates, which is the same in every worker and node of one deploy.
+    """
+    release = os.getenv("APP_RELEASE")
+    if release:
+        return release
+
+    digest = hashlib.sha1()
+    root = os.path.dirname(os.path.abspath(__file__))
+    paths = [os.path.join(root, "app.py")]
+    for folder, _, files in os.walk(os.path.join(root, "templates")):
+        paths.extend(os.path.join(folder, name) for name in files)
+    for path in sorted(paths):
+        with open(path, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:12]
+
+
+APP_RELEASE = _release_id()
+
+# Responses may be stored by the browser but must be revalidated each time;
+# private because most of them depend on the session.
+CONDITIONAL_CACHE_CONTROL = "private, no-cache"
+
+
+def weak_etag(*parts) -> str:
+    """Opaque validator built from whatever the response depends on."""
+    raw = "|".join(str(p) for p in (APP_RELEASE, *parts))
+    return hashlib.sha1(raw.encode()).hexdigest()[:24]
+
+
+def http_date_ceiling(value: datetime) -> datetime:
+    """
+    value rounded up to a whole second, the resolution of Last-Modified, so
+    the header is never earlier than the change it describes.
+    """
+    if value.microsecond:
+        value = value.replace(microsecond=0) + timedelta(seconds=1)
+    return value
+
+
+def with_validators(response, etag: str | None, last_modified: datetime | None = None):
+    if etag is not None:
+        response.set_etag(etag, weak=True)
+    if last_modified is not None:
+        response.last_modified = http_date_ceiling(last_modified)
+    response.headers["Cache-Control"] = CONDITIONAL_CACHE_CONTROL
+    return response
+
+
+def not_modified(etag: str | None, last_modified: datetime | None = None):
+    """
+    A 304 response if the client's copy is still current, otherwise None.
+
+    If-None-Match takes precedence over If-Modified-Since (RFC 9110).
+    Last-Modified only has whole-second resolution, so two edits within one
+    second look the same to it; when there is an ETag, If-Modified-Since on
+    its own is not trusted and the full response is sent.
+    """
+    if request.if_none_match:
+        fresh = etag is not None and request.if_none_match.contains_weak(etag)
+    elif etag is None and last_modified is not None and request.if_modified_since is not None:
+        fresh = http_date_ceiling(last_modified) <= request.if_modified_since
+    else:
+        fresh = False
+
+    if not fresh:
+        return None
+    return with_validators(app.response_class(status=304), etag, last_modified)
+
+
+def normalize_opportunity(opp: dict) -> dict:
+    """
+    Add the fields templates expect to an opportunity row, in place:
+    tags parsed from their JSON string, desc (= description) and
+    frequency (= mode).
+    """
+    tags_raw = opp.get("tags")
+    if isinstance(tags_raw, str):
+        try:
+            tags = json.loads(tags_raw) if tags_raw.strip() else []
+        except json.JSONDecodeError:
+            tags = []
+        opp["tags"] = tags if isinstance(tags, list) else []
+    elif tags_raw is None:
+        opp["tags"] = []
+
+    if "description" in opp and "desc" not in opp:
+        opp["desc"] = opp["description"]
+
+    opp["frequency"] = opp.get("mode", "")
+    return opp
+
+
+def open_opportunities() -> list[dict]:
+    """
+    Normalized open opportunities ordered by id, from the per-process cache.
+    Shared between requests, so callers must not modify the result.
+    """
+    def build():
+        conn = get_db()
+        with conn.cursor() as cur:
+            cur.execute(
+                f"SELECT {OPPORTUNITY_LIST_COLUMNS} FROM opportunities "
+                "WHERE closed IS FALSE OR closed IS NULL ORDER BY id"
+            )
+            return [normalize_opportunity(dict(r)) for r in cur.fetchall()]
+
+    return cached(OPEN_OPPORTUNITIES_KEY, build)
+
 
+@app.template_global()
+def opportunity_fragment(template_name: str, opp: dict) -> Markup:
+    """
+    Render a partial for one opportunity (a page card, an email detail
+    block), reusing earlier renders.
+
+    The partial may only depend on the opportunity row: the key is the
+    template, the opportunity id and its updated_at, which the database
+    moves on every change, so an edit renders a fresh fragment on its own.
+    Callers render per-user parts around the fragment themselves. Rows
+    without an id or updated_at are rendered every time.
+    """
+    key = (template_name, opp.get("id"), opp.get("updated_at"))
+    if key[1] is None or key[2] is None:
+        return Markup(render_template(template_name, opp=opp))
+    return fragment_cache.get_or_build(
+        key, lambda: Markup(render_template(template_name, opp=opp))
+    )
 
 
 def current_user_email() -> str | None:
@@ -114,21 +803,43 @@ def user_is_champion_for_opportunity(opportunity_id: int) -> bool:
     if not email:
         return False
 
-    with get_db_connection() as conn:
-        with conn.cursor() as cur:
-            cur.execute(
-                """
-                SELECT 1
-                FROM champions_opportunities co
-                JOIN applications a ON co.champion_id = a.id
-                WHERE co.opportunity_id = %s
-                  AND LOWER(a.email) = %s
-                LIMIT 1
-                """,
-                (opportunity_id, email),
-            )
-            row = cur.fetchone()
-            return row is not None
+    conn = get_db()
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            SELECT 1
+            FROM champions_opportunities co
+            JOIN applications a ON co.champion_id = a.id
+            WHERE co.opportunity_id = %s
+              AND LOWER(a.email) = %s
+            LIMIT 1
+            """,
+            (opportunity_id, email),
+        )
+        row = cur.fetchone()
+        return row is not None
+
+
+def champion_opportunity_ids() -> list[int]:
+    """
+    Return the ids of every opportunity the logged in user is a champion for.
+    """
+    email = current_user_email()
+    if not email:
+        return []
+
+    conn = get_db()
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            SELECT DISTINCT co.opportunity_id
+            FROM champions_opportunities co
+            JOIN applications a ON co.champion_id = a.id
+            WHERE LOWER(a.email) = %s
+            """,
+            (email,),
+        )
+        return [r["opportunity_id"] for r in cur.fetchall()]
 
 
 def user_can_manage_opportunity(opportunity_id: int) -> bool:
@@ -143,25 +854,20 @@ def user_can_manage_opportunity(opportunity_id: int) -> bool:
 
 def get_opportunity_id_for_application(app_id: int) -> int | None:
     """
-    Given an application id, find the related opportunity id by matching title.
-    Returns None if no matching opportunity is found.
+    Given an application id, return the opportunity id it was submitted for.
+    Returns None if the application does not exist or has no opportunity.
     """
-    with get_db_connection() as conn:
-        with conn.cursor() as cur:
-            cur.execute(
-                """
-                SELECT o.id
-                FROM applications a
-                LEFT JOIN opportunities o ON o.title = a.title
-                WHERE a.id = %s
-                """,
-                (app_id,),
-            )
-            row = cur.fetchone()
-            if not row:
-                return None
-            opp_id = row["id"]
-            return opp_id
+    conn = get_db()
+    with conn.cursor() as cur:
+        cur.execute(
+            "SELECT opportunity_id FROM applications WHERE id = %s",
+            (app_id,),
+        )
+        row = cur.fetchone()
+        if not row:
+            return None
+        opp_id = row["opportunity_id"]
+        return opp_id
 
 
 def require_admin():
@@ -174,6 +880,34 @@ def require_admin():
     return None
 
 
+# =====
+# Schema migrations
+# =====
+def run_startup_migrations():
+    """
+    Bring the schema up to date before anything else touches the database,
+    when MIGRATE_ON_IMPORT=1 (the Flask dev server, tests).
+
+    Off by default: under gunicorn the master migrates in on_starting
+    (gunicorn.conf.py) before forking, because a worker that migrates while
+    importing the app is killed by the worker timeout on a long migration.
+    """
+    if not DATABASE_URL or os.getenv("MIGRATE_ON_IMPORT", "0") != "1":
+        return
+
+    try:
+        applied = apply_migrations(DATABASE_URL)
+    except Exception:
+        app.logger.exception("Schema migration failed")
+        return
+
+    if applied:
+        app.logger.info("Applied schema migrations: %s", applied)
+
+
+run_startup_migrations()
+
+
 # =====
 # Seed default opportunities IF the table is empty
 # =====
@@ -183,13 +917,11 @@ def seed_opportunities():
     contains zero rows. This is safe for Postgres and will not run
     on every request because it is called once on import.
     """
-    try:
-        conn = get_db_connection()
-    except RuntimeError:
+    if not DATABASE_URL:
         # In case DATABASE_URL is not set during local tooling
         return
 
-    with conn:
+    with get_db_connection() as conn:
         with conn.cursor() as cur:
             cur.execute("SELECT COUNT(*) AS cnt FROM opportunities")
             row = cur.fetchone()
@@ -308,277 +1040,658 @@ def allowed_file(filename: str) -> bool:
     return ext in ALLOWED_EXTENSIONS
 
 
-# =====
-# Email + token helpers
-# =====
-def generate_activation_token(email: str) -> str:
-    return serializer.dumps(email, salt="email-activate")
-
-
-def confirm_activation_token(token: str, max_age: int = 3600) -> str | None:
-    try:
-        email = serializer.loads(token, salt="email-activate", max_age=max_age)
-    except Exception:
+def read_image_upload(file) -> ProcessedImage | None:
+    """
+    Run an uploaded file through the image pipeline (see images.py).
+    Returns None when nothing was uploaded; raises InvalidImage when the
+    file is not a usable image.
+    """
+    if not file or not file.filename:
         return None
-    return email
-
-
-def send_activation_email(recipient_email: str) -> None:
-    token = generate_activation_token(recipient_email)
-    activation_link = url_for("activate_email", token=token, _external=True)
+    if not allowed_file(file.filename):
+        raise InvalidImage(f"Unsupported file type: {file.filename}")
+    return process_image(file.read())
 
-    subject = "KRAS Kickers volunteer email verification"
 
-    text_body = f"""Thank you for your interest in volunteering with KRAS Kickers.
+# =====
+# Date and time helpers
+# =====
+# Timestamps are stored as timestamptz; this is only the zone used for display
+# and for interpreting date-only filters such as ?from=2025-11-01.
+APP_TIMEZONE = ZoneInfo(os.getenv("APP_TIMEZONE", "UTC"))
 
-To continue with your volunteer application, confirm your email by clicking this link:
 
-{activation_link}
+@app.template_filter("datetimeformat")
+def format_timestamp(value, fmt: str = "%Y-%m-%d %H:%M") -> str:
+    """
+    Render a stored timestamp in the app time zone.
+    Anything that is not a datetime is passed through as text.
+    """
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value.astimezone(APP_TIMEZONE).strftime(fmt)
+    return str(value)
 
-If you did not request this, you can ignore this message.
-"""
 
-    html_body = f"""
-    <html>
-      <body>
-        <p>Thank you for your interest in volunteering with KRAS Kickers.</p>
-        <p>To continue with your volunteer application, confirm your email by clicking the link below:</p>
-        <p><a href="{activation_link}" target="_self">Click here to verify your email</a></p>
-        <p>If you did not request this, you can ignore this message.</p>
-      </body>
-    </html>
+def date_range_from_args(args) -> tuple[datetime | None, datetime | None]:
     """
+    Read an optional time window from the query string.
 
-    msg = EmailMessage()
-    msg["Subject"] = subject
-    msg["From"] = os.environ.get("SMTP_FROM", "no-reply@kraskickers.org")
-    msg["To"] = recipient_email
+    ?days=7 means the last seven days. ?from=YYYY-MM-DD and/or
+    ?to=YYYY-MM-DD give an inclusive calendar-date range in APP_TIMEZONE.
+    Returns (start, end) where end is exclusive; either may be None.
+    Values that do not parse are ignored.
+    """
+    start = None
+    end = None
 
-    msg.set_content(text_body)
-    msg.add_alternative(html_body, subtype="html")
+    days = args.get("days", type=int)
+    if days is not None and days > 0:
+        start = datetime.now(timezone.utc) - timedelta(days=days)
 
-    smtp_host = os.environ.get("SMTP_HOST", "localhost")
-    smtp_port = int(os.environ.get("SMTP_PORT", "25"))
-    smtp_user = os.environ.get("SMTP_USER")
-    smtp_password = os.environ.get("SMTP_PASSWORD")
+    date_from = (args.get("from") or "").strip()
+    if date_from:
+        try:
+            start = datetime.strptime(date_from, "%Y-%m-%d").replace(tzinfo=APP_TIMEZONE)
+        except ValueError:
+            pass
 
-    with smtplib.SMTP(smtp_host, smtp_port) as server:
-        if smtp_user and smtp_password:
-            server.starttls()
-            server.login(smtp_user, smtp_password)
-        server.send_message(msg)
+    date_to = (args.get("to") or "").strip()
+    if date_to:
+        try:
+            end = datetime.strptime(date_to, "%Y-%m-%d").replace(tzinfo=APP_TIMEZONE) + timedelta(days=1)
+        except ValueError:
+            pass
 
+    return start, end
 
-def send_admin_activation_email(recipient_email: str) -> None:
-    token = generate_activation_token(recipient_email)
-    activation_link = url_for("admin_activate", token=token, _external=True)
 
-    subject = "KRAS Kickers Admin Access Verification"
-    body = f"""An admin access request was received for this KRAS Kickers email.
+def date_range_clause(column: str, start: datetime | None, end: datetime | None) -> tuple[str, list]:
+    """
+    Build an index-friendly SQL condition for a half-open time range on column.
+    Returns ("", []) when there is no range, otherwise " AND ..." plus params.
+    """
+    clause = ""
+    params = []
+    if start is not None:
+        clause += f" AND {column} >= %s"
+        params.append(start)
+    if end is not None:
+        clause += f" AND {column} < %s"
+        params.append(end)
+    return clause, params
 
-To continue to the admin dashboard, confirm your email by clicking this link:
 
-{activation_link}
+# =====
+# Keyset pagination cursors
+# =====
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
 
-If you did not request this, you can ignore this message.
-"""
 
-    msg = EmailMessage()
-    msg["Subject"] = subject
-    msg["From"] = os.environ.get("SMTP_FROM", "no-reply@kraskickers.org")
-    msg["To"] = recipient_email
-    msg.set_content(body)
+def page_size_from_args(args, default: int = DEFAULT_PAGE_SIZE) -> int:
+    """Read ?limit= and clamp it to 1..MAX_PAGE_SIZE."""
+    limit = args.get("limit", type=int) or default
+    return max(1, min(limit, MAX_PAGE_SIZE))
 
-    smtp_host = os.environ.get("SMTP_HOST", "localhost")
-    smtp_port = int(os.environ.get("SMTP_PORT", "25"))
-    smtp_user = os.environ.get("SMTP_USER")
-    smtp_password = os.environ.get("SMTP_PASSWORD")
 
-    with smtplib.SMTP(smtp_host, smtp_port) as server:
-        if smtp_user and smtp_password:
-            server.starttls()
-            server.login(smtp_user, smtp_password)
-        server.send_message(msg)
+def encode_cursor(values) -> str:
+    """
+    Encode the sort key of the last row on a page as an opaque URL-safe token.
+    Datetimes are stored as ISO strings.
+    """
+    plain = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    raw = json.dumps(plain, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
 
-# - Send Volunteer email confirmation
 
-def send_volunteer_confirmation_email(app_data, opportunity):
+def decode_cursor(token: str | None) -> list | None:
     """
-    Sends a confirmation email to the volunteer after they submit an application.
+    Decode a token from encode_cursor. Returns None for a missing or
+    malformed token, which callers treat as "first page".
     """
-    recipient = app_data["email"]
-    subject = f"Thank you for applying to: {app_data['title']}"
+    if not token:
+        return None
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, TypeError):
+        return None
+    return values if isinstance(values, list) else None
 
-    logo_url = url_for("static", filename="kras_logo.png", _external=True)
 
-    html_body = f"""
-    <html>
-    <body style="font-family: Arial, sans-serif; color:#333;">
+def decode_keyset_cursor(token: str | None, time_value: bool = True) -> tuple | None:
+    """
+    Decode a (sort value, id) cursor, or None if it is missing or invalid.
+    With time_value the sort value is parsed back into a datetime.
+    """
+    values = decode_cursor(token)
+    if not values or len(values) != 2:
+        return None
+    try:
+        value = datetime.fromisoformat(values[0]) if time_value else values[0]
+        return value, int(values[1])
+    except (TypeError, ValueError):
+        return None
 
-        <!-- Logo aligned left -->
-        <div style="text-align:left; margin-bottom:20px;">
-        <img src="{logo_url}" alt="KRAS Kickers" style="height:65px;">
-        </div>
 
-        <!-- Title -->
-        <h2 style="color:#2563eb;">
-        Thank you for applying to volunteer for: {opportunity.get("title", app_data["title"])}
-        </h2>
+def decode_time_cursor(token: str | None) -> tuple[datetime, int] | None:
+    """Decode a (timestamp, id) cursor, or None if it is missing or invalid."""
+    return decode_keyset_cursor(token)
 
-        <p>Dear {app_data['first_name']} {app_data['last_name']},</p>
 
-        <p>
-        We have received your volunteer application for the opportunity listed below.
-        A KRAS Kickers coordinator or champion will contact you within 
-        <strong>48 hours</strong>.
-        </p>
+def fetch_keyset_page(cur, sql: str, params: list, cursor: str | None, limit: int,
+                      sort_column: str = "timestamp", id_column: str = "id",
+                      sort_key: str | None = None, descending: bool = True,
+                      time_sort: bool = True) -> tuple[list, str | None]:
+    """
+    Run one page of a listing query ordered by (sort_column, id_column).
+
+    ``sql`` must end inside a WHERE clause; the keyset condition, ORDER BY and
+    LIMIT are appended here. One extra row is fetched to know whether another
+    page exists. ``sort_key`` names the result column holding the sort value
+    when ``sort_column`` is an expression rather than a plain column, and
+    ``time_sort`` says whether that value is a timestamp.
+
+    Returns (rows, next_cursor); next_cursor is None on the last page.
+    """
+    params = list(params)
+    direction, op = ("DESC", "<") if descending else ("ASC", ">")
 
-        <!-- Opportunity Details Box -->
-        <div style="border:1px solid #ddd; padding:15px; border-radius:8px; margin-top:20px;">
+    after = decode_keyset_cursor(cursor, time_value=time_sort)
+    if after:
+        sql += f" AND ({sort_column}, {id_column}) {op} (%s, %s)"
+        params.extend(after)
 
-        <!-- Opportunity Image -->
-     
+    sql += f" ORDER BY {sort_column} {direction}, {id_column} {direction} LIMIT %s"
+    params.append(limit + 1)
 
-        <h3 style="margin:0; color:#111;">{opportunity.get("title", app_data["title"])}</h3>
+    cur.execute(sql, params)
+    rows = cur.fetchall()
 
-        <p><strong>Time Commitment:</strong> {opportunity.get("time","")}</p>
-        <p><strong>Duration:</strong> {opportunity.get("duration","")}</p>
-        <p><strong>Frequency:</strong> {opportunity.get("mode","")}</p>
-        <p><strong>Location:</strong> {opportunity.get("location","")}</p>
-        <p><strong>Requirements:</strong> {opportunity.get("requirements","")}</p>
-        <p><strong>Description:</strong> {opportunity.get("description","")}</p>
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor([last[sort_key or sort_column], last[id_column]])
 
-        </div>
+    return rows, next_cursor
+
+
+def next_page_url(next_cursor: str | None) -> str | None:
+    """URL of the current page with ?cursor= advanced, keeping other filters."""
+    if not next_cursor:
+        return None
+    args = request.args.to_dict()
+    args["cursor"] = next_cursor
+    return url_for(request.endpoint, **(request.view_args or {}), **args)
 
-        <p style="margin-top:25px;">
-        Warm regards,<br>
-        KRAS Kickers Volunteer Team
-        </p>
 
-    </body>
-    </html>
+# =====
+# Application events (history and notes)
+# =====
+EVENT_KINDS = {"event", "note"}
+
+
+def record_application_event(cur, app_id: int, kind: str, body: str, actor: str | None = None) -> None:
+    """Append one history or note entry for an application."""
+    cur.execute(
+        """
+        INSERT INTO application_events (application_id, kind, body, actor)
+        VALUES (%s, %s, %s, %s)
+        """,
+        (app_id, kind, body, actor),
+    )
+
+
+def serialize_event(row: dict) -> dict:
+    return {
+        "id": row["id"],
+        "kind": row["kind"],
+        "body": row["body"],
+        "actor": row.get("actor"),
+        "timestamp": format_timestamp(row["created_at"]),
+    }
+
+
+def load_application_events(cur, app_id: int, kind: str | None = None,
+                            cursor: str | None = None, limit: int = DEFAULT_PAGE_SIZE) -> tuple[list, str | None]:
+    """
+    Return one page of events for an application, newest first, and the
+    cursor for the next (older) page, or None when there are no more.
     """
+    sql = """
+        SELECT id, kind, body, actor, created_at
+        FROM application_events
+        WHERE application_id = %s
+    """
+    params = [app_id]
+
+    if kind:
+        sql += " AND kind = %s"
+        params.append(kind)
+
+    rows, next_cursor = fetch_keyset_page(cur, sql, params, cursor, limit, sort_column="created_at")
+    return [serialize_event(r) for r in rows], next_cursor
+
+
+# =====
+# Email + token helpers
+# =====
+def generate_activation_token(email: str) -> str:
+    return serializer.dumps(email, salt="email-activate")
+
+
+def confirm_activation_token(token: str, max_age: int = 3600) -> str | None:
+    try:
+        email = serializer.loads(token, salt="email-activate", max_age=max_age)
+    except Exception:
+        return None
+    return email
+
+
+# Every email has a text and an HTML body: templates/email/<name>.txt and
+# .html. The HTML ones are autoescaped, so applicant input is safe in them.
+EMAIL_TEMPLATES = (
+    "activation",
+    "admin_activation",
+    "volunteer_confirmation",
+    "champion_notification",
+    "champion_digest",
+)
+
+
+def precompile_email_templates() -> None:
+    """
+    Compile the email templates once at startup. Jinja keeps compiled
+    templates in app.jinja_env's cache, so sends only render.
+    """
+    for name in EMAIL_TEMPLATES:
+        for ext in ("txt", "html"):
+            app.jinja_env.get_template(f"email/{name}.{ext}")
+    for ext in ("txt", "html"):
+        app.jinja_env.get_template(f"email/_opportunity_details.{ext}")
+
+
+precompile_email_templates()
+
+
+def public_url(endpoint: str, **values) -> str:
+    """Absolute URL of endpoint under PUBLIC_BASE_URL, for use in email."""
+    return PUBLIC_BASE_URL + url_for(endpoint, _external=False, **values)
+
+
+def email_logo_url() -> str:
+    return public_url("static", filename="kras_logo.png")
 
 
+@app.template_global()
+def opportunity_email_image_url(opp) -> str | None:
+    """Absolute URL of the email-sized image variant, or None."""
+    if not opp or not opp.get("id") or not opp.get("image_hash"):
+        return None
+    # Email clients do not reliably support WebP
+    return PUBLIC_BASE_URL + opportunity_variant_url(
+        opp, "email", IMAGE_VARIANTS["email"][0][0],
+        fallback_format(opp.get("image_mime")), _external=False,
+    )
+
+
+def build_email(recipient: str, subject: str, template: str, **context) -> EmailMessage:
+    """
+    A message with both alternatives of templates/email/<template>,
+    rendered from the same context.
+    """
+    context.setdefault("logo_url", email_logo_url())
+    text_body = render_template(f"email/{template}.txt", **context)
+    html_body = render_template(f"email/{template}.html", **context)
+
     msg = EmailMessage()
     msg["Subject"] = subject
     msg["From"] = os.environ.get("SMTP_FROM", "no-reply@kraskickers.org")
     msg["To"] = recipient
+    msg.set_content(text_body)
     msg.add_alternative(html_body, subtype="html")
+    return msg
+
+
+# How long after a verification email is queued before another may be;
+# well inside the hour the activation token is valid for.
+ACTIVATION_RESEND_SECONDS = int(os.getenv("ACTIVATION_RESEND_SECONDS", "600"))
+
+
+def claim_email_slot(conn, kind: str, recipient: str, window_seconds: int) -> bool:
+    """
+    Record that kind mail is being queued for recipient, unless some was in
+    the last window_seconds. Returns whether the caller should queue it.
+    Part of the caller's transaction, so a rollback frees the slot again.
+    """
+    try:
+        with conn.transaction():
+            with conn.cursor() as cur:
+                cur.execute(
+                    """
+                    INSERT INTO email_dedupe (kind, recipient)
+                    VALUES (%s, %s)
+                    ON CONFLICT (kind, recipient) DO UPDATE
+                    SET queued_at = now()
+                    WHERE email_dedupe.queued_at <= now() - make_interval(secs => %s)
+                    RETURNING queued_at
+                    """,
+                    (kind, recipient, window_seconds),
+                )
+                return cur.fetchone() is not None
+    except psycopg.errors.SerializationFailure:
+        # REPEATABLE READ (GET requests): a concurrent request just claimed it
+        return False
+
+
+def queue_activation_email(recipient_email: str, admin: bool = False) -> bool:
+    """
+    Queue a verification link for recipient_email in the request
+    transaction. Returns False, queueing nothing, if one was queued within
+    ACTIVATION_RESEND_SECONDS.
+    """
+    kind = "admin_activation" if admin else "activation"
+    conn = get_db()
+    if not claim_email_slot(conn, kind, recipient_email, ACTIVATION_RESEND_SECONDS):
+        return False
+
+    token = generate_activation_token(recipient_email)
+    if admin:
+        activation_link = url_for("admin_activate", token=token, _external=True)
+        subject = "KRAS Kickers Admin Access Verification"
+    else:
+        activation_link = url_for("activate_email", token=token, _external=True)
+        subject = "KRAS Kickers volunteer email verification"
+
+    msg = build_email(recipient_email, subject, kind, activation_link=activation_link)
+    with conn.cursor() as cur:
+        enqueue_email(cur, kind, msg)
+    after_commit(wake_outbox)
+    return True
 
-    smtp_host = os.environ.get("SMTP_HOST", "localhost")
-    smtp_port = int(os.environ.get("SMTP_PORT", "25"))
-    smtp_user = os.environ.get("SMTP_USER")
-    smtp_password = os.environ.get("SMTP_PASSWORD")
 
-    with smtplib.SMTP(smtp_host, smtp_port) as server:
-        if smtp_user and smtp_password:
-            server.starttls()
-            server.login(smtp_user, smtp_password)
-        server.send_message(msg)
+def activation_message(queued: bool) -> str:
+    if queued:
+        return "We just sent a verification email. Please click the link in that email so you can submit your application."
+    return "We sent you a verification email a few minutes ago. Please click the link in that email so you can submit your application."
+
+# - Volunteer email confirmation
+
+def build_volunteer_confirmation_email(app_data, opportunity) -> EmailMessage:
+    """
+    Confirmation email to the volunteer after they submit an application.
+    """
+    opportunity = {**opportunity, "title": opportunity.get("title") or app_data["title"]}
+    return build_email(
+        app_data["email"],
+        f"Thank you for applying to: {app_data['title']}",
+        "volunteer_confirmation",
+        applicant=app_data,
+        opportunity=opportunity,
+    )
 
 # champion notification email
-def send_champion_notification_email(app_data, champion, opportunity):
+def build_champion_notification_email(app_data, champion, opportunity) -> EmailMessage:
     """
-    Alerts a champion that a new volunteer has applied.
+    Alert to a champion that a new volunteer has applied.
     """
-    recipient = champion["email"]
-    subject = f"New Volunteer Application for {opportunity['title']}"
+    return build_email(
+        champion["email"],
+        f"New Volunteer Application for {opportunity['title']}",
+        "champion_notification",
+        applicant=app_data,
+        opportunity=opportunity,
+    )
+
 
-    logo_url = url_for("static", filename="kras_logo.png", _external=True)
+# champion_notification_prefs.digest -> how long a digest collects
+# applications before it is sent (None: one email per application)
+CHAMPION_DIGEST_WINDOWS = {
+    "immediate": None,
+    "15min": timedelta(minutes=15),
+    "hourly": timedelta(hours=1),
+    "daily": timedelta(days=1),
+}
+
+
+def build_champion_digest_email(champion_email: str, items: list[dict]) -> EmailMessage:
+    if len(items) == 1:
+        subject = f"New Volunteer Application for {items[0]['title']}"
+    else:
+        subject = f"{len(items)} New Volunteer Applications"
+    return build_email(champion_email, subject, "champion_digest", items=items)
 
-    html_body = f"""
-    <html>
-      <body style="font-family: Arial, sans-serif; color:#333;">
-        <div style="text-align:center; margin-bottom:20px;">
-          <img src="{logo_url}" alt="KRAS Kickers" style="height:65px;">
-        </div>
 
-        <h2 style="color:#2563eb;">A new volunteer has applied</h2>
+def add_champion_digest_item(cur, digest_id: int, app_id: int, opportunity: dict) -> None:
+    cur.execute(
+        """
+        INSERT INTO champion_digest_items (digest_id, application_id, opportunity_id)
+        VALUES (%s, %s, %s)
+        """,
+        (digest_id, app_id, opportunity.get("id")),
+    )
 
-        <p>The following volunteer submitted an application for:</p>
-        <p style="font-size:1.1rem; font-weight:bold;">{opportunity['title']}</p>
 
-        <p><strong>Name:</strong> {app_data['first_name']} {app_data['last_name']}<br>
-        <strong>Email:</strong> {app_data['email']}<br>
-        <strong>Phone:</strong> {app_data['phone']}</p>
+def load_champion_digest_items(cur, digest_id: int) -> list[dict]:
+    cur.execute(
+        """
+        SELECT COALESCE(o.title, a.title) AS title,
+               a.first_name, a.last_name, a.email, a.phone,
+               i.created_at
+        FROM champion_digest_items i
+        JOIN applications a ON a.id = i.application_id
+        LEFT JOIN opportunities o ON o.id = i.opportunity_id
+        WHERE i.digest_id = %s
+        ORDER BY i.id
+        """,
+        (digest_id,),
+    )
+    return cur.fetchall()
 
-        <p>Please reach out to this volunteer within <strong>48 hours</strong>.</p>
 
-        <p style="margin-top:25px;">Thank you for serving as a Champion!<br>KRAS Kickers Team</p>
-      </body>
-    </html>
+def queue_champion_notification(cur, champion: dict, app_id: int, app_data: dict,
+                                opportunity: dict) -> None:
     """
+    Tell a champion about a new application: as its own email, or as part of
+    their open digest when their preference (champion["digest"]) is a window.
 
-    msg = EmailMessage()
-    msg["Subject"] = subject
-    msg["From"] = os.environ.get("SMTP_FROM", "no-reply@kraskickers.org")
-    msg["To"] = recipient
-    msg.add_alternative(html_body, subtype="html")
+    A digest is one pending outbox message due at the end of its window.
+    The first application opens it; later ones add an item and re-render it.
+    Once a worker has claimed it, or its window has passed, the next
+    application opens a new one.
+    """
+    window = CHAMPION_DIGEST_WINDOWS.get(champion.get("digest") or "immediate")
+    if window is None:
+        enqueue_email(
+            cur,
+            "champion_notification",
+            build_champion_notification_email(app_data, champion, opportunity),
+        )
+        return
 
-    smtp_host = os.environ.get("SMTP_HOST", "localhost")
-    smtp_port = int(os.environ.get("SMTP_PORT", "25"))
-    smtp_user = os.environ.get("SMTP_USER")
-    smtp_password = os.environ.get("SMTP_PASSWORD")
+    champion_email = champion["email"].strip().lower()
+
+    # One writer per champion at a time, so simultaneous applications do not
+    # each open a digest
+    cur.execute("SELECT pg_advisory_xact_lock(hashtext(%s))", (champion_email,))
+
+    # Locking the outbox row keeps workers (FOR UPDATE SKIP LOCKED) from
+    # claiming it while it is being rewritten
+    cur.execute(
+        """
+        SELECT d.id, d.outbox_id
+        FROM champion_digests d
+        JOIN email_outbox o ON o.id = d.outbox_id
+        WHERE d.champion_email = %s
+          AND o.status = 'pending'
+          AND d.window_ends_at > now()
+        ORDER BY d.window_ends_at DESC
+        LIMIT 1
+        FOR UPDATE OF o
+        """,
+        (champion_email,),
+    )
+    digest = cur.fetchone()
+
+    if digest is None:
+        # Open a new digest holding just this application
+        first_item = {
+            "title": opportunity.get("title") or app_data.get("title"),
+            "first_name": app_data.get("first_name"),
+            "last_name": app_data.get("last_name"),
+            "email": app_data.get("email"),
+            "phone": app_data.get("phone"),
+            "created_at": datetime.now(timezone.utc),
+        }
+        window_ends_at = datetime.now(timezone.utc) + window
+        outbox_id = enqueue_email(
+            cur,
+            "champion_digest",
+            build_champion_digest_email(champion_email, [first_item]),
+            send_at=window_ends_at,
+        )
+        cur.execute(
+            """
+            INSERT INTO champion_digests (champion_email, outbox_id, window_ends_at)
+            VALUES (%s, %s, %s)
+            RETURNING id
+            """,
+            (champion_email, outbox_id, window_ends_at),
+        )
+        add_champion_digest_item(cur, cur.fetchone()["id"], app_id, opportunity)
+        return
 
-    with smtplib.SMTP(smtp_host, smtp_port) as server:
-        if smtp_user and smtp_password:
-            server.starttls()
-            server.login(smtp_user, smtp_password)
-        server.send_message(msg)
+    add_champion_digest_item(cur, digest["id"], app_id, opportunity)
+    items = load_champion_digest_items(cur, digest["id"])
+    replace_queued_email(
+        cur, digest["outbox_id"], build_champion_digest_email(champion_email, items)
+    )
+
+
+# =====
+# Email outbox delivery
+# =====
+# Queued mail is delivered by `python outbox.py`. Until that worker is
+# deployed, each web worker also runs one background thread that drains the
+# outbox and sends campaigns; set OUTBOX_INLINE_DELIVERY=0 once the separate
+# worker is running.
+# Both can run together: claims use FOR UPDATE SKIP LOCKED.
+OUTBOX_INLINE_DELIVERY = os.getenv("OUTBOX_INLINE_DELIVERY", "1") == "1"
+# How long worker_exit waits for the delivery thread to finish its batch
+OUTBOX_STOP_SECONDS = float(os.getenv("OUTBOX_STOP_SECONDS", "10"))
+
+_outbox_wakeup = threading.Event()
+_outbox_stop = threading.Event()
+_outbox_thread = None
+_outbox_thread_pid = None
+_outbox_thread_lock = threading.Lock()
+
+
+def _deliver_outbox_forever() -> None:
+    while not _outbox_stop.is_set():
+        _outbox_wakeup.wait(timeout=OUTBOX_POLL_SECONDS)
+        _outbox_wakeup.clear()
+        if _outbox_stop.is_set():
+            return
+        try:
+            deliver_due_mail(get_db_connection, stop=_outbox_stop)
+        except Exception:
+            app.logger.exception("Inline outbox delivery failed")
+
+
+def stop_outbox(timeout: float = OUTBOX_STOP_SECONDS) -> None:
+    """
+    Stop this worker's delivery thread once the batch it is sending is done
+    (gunicorn's worker_exit), waiting at most timeout seconds. Mail still
+    in flight after that is sent again by another worker when its lease
+    runs out.
+    """
+    thread = _outbox_thread
+    if thread is None or _outbox_thread_pid != os.getpid():
+        return
+    _outbox_stop.set()
+    _outbox_wakeup.set()
+    thread.join(timeout)
+    if thread.is_alive():
+        app.logger.warning("Outbox delivery still busy after %ss; leaving it to the lease", timeout)
+
+
+def wake_outbox() -> None:
+    """Have this worker's delivery thread look at the outbox now."""
+    global _outbox_thread, _outbox_thread_pid
+
+    if not OUTBOX_INLINE_DELIVERY:
+        return
+
+    pid = os.getpid()
+    if _outbox_thread_pid != pid:
+        with _outbox_thread_lock:
+            if _outbox_thread_pid != pid:
+                _outbox_thread = threading.Thread(
+                    target=_deliver_outbox_forever,
+                    name=f"kras-outbox-{pid}",
+                    daemon=True,
+                )
+                _outbox_thread.start()
+                _outbox_thread_pid = pid
+
+    _outbox_wakeup.set()
 
 
 # =====
 # Core data helpers
 # =====
-def save_application(form_data: dict) -> int:
+def save_application(form_data: dict, opportunity_id: int | None = None) -> int:
     """
     Insert a new volunteer application into Postgres.
-    History and notes are stored as JSON text.
+    The submission time comes from the column default (now()), and an
+    "Application submitted" history event is written in the same statement.
+    opportunity_id links the application to its opportunity by key.
     """
-    history_list = [
-        {
-            "event": "Application submitted",
-            "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M"),
-        }
-    ]
-    notes_list = []
-
-    with get_db_connection() as conn:
-        with conn.cursor() as cur:
-            cur.execute(
-                """
+    conn = get_db()
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            WITH new_app AS (
                 INSERT INTO applications
                     (first_name, last_name, email, phone, contact,
                      title, time, duration, mode, location,
-                     comments, status, timestamp, history, notes)
+                     comments, status, opportunity_id)
                 VALUES
                     (%s, %s, %s, %s, %s,
                      %s,   %s,   %s,      %s,   %s,
-                     %s,      %s,      %s,        %s,      %s)
-                RETURNING id
-                """,
-                (
-                    form_data.get("first_name"),
-                    form_data.get("last_name"),
-                    form_data.get("email"),
-                    form_data.get("phone"),
-                    form_data.get("contact"),
-                    form_data.get("title"),
-                    form_data.get("time"),
-                    form_data.get("duration"),
-                    form_data.get("mode"),
-                    form_data.get("location"),
-                    form_data.get("comments"),
-                    "Pending",
-                    datetime.now().strftime("%Y-%m-%d %H:%M"),
-                    json.dumps(history_list),
-                    json.dumps(notes_list),
-                ),
+                     %s,      %s,     %s)
+                RETURNING id, email
             )
-            row = cur.fetchone()
-            app_id = row["id"] if isinstance(row, dict) else row[0]
-            return int(app_id)
+            INSERT INTO application_events (application_id, kind, body, actor)
+            SELECT id, 'event', 'Application submitted', email
+            FROM new_app
+            RETURNING application_id AS id
+            """,
+            (
+                form_data.get("first_name"),
+                form_data.get("last_name"),
+                form_data.get("email"),
+                form_data.get("phone"),
+                form_data.get("contact"),
+                form_data.get("title"),
+                form_data.get("time"),
+                form_data.get("duration"),
+                form_data.get("mode"),
+                form_data.get("location"),
+                form_data.get("comments"),
+                "Pending",
+                opportunity_id,
+            ),
+        )
+        row = cur.fetchone()
+        app_id = row["id"] if isinstance(row, dict) else row[0]
+        return int(app_id)
 # =====
 # Routes
 # =====
@@ -611,7 +1724,10 @@ def admin_request_access():
     if not email.endswith("@kraskickers.org"):
         return {"error": "Admin access requires a @kraskickers.org email address."}, 400
 
-    send_admin_activation_email(email)
+    if not queue_activation_email(email, admin=True):
+        return {
+            "message": "A verification link was sent to your KRAS Kickers email recently. Please check your inbox."
+        }
     return {
         "message": "A verification link has been sent to your KRAS Kickers email."
     }
@@ -656,65 +1772,89 @@ def index():
 
         # user message
         app_data = request.form.to_dict()
-        app_id = save_application(app_data)
+        requested_opp_id = request.form.get("opportunity_id", type=int)
 
-        # 1. Load matching opportunity info
-        with get_db_connection() as conn:
-            with conn.cursor() as cur:
-                cur.execute("""
-                    SELECT *
+        # 1. Load the opportunity (by id; older forms only send the title).
+        #    The id comes from the client, so it must name an open opportunity.
+        conn = get_db()
+        with conn.cursor() as cur:
+            opportunity = None
+            if requested_opp_id is not None:
+                cur.execute(
+                    f"SELECT {OPPORTUNITY_DETAIL_COLUMNS} FROM opportunities WHERE id = %s",
+                    (requested_opp_id,),
+                )
+                opportunity = cur.fetchone()
+                if opportunity is None:
+                    return jsonify({
+                        "status": "error",
+                        "message": "This opportunity no longer exists."
+                    }), 400
+            else:
+                cur.execute(f"""
+                    SELECT {OPPORTUNITY_DETAIL_COLUMNS}
                     FROM opportunities
                     WHERE LOWER(TRIM(title)) = LOWER(TRIM(%s))
+                    -- Same preference as the migration 3 backfill: open, then newest
+                    ORDER BY (closed IS TRUE), id DESC
                     LIMIT 1
                 """, (app_data.get("title"),))
                 opportunity = cur.fetchone()
 
-                if opportunity:
-                    opportunity = dict(opportunity)
-                else:
-                    # Safe fallback so email formatting still works
-                    opportunity = {
-                        "title": app_data.get("title", ""),
-                        "time": app_data.get("time", ""),
-                        "duration": app_data.get("duration", ""),
-                        "mode": app_data.get("mode", ""),
-                        "location": app_data.get("location", ""),
-                        "requirements": "",
-                        "description": app_data.get("comments", ""),
-                    }
-
-        # 2. SEND EMAILS ASYNC (non-blocking)
-        run_async(send_volunteer_confirmation_email, app_data, opportunity)
-
-        # 3. Notify champion(s), if any — also async
-        with get_db_connection() as conn:
-            with conn.cursor() as cur:
-                cur.execute("""
-                    SELECT a.first_name, a.last_name, a.email
-                    FROM champions_opportunities co
-                    JOIN applications a ON co.champion_id = a.id
-                    JOIN opportunities o ON o.id = co.opportunity_id
-                    WHERE LOWER(TRIM(o.title)) = LOWER(TRIM(%s))
-                """, (app_data.get("title"),))
-                champs = cur.fetchall()
+            if opportunity and opportunity["closed"]:
+                return jsonify({
+                    "status": "error",
+                    "message": "This opportunity is no longer accepting applications."
+                }), 400
+
+            if opportunity:
+                opportunity = dict(opportunity)
+                # Store what the opportunity says, not what the form claimed
+                for field in ("title", "time", "duration", "mode", "location"):
+                    app_data[field] = opportunity.get(field)
+            else:
+                # Safe fallback so email formatting still works
+                opportunity = {
+                    "title": app_data.get("title", ""),
+                    "time": app_data.get("time", ""),
+                    "duration": app_data.get("duration", ""),
+                    "mode": app_data.get("mode", ""),
+                    "location": app_data.get("location", ""),
+                    "requirements": "",
+                    "description": app_data.get("comments", ""),
+                }
 
-                for c in champs:
-                    run_async(
-                        send_champion_notification_email,
-                        app_data,
-                        {
-                            "first_name": c["first_name"],
-                            "last_name": c["last_name"],
-                            "email": c["email"],
-                        },
-                        opportunity,
-                    )
+        opportunity_id = opportunity.get("id")
+        app_id = save_application(app_data, opportunity_id)
 
-            
+        # 2. Queue the emails in the same transaction as the application:
+        #    they go out only if it commits, and survive worker restarts
+        with conn.cursor() as cur:
+            enqueue_email(
+                cur,
+                "volunteer_confirmation",
+                build_volunteer_confirmation_email(app_data, opportunity),
+            )
+
+            # 3. Notify champion(s), if any, each per their digest setting
+            cur.execute("""
+                SELECT a.first_name, a.last_name, a.email,
+                       COALESCE(p.digest, 'immediate') AS digest
+                FROM champions_opportunities co
+                JOIN applications a ON co.champion_id = a.id
+                LEFT JOIN champion_notification_prefs p ON p.email = LOWER(a.email)
+                WHERE co.opportunity_id = %s
+            """, (opportunity_id,))
+            champs = cur.fetchall()
+
+            for c in champs:
+                queue_champion_notification(cur, c, app_id, app_data, opportunity)
+
+        after_commit(wake_outbox)
 
         return jsonify({
             "status": "success",
-            "title": request.form.get("title"),
+            "title": app_data.get("title"),
             "message": "Thank you. Your volunteer application has been submitted.",
             "application_id": app_id
         })
@@ -722,97 +1862,58 @@ def index():
 
     verified_email = (session.get("verified_email") or "").strip().lower()
 
-    with get_db_connection() as conn:
-        with conn.cursor() as cur:
-
-            # Load all open opportunities
-            cur.execute(
-                "SELECT * FROM opportunities WHERE closed IS FALSE OR closed IS NULL"
-            )
-            rows = cur.fetchall()
-            opportunities = dictify_rows(rows)
-
-            # Load user's volunteer application history / assignments
-            cur.execute(
-                """
-                SELECT id, title, timestamp, time, duration, mode, location, status
-                FROM applications
-                WHERE email = %s
-                ORDER BY timestamp DESC
-                """,
-                (verified_email,),
-            )
-            my_assignments = dictify_rows(cur.fetchall())
-
-            # Keep only Assigned or Pending
-            my_assignments = [
-                a for a in my_assignments 
-                if a.get("status") in ("Assigned", "Pending")
-            ]
-
-            # Sort: Assigned first, Pending second
-            status_order = {"Assigned": 0, "Pending": 1}
-            my_assignments.sort(key=lambda a: status_order.get(a.get("status"), 2))
-
-            # Determine champion or admin view
-            if is_admin(verified_email):
-                # Admin sees all opportunities as champion_opps
-                champion_opps = opportunities.copy()
-            else:
-                # Normal champion-only filter
-                cur.execute(
-                    """
-                    SELECT o.*
-                    FROM champions_opportunities co
-                    JOIN applications a ON co.champion_id = a.id
-                    JOIN opportunities o ON co.opportunity_id = o.id
-                    WHERE LOWER(a.email) = %s
-                    ORDER BY o.id
-                    """,
-                    (verified_email,),
-                )
-
-                champion_opps = dictify_rows(cur.fetchall())
-
-
-    # Normalize tags and frequency for ALL opportunities
-    for opp in opportunities:
-        tags_raw = opp.get("tags")
-        if isinstance(tags_raw, str) and tags_raw.strip():
-            try:
-                opp["tags"] = json.loads(tags_raw)
-            except json.JSONDecodeError:
-                opp["tags"] = []
-        elif tags_raw is None:
-            opp["tags"] = []
-
-        if "description" in opp and "desc" not in opp:
-            opp["desc"] = opp["description"]
-
-        opp["frequency"] = opp.get("mode", "")
-
-    # Normalize tags for champion opportunities
-    for opp in champion_opps:
-        tags_raw = opp.get("tags")
-        if isinstance(tags_raw, str) and tags_raw.strip():
-            try:
-                opp["tags"] = json.loads(tags_raw)
-            except json.JSONDecodeError:
-                opp["tags"] = []
-        elif tags_raw is None:
-            opp["tags"] = []
-
-        if "description" in opp and "desc" not in opp:
-            opp["desc"] = opp["description"]
-
-        opp["frequency"] = opp.get("mode", "")
+    # Open opportunities (cached; shared, so not modified here)
+    opportunities = open_opportunities()
+
+    conn = get_db()
+    with conn.cursor() as cur:
+
+        # Load user's volunteer application history / assignments
+        cur.execute(
+            """
+            SELECT id, title, timestamp, time, duration, mode, location, status, updated_at
+            FROM applications
+            WHERE LOWER(email) = %s
+              AND status IN ('Assigned', 'Pending')
+            ORDER BY timestamp DESC
+            """,
+            (verified_email,),
+        )
+        my_assignments = dictify_rows(cur.fetchall())
+
+        # Sort: Assigned first, Pending second
+        status_order = {"Assigned": 0, "Pending": 1}
+        my_assignments.sort(key=lambda a: status_order.get(a.get("status"), 2))
+
+    # Determine champion or admin view
+    if is_admin(verified_email):
+        # Admin sees all opportunities as champion_opps
+        champion_opps = list(opportunities)
+    else:
+        # Normal champion-only filter
+        champion_ids = set(champion_opportunity_ids())
+        champion_opps = [opp for opp in opportunities if opp["id"] in champion_ids]
+
+    # Everything the page is rendered from, so an unchanged page costs the
+    # queries above but no rendering or transfer
+    etag = weak_etag(
+        "index",
+        verified_email,
+        [(opp["id"], opp["updated_at"]) for opp in opportunities],
+        [(a["id"], a["updated_at"]) for a in my_assignments],
+        [opp["id"] for opp in champion_opps],
+    )
+    cached_response = not_modified(etag)
+    if cached_response:
+        return cached_response
 
-    return render_template(
+    response = app.make_response(render_template(
         "index.html",
         opportunities=opportunities,
         my_assignments=my_assignments,
         champion_opps=champion_opps
-    )
+    ))
+    return with_validators(response, etag)
 
 # =====
 # Admin menu
@@ -831,41 +1932,305 @@ def menu():
     return render_template("Menu.html")
 
 
+@app.route("/api/admin/metrics")
+def api_admin_metrics():
+    """Runtime counters for this worker process."""
+    if not session.get("admin_verified"):
+        return jsonify({"error": "Not authorized"}), 403
+
+    conn = get_db()
+    with conn.cursor() as cur:
+        # Mail waiting for any worker; answered from email_outbox_due_idx
+        cur.execute(
+            """
+            SELECT status, COUNT(*) AS n
+            FROM email_outbox
+            WHERE status IN ('pending', 'sending')
+            GROUP BY status
+            """
+        )
+        outbox = {"pending": 0, "sending": 0}
+        outbox.update({r["status"]: r["n"] for r in cur.fetchall()})
+
+        # Mail given up on, from its own partial index
+        cur.execute("SELECT COUNT(*) AS n FROM email_outbox WHERE status = 'failed'")
+        outbox["failed"] = cur.fetchone()["n"]
+
+        # Recipients of campaigns still sending
+        cur.execute(
+            """
+            SELECT COUNT(*) FILTER (WHERE r.status = 'pending') AS pending,
+                   COUNT(*) FILTER (WHERE r.status = 'failed') AS failed
+            FROM email_campaigns c
+            JOIN campaign_recipients r ON r.campaign_id = c.id
+            WHERE c.status = 'sending'
+            """
+        )
+        campaigns = cur.fetchone()
+
+    return jsonify({
+        "pid": os.getpid(),
+        "db_pool": get_db_pool().get_stats(),
+        "outbox": outbox,
+        "campaigns": campaigns,
+    })
+
 
 # =====
-# Manage active opportunities
+# Email campaigns
 # =====
-@app.route("/manage", methods=["GET"])
-def manage():
-    session.permanent = True
+# An admin writes one subject and body (merge fields: CAMPAIGN_MERGE_FIELDS),
+# picks volunteers by opportunity, status and application date, and starts
+# it. Recipients are copied into campaign_recipients in one INSERT ... SELECT,
+# one row per email, and outbox.py sends them at the campaign's rate.
+CAMPAIGN_PROGRESS_SQL = """
+SELECT c.id, c.subject, c.status, c.filters, c.rate, c.created_by,
+       c.created_at, c.started_at, c.completed_at,
+       COUNT(r.id) AS total,
+       COUNT(r.id) FILTER (WHERE r.status = 'pending') AS pending,
+       COUNT(r.id) FILTER (WHERE r.status = 'sent') AS sent,
+       COUNT(r.id) FILTER (WHERE r.status = 'failed') AS failed
+FROM email_campaigns c
+LEFT JOIN campaign_recipients r ON r.campaign_id = c.id
+"""
+
+
+def campaign_recipient_clause(filters: dict) -> tuple[str, list]:
+    """
+    SQL condition on applications for a campaign's filters: opportunity_id,
+    status (one or a list) and days / from / to as in date_range_from_args.
+    Raises ValueError for a filter of the wrong JSON type.
+    """
+    for key, types in (("opportunity_id", (int, str)), ("days", (int, str)), ("from", str), ("to", str)):
+        value = filters.get(key)
+        if value is not None and (isinstance(value, bool) or not isinstance(value, types)):
+            raise ValueError(f"filters.{key} has the wrong type")
+
+    clause = "email IS NOT NULL AND TRIM(email) <> ''"
+    params = []
+
+    if filters.get("opportunity_id") is not None:
+        clause += " AND opportunity_id = %s"
+        params.append(int(filters["opportunity_id"]))
+
+    statuses = filters.get("status")
+    if statuses:
+        if isinstance(statuses, str):
+            statuses = [statuses]
+        if not isinstance(statuses, list) or not all(isinstance(s, str) for s in statuses):
+            raise ValueError("filters.status has the wrong type")
+        clause += " AND status = ANY(%s)"
+        params.append(statuses)
+
+    start, end = date_range_from_args(MultiDict(
+        {k: filters[k] for k in ("days", "from", "to") if filters.get(k) is not None}
+    ))
+    date_clause, date_params = date_range_clause("timestamp", start, end)
+    return clause + date_clause, params + date_params
+
+
+def campaign_progress(cur, campaign_id: int) -> dict | None:
+    cur.execute(CAMPAIGN_PROGRESS_SQL + " WHERE c.id = %s GROUP BY c.id", (campaign_id,))
+    return cur.fetchone()
+
+
+@app.route("/api/admin/campaigns", methods=["GET", "POST"])
+def api_admin_campaigns():
+    """
+    GET lists campaigns with their progress. POST creates a draft from JSON
+    {subject, body, filters, rate} and returns it with its recipient count.
+    """
+    if not session.get("admin_verified"):
+        return jsonify({"error": "Not authorized"}), 403
+
+    conn = get_db()
+    with conn.cursor() as cur:
+        if request.method == "GET":
+            cur.execute(CAMPAIGN_PROGRESS_SQL + " GROUP BY c.id ORDER BY c.created_at DESC, c.id DESC")
+            return jsonify(cur.fetchall())
+
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            data = {}
+        subject = data.get("subject") or ""
+        body = data.get("body") or ""
+        filters = data.get("filters") or {}
+        if not isinstance(subject, str) or not isinstance(body, str):
+            return jsonify({"error": "Subject and body must be strings"}), 400
+        subject = subject.strip()
+        if not subject or not body.strip():
+            return jsonify({"error": "Subject and body are required"}), 400
+        if not isinstance(filters, dict):
+            return jsonify({"error": "filters must be an object"}), 400
+
+        try:
+            compile_campaign(subject, body)
+        except TemplateError as e:
+            return jsonify({"error": f"Template error: {e}"}), 400
+
+        try:
+            rate = float(data["rate"]) if data.get("rate") is not None else None
+            where, params = campaign_recipient_clause(filters)
+        except (TypeError, ValueError):
+            return jsonify({"error": "Invalid rate or filters"}), 400
+        if rate is not None and not (math.isfinite(rate) and CAMPAIGN_MIN_RATE <= rate <= CAMPAIGN_MAX_RATE):
+            return jsonify({
+                "error": f"rate must be between {CAMPAIGN_MIN_RATE:g} and {CAMPAIGN_MAX_RATE:g} messages per second"
+            }), 400
+
+        cur.execute(
+            """
+            INSERT INTO email_campaigns (subject, body, filters, logo_url, rate, created_by)
+            VALUES (%s, %s, %s, %s, %s, %s)
+            RETURNING id
+            """,
+            (subject, body, json.dumps(filters), email_logo_url(), rate, current_user_email()),
+        )
+        campaign_id = cur.fetchone()["id"]
+
+        # Latest application per email supplies the name
+        cur.execute(
+            f"""
+            INSERT INTO campaign_recipients (campaign_id, email, first_name, last_name, application_id)
+            SELECT DISTINCT ON (LOWER(TRIM(email)))
+                   %s, LOWER(TRIM(email)), first_name, last_name, id
+            FROM applications
+            WHERE {where}
+            ORDER BY LOWER(TRIM(email)), timestamp DESC, id DESC
+            """,
+            [campaign_id] + params,
+        )
+
+        return jsonify(campaign_progress(cur, campaign_id)), 201
+
+
+@app.route("/api/admin/campaigns/<int:campaign_id>")
+def api_admin_campaign(campaign_id):
+    """One campaign's progress, plus its message rendered for the first recipient."""
+    if not session.get("admin_verified"):
+        return jsonify({"error": "Not authorized"}), 403
+
+    conn = get_db()
+    with conn.cursor() as cur:
+        campaign = campaign_progress(cur, campaign_id)
+        if campaign is None:
+            return jsonify({"error": "Campaign not found"}), 404
+
+        cur.execute(
+            """
+            SELECT c.subject, c.body, c.logo_url, r.email, r.first_name, r.last_name
+            FROM email_campaigns c
+            JOIN campaign_recipients r ON r.campaign_id = c.id
+            WHERE c.id = %s
+            ORDER BY r.id
+            LIMIT 1
+            """,
+            (campaign_id,),
+        )
+        sample = cur.fetchone()
+        cur.execute(
+            """
+            SELECT email, last_error
+            FROM campaign_recipients
+            WHERE campaign_id = %s AND status = 'failed'
+            ORDER BY id
+            LIMIT 50
+            """,
+            (campaign_id,),
+        )
+        campaign["failures"] = cur.fetchall()
+
+    campaign["merge_fields"] = list(CAMPAIGN_MERGE_FIELDS)
+    if sample:
+        msg = render_campaign_email(sample, sample)
+        campaign["preview"] = {
+            "to": msg["To"],
+            "subject": msg["Subject"],
+            "body": msg.get_body(("plain",)).get_content(),
+        }
+    return jsonify(campaign)
+
+
+@app.route("/api/admin/campaigns/<int:campaign_id>/<action>", methods=["POST"])
+def api_admin_campaign_action(campaign_id, action):
+    """Start a draft, or cancel a draft or sending campaign."""
+    if not session.get("admin_verified"):
+        return jsonify({"error": "Not authorized"}), 403
+
+    transitions = {
+        "start": (("draft",), "sending"),
+        "cancel": (("draft", "sending"), "cancelled"),
+    }
+    if action not in transitions:
+        return jsonify({"error": "Unknown action"}), 404
+    allowed_from, new_status = transitions[action]
+
+    conn = get_db()
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            UPDATE email_campaigns
+            SET status = %s,
+                started_at = CASE WHEN %s = 'sending' THEN now() ELSE started_at END
+            WHERE id = %s AND status = ANY(%s)
+            RETURNING id
+            """,
+            (new_status, new_status, campaign_id, list(allowed_from)),
+        )
+        if cur.fetchone() is None:
+            return jsonify({"error": f"Campaign cannot {action} now"}), 409
+
+        if new_status == "sending":
+            notify_workers(cur)
+            after_commit(wake_outbox)
+
+        return jsonify(campaign_progress(cur, campaign_id))
+
+
+@app.route("/campaigns")
+def campaigns():
+    """Admin page for writing, starting and following campaigns through the APIs above."""
     auth = require_admin()
     if auth:
         return auth
 
-    with get_db_connection() as conn:
-        with conn.cursor() as cur:
-            # Load open opportunities
-            cur.execute(
-                "SELECT * FROM opportunities WHERE closed IS FALSE OR closed IS NULL"
-            )
-            rows = cur.fetchall()
+    conn = get_db()
+    with conn.cursor() as cur:
+        cur.execute("SELECT id, title, closed FROM opportunities ORDER BY closed, title, id")
+        opportunities = cur.fetchall()
+        cur.execute(
+            """
+            SELECT DISTINCT status
+            FROM applications
+            WHERE status IS NOT NULL AND status <> ''
+            ORDER BY status
+            """
+        )
+        statuses = [r["status"] for r in cur.fetchall()]
 
-    opportunities = dictify_rows(rows)
+    return render_template(
+        "campaigns.html",
+        opportunities=opportunities,
+        statuses=statuses,
+        merge_fields=CAMPAIGN_MERGE_FIELDS,
+        min_rate=CAMPAIGN_MIN_RATE,
+        max_rate=CAMPAIGN_MAX_RATE,
+        default_rate=CAMPAIGN_RATE,
+    )
 
-    for opp in opportunities:
-        tags_raw = opp.get("tags")
-        if isinstance(tags_raw, str) and tags_raw.strip():
-            try:
-                opp["tags"] = json.loads(tags_raw)
-            except json.JSONDecodeError:
-                opp["tags"] = []
-        elif tags_raw is None:
-            opp["tags"] = []
 
-        if "description" in opp and "desc" not in opp:
-            opp["desc"] = opp["description"]
+# =====
+# Manage active opportunities
+# =====
+@app.route("/manage", methods=["GET"])
+def manage():
+    session.permanent = True
+    auth = require_admin()
+    if auth:
+        return auth
 
-        opp["frequency"] = opp.get("mode", "")
+    # Open opportunities (cached; shared, so not modified here)
+    opportunities = open_opportunities()
 
     # ================================
     # NEW CODE: Load Champion-Leader candidates
@@ -874,38 +2239,41 @@ def manage():
     champion_candidates = []
 
     # 1. Find the opportunity_id for Champion-Leader
-    with get_db_connection() as conn:
+    champion_leader_opp_id = next(
+        (
+            opp["id"] for opp in opportunities
+            if (opp.get("title") or "").strip().lower() == "champion-leader"
+        ),
+        None,
+    )
+
+    # 2. Load all volunteers whose Champion-Leader applications are Assigned
+    def load_candidates():
+        conn = get_db()
         with conn.cursor() as cur:
             cur.execute("""
-                SELECT id
-                FROM opportunities
-                WHERE LOWER(title) = LOWER(%s)
-                  AND (closed IS FALSE OR closed IS NULL)
-                LIMIT 1
-            """, ("Champion-Leader",))
-            row = cur.fetchone()
-            champion_leader_opp_id = row["id"] if row else None
+                SELECT id, first_name, last_name, email
+                FROM applications
+                WHERE status = 'Assigned'
+                    AND opportunity_id = %s
+                ORDER BY first_name, last_name
+            """, (champion_leader_opp_id,))
+
+            rows = cur.fetchall()
+
+        return [
+            {
+                "id": r["id"],
+                "name": f"{r['first_name']} {r['last_name']}",
+                "email": r["email"]
+            }
+            for r in rows
+        ]
 
-    # 2. Load all volunteers whose Champion-Leader applications are Assigned
     if champion_leader_opp_id:
-        with get_db_connection() as conn:
-            with conn.cursor() as cur:
-                cur.execute("""
-                    SELECT id, first_name, last_name, email
-                    FROM applications
-                    WHERE status = 'Assigned'
-                        AND LOWER(TRIM(title)) = LOWER(TRIM('Champion-Leader'))
-                    ORDER BY first_name, last_name
-                """)
-
-                rows = cur.fetchall()
-
-                for r in rows:
-                    champion_candidates.append({
-                        "id": r["id"],
-                        "name": f"{r['first_name']} {r['last_name']}",
-                        "email": r["email"]
-                    })
+        champion_candidates = cached(
+            champion_candidates_key(champion_leader_opp_id), load_candidates
+        )
 
     # ================================
 
@@ -921,7 +2289,8 @@ def manage():
 # =====
 @app.route("/api/champions")
 def get_champions():
-    with get_db_connection() as conn:
+    def build():
+        conn = get_db()
         with conn.cursor() as cur:
             cur.execute(
                 """
@@ -931,15 +2300,16 @@ def get_champions():
                 ORDER BY first_name, last_name
                 """
             )
-            rows = cur.fetchall()
+            return dictify_rows(cur.fetchall())
 
-    champions = dictify_rows(rows)
+    champions = cached(CHAMPIONS_KEY, build)
     return jsonify(champions)
 
 
 @app.route("/api/opportunity_champions/<int:opp_id>")
 def get_opportunity_champions(opp_id):
-    with get_db_connection() as conn:
+    def build():
+        conn = get_db()
         with conn.cursor() as cur:
             cur.execute(
                 """
@@ -955,12 +2325,52 @@ def get_opportunity_champions(opp_id):
                 """,
                 (opp_id,),
             )
-            rows = cur.fetchall()
+            return dictify_rows(cur.fetchall())
 
-    champions = dictify_rows(rows)
+    champions = cached(opportunity_champions_key(opp_id), build)
     return jsonify(champions)
 
 
+@app.route("/api/champion/notification_prefs", methods=["GET", "POST"])
+def champion_notification_prefs():
+    """
+    The verified user's champion email setting: "immediate" or a digest
+    window (CHAMPION_DIGEST_WINDOWS). POST digest=<setting> to change it.
+    Admins may pass email=<address> to read or set someone else's.
+    """
+    email = current_user_email()
+    if session.get("admin_verified") and request.values.get("email"):
+        email = request.values["email"].strip().lower()
+    if not email:
+        return jsonify({"error": "Not authorized"}), 403
+
+    conn = get_db()
+    with conn.cursor() as cur:
+        if request.method == "POST":
+            digest = request.form.get("digest") or (request.get_json(silent=True) or {}).get("digest")
+            if digest not in CHAMPION_DIGEST_WINDOWS:
+                return jsonify({"error": "Unknown digest setting"}), 400
+
+            cur.execute(
+                """
+                INSERT INTO champion_notification_prefs (email, digest)
+                VALUES (%s, %s)
+                ON CONFLICT (email) DO UPDATE
+                SET digest = EXCLUDED.digest, updated_at = now()
+                """,
+                (email, digest),
+            )
+        else:
+            cur.execute(
+                "SELECT digest FROM champion_notification_prefs WHERE email = %s",
+                (email,),
+            )
+            row = cur.fetchone()
+            digest = row["digest"] if row else "immediate"
+
+    return jsonify({"email": email, "digest": digest, "choices": list(CHAMPION_DIGEST_WINDOWS)})
+
+
 @app.route("/api/assign_champion", methods=["POST"])
 def assign_champion():
     if not session.get("admin_verified"):
@@ -972,30 +2382,136 @@ def assign_champion():
     if not champion_id or not opportunity_id:
         return jsonify({"error": "Missing data"}), 400
 
-    with get_db_connection() as conn:
-        with conn.cursor() as cur:
-            cur.execute(
-                """
-                SELECT id
-                FROM champions_opportunities
-                WHERE champion_id = %s AND opportunity_id = %s
-                """,
-                (champion_id, opportunity_id),
-            )
-            existing = cur.fetchone()
+    conn = get_db()
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            INSERT INTO champions_opportunities (champion_id, opportunity_id)
+            VALUES (%s, %s)
+            ON CONFLICT (champion_id, opportunity_id) DO NOTHING
+            """,
+            (champion_id, opportunity_id),
+        )
+
+        if cur.rowcount == 0:
+            return jsonify({"message": "Champion already assigned."})
+
+    invalidate_cache(opportunity_champions_key(opportunity_id))
+    return jsonify({"message": "Champion assigned successfully."})
 
-            if existing:
-                return jsonify({"message": "Champion already assigned."})
 
-            cur.execute(
-                """
-                INSERT INTO champions_opportunities (champion_id, opportunity_id)
-                VALUES (%s, %s)
-                """,
-                (champion_id, opportunity_id),
-            )
+# =====
+# Opportunity images
+# =====
+IMAGE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+@app.template_global()
+def opportunity_image_url(opp) -> str | None:
+    """
+    URL of an opportunity's stored original image, or None if it has none.
+    Images are addressed by content hash, so every URL can be cached forever.
+    """
+    if not opp or not opp.get("image_hash"):
+        return None
+    return url_for("image_blob", image_hash=opp["image_hash"])
+
+
+def opportunity_variant_url(opp, variant: str, width: int, fmt: str, **kwargs) -> str:
+    return url_for(
+        "image_variant",
+        image_hash=opp["image_hash"],
+        variant=variant,
+        width=width,
+        fmt=fmt,
+        **kwargs,
+    )
+
+
+@app.template_global()
+def opportunity_image_sources(opp, variant: str) -> dict | None:
+    """
+    srcset strings for one variant of an opportunity image:
+    {"webp": ..., "fallback": ..., "src": <smallest fallback URL>}.
+    Returns None if the opportunity has no image.
+    """
+    if not opp or not opp.get("image_hash"):
+        return None
+
+    widths, _, formats = IMAGE_VARIANTS[variant]
+    fallback = fallback_format(opp.get("image_mime"))
+
+    def srcset(fmt):
+        return ", ".join(f"{opportunity_variant_url(opp, variant, w, fmt)} {w}w" for w in widths)
+
+    return {
+        "webp": srcset("webp") if "webp" in formats else None,
+        "fallback": srcset(fallback),
+        "src": opportunity_variant_url(opp, variant, widths[0], fallback),
+    }
+
+
+def immutable_image_response(data, mime: str, etag: str):
+    response = app.response_class(bytes(data), mimetype=mime)
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = IMAGE_CACHE_CONTROL
+    return response
+
+
+def image_not_modified(etag: str):
+    response = app.response_class(status=304)
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = IMAGE_CACHE_CONTROL
+    return response
+
+
+@app.route("/images/<image_hash>")
+def image_blob(image_hash):
+    etag = f'"{image_hash}"'
+
+    # The URL names the content, so a matching validator is always current
+    if image_hash in request.if_none_match:
+        return image_not_modified(etag)
+
+    conn = get_db()
+    with conn.cursor() as cur:
+        cur.execute(
+            "SELECT mime, data FROM image_blobs WHERE hash = %s",
+            (image_hash,),
+        )
+        row = cur.fetchone()
+
+    if not row:
+        return "Image not found", 404
+
+    return immutable_image_response(row["data"], row["mime"], etag)
 
-    return jsonify({"message": "Champion assigned successfully."})
+
+@app.route("/images/<image_hash>/"
+           "<any(card, detail, email):variant>-<int:width>.<any(webp, jpg, png):fmt>")
+def image_variant(image_hash, variant, width, fmt):
+    name = f"{image_hash}-{variant}-{width}.{fmt}"
+    etag = f'"{name}"'
+
+    if name in request.if_none_match:
+        return image_not_modified(etag)
+
+    conn = get_db()
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            SELECT mime, data
+            FROM image_variants
+            WHERE image_hash = %s AND variant = %s AND width = %s AND format = %s
+            """,
+            (image_hash, variant, width, fmt),
+        )
+        row = cur.fetchone()
+
+    if not row:
+        return "Image not found", 404
+
+    return immutable_image_response(row["data"], row["mime"], etag)
 
 
 # =====
@@ -1007,13 +2523,10 @@ def add_opportunity():
     if auth:
         return auth
 
-    image_base64 = None
-    if "image" in request.files:
-        file = request.files["image"]
-        if file and allowed_file(file.filename):
-            encoded = base64.b64encode(file.read()).decode("utf-8")
-            image_base64 = encoded
-
+    try:
+        image = read_image_upload(request.files.get("image"))
+    except InvalidImage:
+        return jsonify({"error": "The uploaded file is not a valid image."}), 400
 
     tags_json = request.form.get("tags_json") or request.form.get("tags") or "[]"
     try:
@@ -1022,27 +2535,32 @@ def add_opportunity():
         tags = []
     tags_json = json.dumps(tags)
 
-    with get_db_connection() as conn:
-        with conn.cursor() as cur:
-            cur.execute(
-                """
-                INSERT INTO opportunities
-                (title, time, duration, mode, description, requirements, location, image_base64, tags, closed)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, FALSE)
-                """,
-                (
-                    request.form.get("title"),
-                    request.form.get("time", ""),
-                    request.form.get("duration", ""),
-                    request.form.get("mode", ""),
-                    request.form.get("desc", ""),
-                    request.form.get("requirements", ""),
-                    request.form.get("location", ""),
-                    image_base64,
-                    tags_json,
-                ),
-            )
+    conn = get_db()
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            INSERT INTO opportunities
+            (title, time, duration, mode, description, requirements, location, tags, closed)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, FALSE)
+            RETURNING id
+            """,
+            (
+                request.form.get("title"),
+                request.form.get("time", ""),
+                request.form.get("duration", ""),
+                request.form.get("mode", ""),
+                request.form.get("desc", ""),
+                request.form.get("requirements", ""),
+                request.form.get("location", ""),
+                tags_json,
+            ),
+        )
+        opp_id = cur.fetchone()["id"]
+
+        if image:
+            set_opportunity_image(cur, opp_id, image)
 
+    invalidate_cache(OPEN_OPPORTUNITIES_KEY)
     return jsonify({"message": "Opportunity added."})
 
 
@@ -1055,6 +2573,11 @@ def update_opportunity(opp_id):
     if auth:
         return auth
 
+    try:
+        image = read_image_upload(request.files.get("image"))
+    except InvalidImage:
+        return jsonify({"error": "The uploaded file is not a valid image."}), 400
+
     tags_json = request.form.get("tags_json") or request.form.get("tags") or "[]"
     try:
         tags = json.loads(tags_json)
@@ -1062,48 +2585,43 @@ def update_opportunity(opp_id):
         tags = []
     tags_json = json.dumps(tags)
 
-    with get_db_connection() as conn:
-        with conn.cursor() as cur:
-            cur.execute(
-                """
-                UPDATE opportunities
-                SET title = %s,
-                    time = %s,
-                    duration = %s,
-                    mode = %s,
-                    description = %s,
-                    requirements = %s,
-                    location = %s,
-                    tags = %s
-                WHERE id = %s
-                """,
-                (
-                    request.form.get("title"),
-                    request.form.get("time", ""),
-                    request.form.get("duration", ""),
-                    request.form.get("mode", ""),
-                    request.form.get("desc", ""),
-                    request.form.get("requirements", ""),
-                    request.form.get("location", ""),
-                    tags_json,
-                    opp_id,
-                ),
-            )
-
-            import base64   # ← ensure this is at the top of app.py
+    conn = get_db()
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            UPDATE opportunities
+            SET title = %s,
+                time = %s,
+                duration = %s,
+                mode = %s,
+                description = %s,
+                requirements = %s,
+                location = %s,
+                tags = %s
+            WHERE id = %s
+            """,
+            (
+                request.form.get("title"),
+                request.form.get("time", ""),
+                request.form.get("duration", ""),
+                request.form.get("mode", ""),
+                request.form.get("desc", ""),
+                request.form.get("requirements", ""),
+                request.form.get("location", ""),
+                tags_json,
+                opp_id,
+            ),
+        )
 
-            # inside update_opportunity() – replace your whole image block with this:
-            if "image" in request.files:
-                file = request.files["image"]
-                if file and allowed_file(file.filename):
-                    encoded = base64.b64encode(file.read()).decode("utf-8")
-                    cur.execute(
-                        "UPDATE opportunities SET image_base64 = %s WHERE id = %s",
-                        (encoded, opp_id),
-                    )
+        # Replace the image only when a new one was uploaded, then drop the
+        # old one if no other opportunity uses it
+        if image:
+            set_opportunity_image(cur, opp_id, image)
+            collect_image_garbage(cur)
 
 
 
+    invalidate_cache(OPEN_OPPORTUNITIES_KEY)
     return jsonify({"message": "Opportunity updated."}) 
 
 
@@ -1121,42 +2639,45 @@ def delete_opportunity(opp_id):
 # =====
 # Close / reopen opportunity
 # =====
-@app.route("/close_opportunity/<int:opp_id>", methods=["POST"])
-def close_opportunity(opp_id):
-    auth = require_admin()
-    if auth:
-        return auth
-
-    closed_date = datetime.now().strftime("%Y-%m-%d %H:%M")
-
-    with get_db_connection() as conn:
-        with conn.cursor() as cur:
-
-            # 1. Mark the opportunity as closed
-            cur.execute("""
-                UPDATE opportunities
-                SET closed = TRUE, closed_date = %s
-                WHERE id = %s
-            """, (closed_date, opp_id))
-
-            # 2. Close volunteer applications tied to this opportunity
-            cur.execute("""
-                UPDATE applications
-                SET status = 'Closed-Completed'
-                WHERE LOWER(TRIM(title)) = LOWER(
-                    TRIM((SELECT title FROM opportunities WHERE id = %s))
-                )
-                AND status IN ('Assigned', 'Pending')
-            """, (opp_id,))
-
-            # 3. Remove all champions from this opportunity
-            cur.execute("""
-                DELETE FROM champions_opportunities
-                WHERE opportunity_id = %s
-            """, (opp_id,))
-
-        conn.commit()
+@app.route("/close_opportunity/<int:opp_id>", methods=["POST"])
+def close_opportunity(opp_id):
+    auth = require_admin()
+    if auth:
+        return auth
 
+    conn = get_db()
+    with conn.cursor() as cur:
+
+        # 1. Mark the opportunity as closed
+        cur.execute("""
+            UPDATE opportunities
+            SET closed = TRUE, closed_date = now()
+            WHERE id = %s
+        """, (opp_id,))
+
+        # 2. Close volunteer applications tied to this opportunity
+        cur.execute("""
+            UPDATE applications
+            SET status = 'Closed-Completed'
+            WHERE opportunity_id = %s
+            AND status IN ('Assigned', 'Pending')
+        """, (opp_id,))
+
+        # 3. Remove all champions from this opportunity
+        cur.execute("""
+            DELETE FROM champions_opportunities
+            WHERE opportunity_id = %s
+        """, (opp_id,))
+
+        # 4. Sweep stored images nothing refers to any more. Closed
+        #    opportunities keep their own image so reopening restores it.
+        collect_image_garbage(cur)
+
+    invalidate_cache(
+        OPEN_OPPORTUNITIES_KEY,
+        opportunity_champions_key(opp_id),
+        champion_candidates_key("*"),
+    )
     return jsonify({
         "message": "Opportunity closed. All assigned volunteers have been closed out and all champions removed."
     })
@@ -1170,52 +2691,92 @@ def remove_champion():
     champion_id = request.form.get("champion_id")
     opportunity_id = request.form.get("opportunity_id")
 
-    with get_db_connection() as conn:
-        with conn.cursor() as cur:
-            cur.execute("""
-                DELETE FROM champions_opportunities
-                WHERE champion_id = %s AND opportunity_id = %s
-            """, (champion_id, opportunity_id))
+    conn = get_db()
+    with conn.cursor() as cur:
+        cur.execute("""
+            DELETE FROM champions_opportunities
+            WHERE champion_id = %s AND opportunity_id = %s
+        """, (champion_id, opportunity_id))
 
+    invalidate_cache(opportunity_champions_key(opportunity_id))
     return jsonify({"message": "Champion removed."})
 
-@app.route("/api/opportunity/<int:opp_id>", methods=["GET"])
-def api_get_opportunity(opp_id):
-    with get_db_connection() as conn:
-        with conn.cursor() as cur:
-            cur.execute("""
-                SELECT id, title, time, duration, mode, location,
-                       requirements, desc, tags, image_base64
-                FROM opportunities
-                WHERE id = %s
-            """, (opp_id,))
-            row = cur.fetchone()
-
-            if not row:
-                return jsonify({"error": "Opportunity not found"}), 404
+# /api/opportunity response field -> columns it is built from
+OPPORTUNITY_API_FIELDS = {
+    "id": ["id"],
+    "title": ["title"],
+    "time": ["time"],
+    "duration": ["duration"],
+    "mode": ["mode"],
+    "location": ["location"],
+    "requirements": ["requirements"],
+    "desc": ["description"],
+    "tags": ["tags"],
+    "image_url": ["id", "image_hash"],
+    "closed": ["closed"],
+    "closed_date": ["closed_date"],
+}
+
+
+def serialize_opportunity_field(row: dict, field: str):
+    if field == "desc":
+        return row["description"]
+    if field == "image_url":
+        return opportunity_image_url(row)
+    if field == "closed_date":
+        return format_timestamp(row["closed_date"]) or None
+    if field == "tags":
+        # Parse tags if stored as JSON string
+        try:
+            parsed = json.loads(row["tags"]) if row["tags"] else []
+        except Exception:
+            parsed = []
+        return parsed if isinstance(parsed, list) else []
+    return row[field]
 
-            # Parse tags if stored as JSON string
-            tags = []
-            if row[8]:
-                try:
-                    parsed = json.loads(row[8])
-                    if isinstance(parsed, list):
-                        tags = parsed
-                except Exception:
-                    tags = []
 
-            return jsonify({
-                "id": row[0],
-                "title": row[1],
-                "time": row[2],
-                "duration": row[3],
-                "mode": row[4],
-                "location": row[5],
-                "requirements": row[6],
-                "desc": row[7],
-                "tags": tags,
-                "image_base64": row[9]
-            })
+@app.route("/api/opportunity/<int:opp_id>", methods=["GET"])
+def api_get_opportunity(opp_id):
+    """
+    Opportunity detail as JSON. ?fields=title,tags,... limits the response
+    (and the query) to those OPPORTUNITY_API_FIELDS.
+    """
+    try:
+        fields = fields_from_args(request.args, OPPORTUNITY_API_FIELDS)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if fields is None:
+        # Default shape, as the manage page expects
+        fields = [f for f in OPPORTUNITY_API_FIELDS if f not in ("closed", "closed_date")]
+
+    columns = []
+    for field in fields:
+        for column in OPPORTUNITY_API_FIELDS[field]:
+            if column not in columns:
+                columns.append(column)
+
+    conn = get_db()
+    with conn.cursor() as cur:
+        # Validators first: a client with a current copy costs one index lookup
+        cur.execute("SELECT updated_at FROM opportunities WHERE id = %s", (opp_id,))
+        row = cur.fetchone()
+        if not row:
+            return jsonify({"error": "Opportunity not found"}), 404
+
+        updated_at = row["updated_at"]
+        etag = weak_etag("opportunity", opp_id, updated_at, fields)
+        cached_response = not_modified(etag, updated_at)
+        if cached_response:
+            return cached_response
+
+        cur.execute(
+            f"SELECT {select_columns(OPPORTUNITY_FIELDS, columns)} FROM opportunities WHERE id = %s",
+            (opp_id,),
+        )
+        row = cur.fetchone()
+
+    response = jsonify({field: serialize_opportunity_field(row, field) for field in fields})
+    return with_validators(response, etag, updated_at)
 
 
 @app.route("/reopen_opportunity/<int:opp_id>", methods=["POST"])
@@ -1224,17 +2785,18 @@ def reopen_opportunity(opp_id):
     if auth:
         return auth
 
-    with get_db_connection() as conn:
-        with conn.cursor() as cur:
-            cur.execute(
-                """
-                UPDATE opportunities
-                SET closed = FALSE, closed_date = NULL
-                WHERE id = %s
-                """,
-                (opp_id,),
-            )
-
+    conn = get_db()
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            UPDATE opportunities
+            SET closed = FALSE, closed_date = NULL
+            WHERE id = %s
+            """,
+            (opp_id,),
+        )
+
+    invalidate_cache(OPEN_OPPORTUNITIES_KEY)
     return jsonify({"message": "Opportunity reopened."})
 
 
@@ -1248,55 +2810,49 @@ def closed_opportunities():
     if auth:
         return auth
 
-    with get_db_connection() as conn:
-        with conn.cursor() as cur:
-            cur.execute("SELECT * FROM opportunities WHERE closed IS TRUE")
-            opp_rows = cur.fetchall()
-
-            cur.execute("SELECT * FROM applications")
-            apps_rows = cur.fetchall()
+    limit = page_size_from_args(request.args, default=20)
+
+    conn = get_db()
+    with conn.cursor() as cur:
+        # Opportunities closed before close times were recorded sort last.
+        opp_rows, next_cursor = fetch_keyset_page(
+            cur,
+            f"""
+            SELECT {CLOSED_OPPORTUNITY_LIST_COLUMNS}, COALESCE(closed_date, 'epoch'::timestamptz) AS closed_sort
+            FROM opportunities
+            WHERE closed IS TRUE
+            """,
+            [],
+            request.args.get("cursor"),
+            limit,
+            sort_column="COALESCE(closed_date, 'epoch'::timestamptz)",
+            sort_key="closed_sort",
+        )
+
+        # Volunteers for just the opportunities on this page
+        volunteers_by_opp = {}
+        if opp_rows:
+            cur.execute(
+                """
+                SELECT opportunity_id, first_name, last_name, email, timestamp
+                FROM applications
+                WHERE opportunity_id = ANY(%s)
+                ORDER BY timestamp DESC, id DESC
+                """,
+                ([r["id"] for r in opp_rows],),
+            )
+            for v in cur.fetchall():
+                volunteers_by_opp.setdefault(v["opportunity_id"], []).append(v)
 
-    opportunities = dictify_rows(opp_rows)
-    applications = dictify_rows(apps_rows)
+    opportunities = [normalize_opportunity(dict(r)) for r in opp_rows]
 
     for opp in opportunities:
-        tags_raw = opp.get("tags")
-        if isinstance(tags_raw, str) and tags_raw.strip():
-            try:
-                opp["tags"] = json.loads(tags_raw)
-            except json.JSONDecodeError:
-                opp["tags"] = []
-        elif tags_raw is None:
-            opp["tags"] = []
-
-        if "description" in opp and "desc" not in opp:
-            opp["desc"] = opp["description"]
-
-        opp["frequency"] = opp.get("mode", "")
-
-    for app_entry in applications:
-        history_raw = app_entry.get("history")
-        if isinstance(history_raw, str) and history_raw.strip():
-            try:
-                app_entry["history"] = json.loads(history_raw)
-            except json.JSONDecodeError:
-                app_entry["history"] = []
-        else:
-            app_entry["history"] = []
-
-        notes_raw = app_entry.get("notes")
-        if isinstance(notes_raw, str) and notes_raw.strip():
-            try:
-                app_entry["notes"] = json.loads(notes_raw)
-            except json.JSONDecodeError:
-                app_entry["notes"] = []
-        else:
-            app_entry["notes"] = []
+        opp["volunteers"] = volunteers_by_opp.get(opp["id"], [])
 
     return render_template(
         "closed.html",
         opportunities=opportunities,
-        applications=applications,
+        next_url=next_page_url(next_cursor),
     )
 
 
@@ -1326,79 +2882,32 @@ def view_applicants(opp_id):
         return redirect(url_for("index"))
 
 
-    with get_db_connection() as conn:
-        with conn.cursor() as cur:
-            cur.execute(
-                "SELECT id, title, time, duration, mode, description, requirements, "
-                "location, image_base64, tags, closed, closed_date "
-                "FROM opportunities WHERE id = %s",
-                (opp_id,),
-            )
-            row = cur.fetchone()
+    conn = get_db()
+    with conn.cursor() as cur:
+        cur.execute(
+            f"SELECT {OPPORTUNITY_DETAIL_COLUMNS} FROM opportunities WHERE id = %s",
+            (opp_id,),
+        )
+        row = cur.fetchone()
 
-            if not row:
-                return "Opportunity not found", 404
-
-            # Convert opportunity row to dict correctly
-            opportunity = dict(row)
-            if "description" in opportunity:
-                opportunity["desc"] = opportunity["description"]
-
-            # Normalize tags
-            tags_raw = opportunity.get("tags")
-            if isinstance(tags_raw, str) and tags_raw.strip():
-                try:
-                    opportunity["tags"] = json.loads(tags_raw)
-                except json.JSONDecodeError:
-                    opportunity["tags"] = []
-            elif tags_raw is None:
-                opportunity["tags"] = []
-            opportunity["frequency"] = opportunity.get("mode", "")
-
-
-            # Fetch applicants using the same logic you tested in DBeaver:
-            # match applications whose title matches this opportunity's title,
-            # case-insensitive and trimmed
-            cur.execute(
-                """
-                SELECT
-                    id, first_name, last_name, email, phone, contact,
-                    title, time, duration, mode, location,
-                    comments, status, timestamp, history, notes
-                FROM applications
-                WHERE LOWER(TRIM(title)) = LOWER(
-                    TRIM(
-                        (SELECT title FROM opportunities WHERE id = %s)
-                    )
-                )
-                ORDER BY timestamp DESC
-                """,
-                (opp_id,),
-            )
-            rows = cur.fetchall()
+        if not row:
+            return "Opportunity not found", 404
 
-    applicants = []
-    for r in rows:
-        app_entry = dict(r)
+        opportunity = normalize_opportunity(dict(row))
 
-        history_raw = app_entry.get("history")
-        if isinstance(history_raw, str) and history_raw.strip():
-            try:
-                app_entry["history"] = json.loads(history_raw)
-            except json.JSONDecodeError:
-                app_entry["history"] = []
-        else:
-            app_entry["history"] = []
 
-        notes_raw = app_entry.get("notes")
-        if isinstance(notes_raw, str) and notes_raw.strip():
-            try:
-                app_entry["notes"] = json.loads(notes_raw)
-            except json.JSONDecodeError:
-                app_entry["notes"] = []
-        else:
-            app_entry["notes"] = []
+        # Fetch applicants linked to this opportunity, one page at a time
+        rows, next_cursor = fetch_keyset_page(
+            cur,
+            f"SELECT {APPLICATION_DETAIL_COLUMNS} FROM applications WHERE opportunity_id = %s",
+            [opp_id],
+            request.args.get("cursor"),
+            page_size_from_args(request.args),
+        )
 
+    applicants = []
+    for r in rows:
+        app_entry = dict(r)
         applicants.append(app_entry)
 
     # Back button behavior:
@@ -1420,6 +2929,7 @@ def view_applicants(opp_id):
         applicants=applicants,
         back_to_menu_url=back_to_menu_url,
         champion_mode=is_champion_view,
+        next_url=next_page_url(next_cursor),
     )
 
 
@@ -1446,95 +2956,89 @@ def check_volunteer():
         "champion_assignments": [],
     }
 
-    with get_db_connection() as conn:
-        with conn.cursor() as cur:
-            cur.execute(
-                """
-                SELECT *
-                FROM applications
-                WHERE LOWER(email) = %s
-                ORDER BY timestamp DESC
-                """,
-                (email,),
-            )
-            rows = cur.fetchall()
-
-            if rows:
-                latest = rows[0]
-                response["exists"] = True
-                response["first_name"] = latest.get("first_name") or ""
-                response["last_name"] = latest.get("last_name") or ""
-                response["email"] = latest.get("email") or ""
-                response["phone"] = latest.get("phone") or ""
-
-                session_email = (session.get("verified_email") or "").strip().lower()
-                session_verified = session.get("email_verified", False)
-
-                if session_verified and session_email == email:
-                    response["activation_message"] = ""
-                    response["redirect"] = "/?verified=1"
-                else:
-                    send_activation_email(email)
-                    response[
-                        "activation_message"
-                    ] = "We just sent a verification email. Please click the link in that email so you can submit your application."
+    conn = get_db()
+    with conn.cursor() as cur:
+        # Only the latest application's contact details are needed here
+        cur.execute(
+            """
+            SELECT first_name, last_name, email, phone
+            FROM applications
+            WHERE LOWER(email) = %s
+            ORDER BY timestamp DESC
+            LIMIT 1
+            """,
+            (email,),
+        )
+        latest = cur.fetchone()
+
+        if latest:
+            response["exists"] = True
+            response["first_name"] = latest.get("first_name") or ""
+            response["last_name"] = latest.get("last_name") or ""
+            response["email"] = latest.get("email") or ""
+            response["phone"] = latest.get("phone") or ""
+
+            session_email = (session.get("verified_email") or "").strip().lower()
+            session_verified = session.get("email_verified", False)
+
+            if session_verified and session_email == email:
+                response["activation_message"] = ""
+                response["redirect"] = "/?verified=1"
+            else:
+                response["activation_message"] = activation_message(queue_activation_email(email))
 #add Assigned
-                if response["exists"] and response.get("activation_message", "") == "":
-                    cur.execute(
-                        """
-                        SELECT
-                            a.timestamp AS submitted_at,
-                            a.title,
-                            a.status,
-                            o.time        AS time_commitment,
-                            o.duration    AS duration,
-                            o.mode        AS frequency,
-                            o.location    AS location
-                        FROM applications a
-                        LEFT JOIN opportunities o
-                            ON a.title = o.title
-                        WHERE
-                            LOWER(a.email) = %s
-                           AND a.status IN ('Assigned', 'Pending')
-                        ORDER BY a.timestamp DESC
-                        """,
-                        (email,),
+            if response["exists"] and response.get("activation_message", "") == "":
+                cur.execute(
+                    """
+                    SELECT
+                        a.timestamp AS submitted_at,
+                        a.title,
+                        a.status,
+                        o.time        AS time_commitment,
+                        o.duration    AS duration,
+                        o.mode        AS frequency,
+                        o.location    AS location
+                    FROM applications a
+                    LEFT JOIN opportunities o
+                        ON o.id = a.opportunity_id
+                    WHERE
+                        LOWER(a.email) = %s
+                       AND a.status IN ('Assigned', 'Pending')
+                    ORDER BY a.timestamp DESC
+                    """,
+                    (email,),
+                )
+                assignment_rows = cur.fetchall()
+                assignments = []
+                for row in assignment_rows:
+                    assignments.append(
+                        {
+                            "submitted_at": format_timestamp(row.get("submitted_at")),
+                            "title": row.get("title"),
+                            "status": row.get("status"), 
+                            "time_commitment": row.get("time_commitment"),
+                            "duration": row.get("duration"),
+                            "frequency": row.get("frequency"),
+                            "location": row.get("location"),
+                        }
                     )
-                    assignment_rows = cur.fetchall()
-                    assignments = []
-                    for row in assignment_rows:
-                        assignments.append(
-                            {
-                                "submitted_at": row.get("submitted_at"),
-                                "title": row.get("title"),
-                                "status": row.get("status"), 
-                                "time_commitment": row.get("time_commitment"),
-                                "duration": row.get("duration"),
-                                "frequency": row.get("frequency"),
-                                "location": row.get("location"),
-                            }
-                        )
-                    response["assignments"] = assignments
-            else:
-                send_activation_email(email)
-                response[
-                    "activation_message"
-                ] = "We just sent a verification email. Please click the link in that email so you can submit your application."
-    # Load champion assignments for this email
-    with get_db_connection() as conn:
-        with conn.cursor() as cur:
-            cur.execute(
-                """
-                SELECT o.id AS opp_id, o.title
-                FROM champions_opportunities co
-                JOIN applications a ON co.champion_id = a.id
-                JOIN opportunities o ON co.opportunity_id = o.id
-                WHERE LOWER(a.email) = %s
-                ORDER BY o.title
-                """,
-                (email,),
-            )
-            rows = cur.fetchall()
+                response["assignments"] = assignments
+        else:
+            response["activation_message"] = activation_message(queue_activation_email(email))
+
+        # Load champion assignments for this email
+        cur.execute(
+            """
+            SELECT o.id AS opp_id, o.title
+            FROM champions_opportunities co
+            JOIN applications a ON co.champion_id = a.id
+            JOIN opportunities o ON co.opportunity_id = o.id
+            WHERE LOWER(a.email) = %s
+            ORDER BY o.title
+            """,
+            (email,),
+        )
+        rows = cur.fetchall()
 
     champions = []
     for r in rows:
@@ -1555,33 +3059,30 @@ def review():
     if auth:
         return auth
 
-    with get_db_connection() as conn:
-        with conn.cursor() as cur:
-            cur.execute("SELECT * FROM applications ORDER BY timestamp DESC")
-            rows = cur.fetchall()
+    # Optional window, e.g. ?days=7 or ?from=2025-11-01&to=2025-11-30
+    start, end = date_range_from_args(request.args)
+    range_sql, range_params = date_range_clause("timestamp", start, end)
 
-    applications = dictify_rows(rows)
+    limit = page_size_from_args(request.args)
 
-    for app_entry in applications:
-        history_raw = app_entry.get("history")
-        if isinstance(history_raw, str) and history_raw.strip():
-            try:
-                app_entry["history"] = json.loads(history_raw)
-            except json.JSONDecodeError:
-                app_entry["history"] = []
-        else:
-            app_entry["history"] = []
+    conn = get_db()
+    with conn.cursor() as cur:
+        rows, next_cursor = fetch_keyset_page(
+            cur,
+            f"SELECT {APPLICATION_DETAIL_COLUMNS} FROM applications WHERE TRUE" + range_sql,
+            range_params,
+            request.args.get("cursor"),
+            limit,
+        )
 
-        notes_raw = app_entry.get("notes")
-        if isinstance(notes_raw, str) and notes_raw.strip():
-            try:
-                app_entry["notes"] = json.loads(notes_raw)
-            except json.JSONDecodeError:
-                app_entry["notes"] = []
-        else:
-            app_entry["notes"] = []
+    applications = dictify_rows(rows)
 
-    return render_template("review.html", applications=applications)
+    return render_template(
+        "review.html",
+        applications=applications,
+        days=request.args.get("days", type=int),
+        next_url=next_page_url(next_cursor),
+    )
 
 
 @app.route("/update_status/<int:app_id>", methods=["POST"])
@@ -1596,10 +3097,9 @@ def update_status(app_id):
     Champions:
         can update only applications for opportunities they champion
     """
-    # Prefer explicit opp_id from the front end, fall back to lookup by title
-    opp_id = request.args.get("opp_id", type=int)
-    if opp_id is None:
-        opp_id = get_opportunity_id_for_application(app_id)
+    # Always from the application itself: a ?opp_id= from the client would let
+    # a champion act on applications for opportunities they do not champion
+    opp_id = get_opportunity_id_for_application(app_id)
 
     # Permission check
     can_manage = False
@@ -1612,7 +3112,6 @@ def update_status(app_id):
         return jsonify({"error": "Not authorized"}), 403
 
     new_status = request.form.get("status", "Pending")
-    ts = datetime.now().strftime("%Y-%m-%d %H:%M")
 
     allowed_statuses = {
         "Pending",
@@ -1624,56 +3123,37 @@ def update_status(app_id):
     if new_status not in allowed_statuses:
         new_status = "Pending"
 
-    with get_db_connection() as conn:
-        with conn.cursor() as cur:
-            cur.execute(
-                "SELECT history FROM applications WHERE id = %s",
-                (app_id,),
-            )
-            row = cur.fetchone()
-            if not row:
-                return jsonify({"error": "Application not found"}), 404
-
-            # FIX: RealDictCursor returns dict, not tuple
-            history_raw = row.get("history") or "[]"
-
-            try:
-                history_list = json.loads(history_raw)
-            except json.JSONDecodeError:
-                history_list = []
-
-            history_list.append(
-                {
-                    "event": f"Status updated to {new_status}",
-                    "timestamp": ts,
-                }
-            )
-
-            cur.execute(
-                """
-                UPDATE applications
-                SET status = %s, history = %s
-                WHERE id = %s
-                """,
-                (new_status, json.dumps(history_list), app_id),
-            )
-            # ==========================================
-            # AUTO-PROMOTE TO CHAMPION IF ASSIGNED
-            # ==========================================
-            cur.execute(
-                "SELECT title FROM applications WHERE id = %s",
-                (app_id,)
-            )
-            row2 = cur.fetchone()
-
-            if row2 and row2.get("title", "").strip().lower() == "champion-leader":
-                if new_status == "Assigned":
-                    cur.execute(
-                        "UPDATE applications SET is_champion = TRUE WHERE id = %s",
-                        (app_id,)
+    conn = get_db()
+    with conn.cursor() as cur:
+        # Set the status and auto-promote Assigned Champion-Leader
+        # applicants to champion in one statement.
+        cur.execute(
+            """
+            UPDATE applications
+            SET status = %s,
+                is_champion = CASE
+                    WHEN %s = 'Assigned' AND EXISTS (
+                        SELECT 1
+                        FROM opportunities o
+                        WHERE o.id = applications.opportunity_id
+                          AND LOWER(TRIM(o.title)) = 'champion-leader'
                     )
-            conn.commit()
-
+                    THEN TRUE
+                    ELSE is_champion
+                END
+            WHERE id = %s
+            RETURNING id
+            """,
+            (new_status, new_status, app_id),
+        )
+        if cur.fetchone() is None:
+            return jsonify({"error": "Application not found"}), 404
+
+        record_application_event(
+            cur, app_id, "event", f"Status updated to {new_status}", current_user_email()
+        )
+
+    invalidate_cache(CHAMPIONS_KEY, champion_candidates_key("*"))
     return jsonify({"message": "Status updated successfully"})
 
 
@@ -1684,16 +3164,127 @@ def delete_application(app_id):
     if auth:
         return auth
 
-    with get_db_connection() as conn:
-        with conn.cursor() as cur:
-            cur.execute("DELETE FROM applications WHERE id = %s", (app_id,))
+    conn = get_db()
+    with conn.cursor() as cur:
+        cur.execute("DELETE FROM applications WHERE id = %s", (app_id,))
 
+    invalidate_cache(
+        CHAMPIONS_KEY, champion_candidates_key("*"), opportunity_champions_key("*")
+    )
     return jsonify({"message": "Application deleted successfully."})
 
 
 # =====
 # Volunteers overview
 # =====
+# Full name as one searchable string. Must match the expression of
+# applications_name_trgm_idx so name filters can use the index.
+VOLUNTEER_NAME_SQL = "(COALESCE(first_name, '') || ' ' || COALESCE(last_name, ''))"
+
+# ?<filter>=text -> column it is matched against (case-insensitive substring).
+# Each has a trigram index (migrations 7 and 18); ?q= needs all of them.
+VOLUNTEER_FILTER_COLUMNS = {
+    "name": VOLUNTEER_NAME_SQL,
+    "email": "email",
+    "phone": "phone",
+    "contact": "contact",
+    "opportunity": "title",
+    "status": "status",
+}
+
+# ?sort=<key> -> ORDER BY expression. None-safe so keyset comparisons work.
+# Each must match the expression of an (expr, id) index (migrations 7 and 18).
+VOLUNTEER_SORTS = {
+    "date": "timestamp",
+    "name": f"LOWER({VOLUNTEER_NAME_SQL})",
+    "email": "LOWER(COALESCE(email, ''))",
+    "phone": "COALESCE(phone, '')",
+    "contact": "LOWER(COALESCE(contact, ''))",
+    "opportunity": "LOWER(COALESCE(title, ''))",
+    "status": "COALESCE(status, '')",
+}
+
+
+def like_pattern(term: str) -> str:
+    """Substring ILIKE pattern for term with LIKE wildcards escaped."""
+    escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def date_prefix_range(text: str) -> tuple[datetime, datetime] | None:
+    """
+    Turn a date filter such as "2025", "2025-11" or "2025-11-03" into a
+    half-open range in APP_TIMEZONE, so it can use the timestamp index.
+    """
+    for fmt, step in (("%Y-%m-%d", "day"), ("%Y-%m", "month"), ("%Y", "year")):
+        try:
+            start = datetime.strptime(text, fmt).replace(tzinfo=APP_TIMEZONE)
+        except ValueError:
+            continue
+        if step == "day":
+            end = start + timedelta(days=1)
+        elif step == "month":
+            end = start.replace(year=start.year + start.month // 12, month=start.month % 12 + 1)
+        else:
+            end = start.replace(year=start.year + 1)
+        return start, end
+    return None
+
+
+def query_volunteers(cur, args) -> tuple[list, str | None]:
+    """
+    One page of the volunteers table for the given query-string filters.
+
+    Supports the ?days=/from=/to= window, ?date= (a date prefix), one
+    substring filter per VOLUNTEER_FILTER_COLUMNS key, ?q= across all of
+    them, ?sort= (a VOLUNTEER_SORTS key), ?dir=asc|desc, ?cursor= and ?limit=.
+    Raises ValueError for an unknown sort key or unparsable date.
+    """
+    sort = args.get("sort") or "date"
+    if sort not in VOLUNTEER_SORTS:
+        raise ValueError(f"Unknown sort key: {sort}")
+    descending = (args.get("dir") or ("desc" if sort == "date" else "asc")).lower() != "asc"
+    sort_expr = VOLUNTEER_SORTS[sort]
+
+    start, end = date_range_from_args(args)
+    where, params = date_range_clause("timestamp", start, end)
+
+    date_text = (args.get("date") or "").strip()
+    if date_text:
+        day_range = date_prefix_range(date_text)
+        if not day_range:
+            raise ValueError("Date filter must look like YYYY, YYYY-MM or YYYY-MM-DD")
+        range_sql, range_params = date_range_clause("timestamp", *day_range)
+        where += range_sql
+        params += range_params
+
+    for key, column in VOLUNTEER_FILTER_COLUMNS.items():
+        term = (args.get(key) or "").strip()
+        if term:
+            where += f" AND {column} ILIKE %s"
+            params.append(like_pattern(term))
+
+    q = (args.get("q") or "").strip()
+    if q:
+        pattern = like_pattern(q)
+        columns = list(VOLUNTEER_FILTER_COLUMNS.values())
+        where += " AND (" + " OR ".join(f"{c} ILIKE %s" for c in columns) + ")"
+        params += [pattern] * len(columns)
+
+    return fetch_keyset_page(
+        cur,
+        f"SELECT {APPLICATION_LIST_COLUMNS}, {sort_expr} AS sort_value "
+        f"FROM applications WHERE TRUE{where}",
+        params,
+        args.get("cursor"),
+        page_size_from_args(args),
+        sort_column=sort_expr,
+        sort_key="sort_value",
+        descending=descending,
+        time_sort=(sort == "date"),
+    )
+
+
 @app.route("/volunteers")
 def volunteers():
     session.permanent = True
@@ -1701,33 +3292,134 @@ def volunteers():
     if auth:
         return auth
 
-    with get_db_connection() as conn:
-        with conn.cursor() as cur:
-            cur.execute("SELECT * FROM applications ORDER BY timestamp DESC")
-            rows = cur.fetchall()
+    # Rows are loaded page by page from /api/volunteers
+    return render_template(
+        "volunteers.html",
+        days=request.args.get("days", type=int),
+    )
 
-    applications = dictify_rows(rows)
 
-    for app_entry in applications:
-        history_raw = app_entry.get("history")
-        if isinstance(history_raw, str) and history_raw.strip():
-            try:
-                app_entry["history"] = json.loads(history_raw)
-            except json.JSONDecodeError:
-                app_entry["history"] = []
-        else:
-            app_entry["history"] = []
+@app.route("/api/volunteers")
+def api_volunteers():
+    if not session.get("admin_verified"):
+        return jsonify({"error": "Not authorized"}), 403
 
-        notes_raw = app_entry.get("notes")
-        if isinstance(notes_raw, str) and notes_raw.strip():
-            try:
-                app_entry["notes"] = json.loads(notes_raw)
-            except json.JSONDecodeError:
-                app_entry["notes"] = []
-        else:
-            app_entry["notes"] = []
+    conn = get_db()
+    with conn.cursor() as cur:
+        try:
+            rows, next_cursor = query_volunteers(cur, request.args)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+    applications = []
+    for r in rows:
+        applications.append({
+            "id": r["id"],
+            "first_name": r["first_name"],
+            "last_name": r["last_name"],
+            "email": r["email"],
+            "phone": r["phone"],
+            "contact": r["contact"],
+            "title": r["title"],
+            "status": r["status"],
+            "timestamp": format_timestamp(r["timestamp"]),
+            "url": url_for("volunteer_detail", app_id=r["id"]),
+        })
+
+    return jsonify({"applications": applications, "next_cursor": next_cursor})
+
+
+# =====
+# Search
+# =====
+def search_tsquery(term: str) -> str | None:
+    """
+    Turn free text into a prefix-matching tsquery string, e.g.
+    "jan smi" -> "jan:* & smi:*". Returns None if there is nothing to search.
+    Only word-ish characters (plus @ . + - for emails and phones) survive, so
+    the result is always valid to_tsquery input.
+    """
+    tokens = [t for t in re.findall(r"[\w@.+-]+", term) if re.search(r"\w", t)]
+    if not tokens:
+        return None
+    return " & ".join(f"{t}:*" for t in tokens)
+
+
+# Full-text rank plus trigram word similarity on name and email, so exact
+# words rank first and typos ("jonh") still find a match.
+SEARCH_SQL = f"""
+    SELECT * FROM (
+        SELECT {APPLICATION_LIST_COLUMNS},
+               -- real would not survive the trip through the JSON cursor
+               -- exactly; as double precision it compares equal again
+               (ts_rank(search_vector, to_tsquery('simple', %s))
+                 + GREATEST(
+                     word_similarity(%s, {VOLUNTEER_NAME_SQL}),
+                     word_similarity(%s, COALESCE(email, ''))
+                   ))::double precision AS rank
+        FROM applications
+        WHERE (search_vector @@ to_tsquery('simple', %s)
+               OR %s <%% {VOLUNTEER_NAME_SQL}
+               OR %s <%% email)
+          {{scope}}
+    ) matches
+    WHERE TRUE
+"""
+
+
+@app.route("/api/search")
+def api_search():
+    """
+    Ranked search over applications: ?q=<text>&cursor=&limit=.
+
+    Admins search everything. Champions only see applications for the
+    opportunities they can manage (see user_can_manage_opportunity).
+    """
+    q = (request.args.get("q") or "").strip()
+    tsq = search_tsquery(q)
+    if not tsq:
+        return jsonify({"error": "Search term is required"}), 400
+
+    # Placeholder order in SEARCH_SQL: rank (tsq, q, q), then match (tsq, q, q)
+    params = [tsq, q, q, tsq, q, q]
+    scope = ""
+    if not session.get("admin_verified"):
+        opp_ids = champion_opportunity_ids()
+        if not opp_ids:
+            return jsonify({"error": "Not authorized"}), 403
+        scope = "AND opportunity_id = ANY(%s)"
+        params.append(opp_ids)
+
+    conn = get_db()
+    with conn.cursor() as cur:
+        rows, next_cursor = fetch_keyset_page(
+            cur,
+            SEARCH_SQL.format(scope=scope),
+            params,
+            request.args.get("cursor"),
+            page_size_from_args(request.args, default=20),
+            sort_column="rank",
+            time_sort=False,
+        )
+
+    results = []
+    for r in rows:
+        results.append({
+            "id": r["id"],
+            "first_name": r["first_name"],
+            "last_name": r["last_name"],
+            "email": r["email"],
+            "phone": r["phone"],
+            "contact": r["contact"],
+            "title": r["title"],
+            "opportunity_id": r["opportunity_id"],
+            "status": r["status"],
+            "timestamp": format_timestamp(r["timestamp"]),
+            "rank": round(r["rank"], 4),
+            "url": url_for("volunteer_detail", app_id=r["id"]),
+        })
 
-    return render_template("volunteers.html", applications=applications)
+    return jsonify({"results": results, "next_cursor": next_cursor})
 
 
 # =====
@@ -1758,72 +3450,22 @@ def volunteer_detail(app_id):
     if not can_manage:
         can_manage = False
 
-    with get_db_connection() as conn:
-        with conn.cursor() as cur:
-            cur.execute(
-                """
-                SELECT id, first_name, last_name, email, phone, contact,
-                       title, time, duration, mode, location,
-                       comments, status, timestamp, history, notes
-                FROM applications
-                WHERE id = %s
-                """,
-                (app_id,),
-            )
-            row = cur.fetchone()
-
-            if not row:
-                return "Application not found", 404
-
-            cols = [
-                "id",
-                "first_name",
-                "last_name",
-                "email",
-                "phone",
-                "contact",
-                "title",
-                "time",
-                "duration",
-                "mode",
-                "location",
-                "comments",
-                "status",
-                "timestamp",
-                "history",
-                "notes",
-            ]
-            app_entry = dict(row)
-
+    conn = get_db()
+    with conn.cursor() as cur:
+        cur.execute(
+            f"SELECT {APPLICATION_DETAIL_COLUMNS} FROM applications WHERE id = %s",
+            (app_id,),
+        )
+        row = cur.fetchone()
 
-            history_raw = app_entry.get("history")
-            if isinstance(history_raw, str) and history_raw.strip():
-                try:
-                    app_entry["history"] = json.loads(history_raw)
-                except json.JSONDecodeError:
-                    app_entry["history"] = []
-            else:
-                app_entry["history"] = []
-
-            notes_raw = app_entry.get("notes")
-            if isinstance(notes_raw, str) and notes_raw.strip():
-                try:
-                    app_entry["notes"] = json.loads(notes_raw)
-                except json.JSONDecodeError:
-                    app_entry["notes"] = []
-            else:
-                app_entry["notes"] = []
+        if not row:
+            return "Application not found", 404
 
-            # Try to look up the opportunity id again by title, in case it was missing
-            if opp_id is None:
-                cur.execute(
-                    "SELECT id FROM opportunities WHERE title = %s",
-                    (app_entry.get("title", ""),),
-                )
-                row2 = cur.fetchone()
-                if row2:
-                    opp_id = row2["id"]
+        app_entry = dict(row)
 
+        # First page of each; the template loads older entries on demand
+        notes, notes_cursor = load_application_events(cur, app_id, kind="note")
+        history, history_cursor = load_application_events(cur, app_id)
 
     back_opp_id = opp_id
     is_champion_view = not session.get("admin_verified")
@@ -1832,6 +3474,10 @@ def volunteer_detail(app_id):
     return render_template(
         "review_detail.html",
         app=app_entry,
+        notes=notes,
+        notes_cursor=notes_cursor,
+        history=history,
+        history_cursor=history_cursor,
         back_opp_id=back_opp_id,
         champion_mode=is_champion_view,
         allow_delete=allow_delete,
@@ -1840,28 +3486,73 @@ def volunteer_detail(app_id):
 
 @app.route("/api/applicant/<int:app_id>")
 def api_get_applicant(app_id):
-    with get_db_connection() as conn:
-        with conn.cursor() as cur:
-            cur.execute("""
-                SELECT id, first_name, last_name, email, phone, contact,
-                       title, time, duration, mode, location,
-                       comments, status, timestamp, history, notes
-                FROM applications
-                WHERE id = %s
-            """, (app_id,))
-            row = cur.fetchone()
+    """
+    Applicant detail as JSON. ?fields=first_name,email,... limits the
+    response (and the query) to those APPLICATION_FIELDS.
+    """
+    try:
+        fields = fields_from_args(request.args, APPLICATION_FIELDS) or list(APPLICATION_FIELDS)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    conn = get_db()
+    with conn.cursor() as cur:
+        cur.execute("SELECT updated_at FROM applications WHERE id = %s", (app_id,))
+        row = cur.fetchone()
+        if not row:
+            return jsonify({"error": "Applicant not found"}), 404
+
+        updated_at = row["updated_at"]
+        etag = weak_etag("applicant", app_id, updated_at, fields)
+        cached_response = not_modified(etag, updated_at)
+        if cached_response:
+            return cached_response
+
+        cur.execute(
+            f"SELECT {select_columns(APPLICATION_FIELDS, fields)} FROM applications WHERE id = %s",
+            (app_id,),
+        )
+        row = cur.fetchone()
+
+    data = dict(row)
+    if "timestamp" in data:
+        data["timestamp"] = format_timestamp(data["timestamp"])
+
+    return with_validators(jsonify(data), etag, updated_at)
+
+
+@app.route("/api/applicant/<int:app_id>/events")
+def api_applicant_events(app_id):
+    """
+    One page of an applicant's history, newest first.
 
-    if not row:
-        return jsonify({"error": "Applicant not found"}), 404
+    Query parameters:
+        kind    "note" for notes only, "event" for status/history events;
+                omit for everything
+        cursor  next_cursor from the previous page
+        limit   page size (capped at MAX_PAGE_SIZE)
+    """
+    opp_id = get_opportunity_id_for_application(app_id)
+    if not session.get("admin_verified") and (
+        opp_id is None or not user_is_champion_for_opportunity(opp_id)
+    ):
+        return jsonify({"error": "Not authorized"}), 403
 
-    cols = [
-        "id", "first_name", "last_name", "email", "phone", "contact",
-        "title", "time", "duration", "mode", "location",
-        "comments", "status", "timestamp", "history", "notes"
-    ]
-    data = dict(zip(cols, row))
+    kind = request.args.get("kind")
+    if kind and kind not in EVENT_KINDS:
+        return jsonify({"error": "Unknown event kind"}), 400
 
-    return jsonify(data)
+    conn = get_db()
+    with conn.cursor() as cur:
+        events, next_cursor = load_application_events(
+            cur,
+            app_id,
+            kind=kind,
+            cursor=request.args.get("cursor"),
+            limit=page_size_from_args(request.args, default=20),
+        )
+
+    return jsonify({"events": events, "next_cursor": next_cursor})
 
 @app.route("/api/applicant/<int:app_id>/update", methods=["POST"])
 def api_update_applicant(app_id):
@@ -1871,26 +3562,23 @@ def api_update_applicant(app_id):
     if not new_status:
         return jsonify({"error": "Missing status"}), 400
 
-    with get_db_connection() as conn:
-        with conn.cursor() as cur:
-
-            # Save status
-            cur.execute("""
-                UPDATE applications
-                SET status = %s
-                WHERE id = %s
-            """, (new_status, app_id))
+    conn = get_db()
+    with conn.cursor() as cur:
 
-            # Append note (if provided)
-            if new_note and new_note.strip():
-                cur.execute("""
-                    UPDATE applications
-                    SET notes = COALESCE(notes, '') || %s
-                    WHERE id = %s
-                """, ("\n" + new_note.strip(), app_id))
+        # Save status
+        cur.execute("""
+            UPDATE applications
+            SET status = %s
+            WHERE id = %s
+        """, (new_status, app_id))
 
-        conn.commit()
+        # Append note (if provided)
+        if new_note and new_note.strip():
+            record_application_event(
+                cur, app_id, "note", new_note.strip(), current_user_email()
+            )
 
+    invalidate_cache(champion_candidates_key("*"))
     return jsonify({"success": True})
 
 
@@ -1909,66 +3597,32 @@ def view_applications(opp_id):
         if not user_is_champion_for_opportunity(opp_id):
             return redirect(url_for("index"))
 
-    with get_db_connection() as conn:
-        with conn.cursor() as cur:
+    conn = get_db()
+    with conn.cursor() as cur:
 
-            # Load opportunity
-            cur.execute("""
-                SELECT id, title, time, duration, mode, description,
-                       requirements, location, image_base64, tags, closed, closed_date
-                FROM opportunities
-                WHERE id = %s
-            """, (opp_id,))
-            row = cur.fetchone()
+        # Load opportunity
+        cur.execute(f"""
+            SELECT {OPPORTUNITY_DETAIL_COLUMNS}
+            FROM opportunities
+            WHERE id = %s
+        """, (opp_id,))
+        row = cur.fetchone()
 
-            if not row:
-                return "Opportunity not found", 404
+        if not row:
+            return "Opportunity not found", 404
 
-            opportunity = dict(row)
-            if "description" in opportunity:
-                opportunity["desc"] = opportunity["description"]
+        opportunity = normalize_opportunity(dict(row))
 
-            # Parse tags JSON
-            tags_raw = opportunity.get("tags")
-            try:
-                if tags_raw:
-                    opportunity["tags"] = json.loads(tags_raw)
-                else:
-                    opportunity["tags"] = []
-            except:
-                opportunity["tags"] = []
-
-            # Load applicants
-            cur.execute("""
-                SELECT id, first_name, last_name, email, phone, contact,
-                       title, time, duration, mode, location,
-                       comments, status, timestamp, history, notes
-                FROM applications
-                WHERE LOWER(TRIM(title)) = LOWER(
-                    TRIM((SELECT title FROM opportunities WHERE id = %s))
-                )
-                ORDER BY timestamp DESC
-            """, (opp_id,))
-            raw_rows = cur.fetchall()
+        # Load one page of applicants
+        raw_rows, next_cursor = fetch_keyset_page(cur, f"""
+            SELECT {APPLICATION_DETAIL_COLUMNS}
+            FROM applications
+            WHERE opportunity_id = %s
+        """, [opp_id], request.args.get("cursor"), page_size_from_args(request.args))
 
     applicants = []
     for r in raw_rows:
         a = dict(r)
-
-        # Parse history JSON
-        history_raw = a.get("history") or "[]"
-        try:
-            a["history"] = json.loads(history_raw)
-        except:
-            a["history"] = []
-
-        # Parse notes JSON
-        notes_raw = a.get("notes") or "[]"
-        try:
-            a["notes"] = json.loads(notes_raw)
-        except:
-            a["notes"] = []
-
         applicants.append(a)
 
     # Back button routing: Admins → manage, Champions → index
@@ -1985,7 +3639,8 @@ def view_applications(opp_id):
         "view_applications.html",
         opportunity=opportunity,
         applicants=applicants,
-        back_to_menu_url=back_to_menu_url
+        back_to_menu_url=back_to_menu_url,
+        next_url=next_page_url(next_cursor),
     )
 
 # =====
@@ -2007,10 +3662,9 @@ def add_note(app_id):
     if not note_text:
         return jsonify({"error": "Note cannot be empty."}), 400
 
-    # Prefer explicit opp_id from the front end, fall back to lookup
-    opp_id = request.args.get("opp_id", type=int)
-    if opp_id is None:
-        opp_id = get_opportunity_id_for_application(app_id)
+    # Always from the application itself: a ?opp_id= from the client would let
+    # a champion act on applications for opportunities they do not champion
+    opp_id = get_opportunity_id_for_application(app_id)
 
     # Permission check
     can_manage = False
@@ -2022,54 +3676,13 @@ def add_note(app_id):
     if not can_manage:
         return jsonify({"error": "Not authorized"}), 403
 
-    ts = datetime.now().strftime("%Y-%m-%d %H:%M")
-
-    with get_db_connection() as conn:
-        with conn.cursor() as cur:
-            cur.execute(
-                "SELECT history, notes FROM applications WHERE id = %s",
-                (app_id,),
-            )
-            row = cur.fetchone()
-            if not row:
-                return jsonify({"error": "Application not found"}), 404
-
-            # FIX: RealDictCursor returns dict keys, not tuple indices
-            history_raw = row.get("history") or "[]"
-            notes_raw = row.get("notes") or "[]"
-
-            try:
-                history_list = json.loads(history_raw)
-            except json.JSONDecodeError:
-                history_list = []
-
-            try:
-                notes_list = json.loads(notes_raw)
-            except json.JSONDecodeError:
-                notes_list = []
-
-            note_entry = {
-                "note": note_text,
-                "timestamp": ts,
-            }
-            notes_list.append(note_entry)
-
-            history_list.append(
-                {
-                    "event": f"Note added: {note_text}",
-                    "timestamp": ts,
-                }
-            )
+    conn = get_db()
+    with conn.cursor() as cur:
+        cur.execute("SELECT 1 FROM applications WHERE id = %s", (app_id,))
+        if cur.fetchone() is None:
+            return jsonify({"error": "Application not found"}), 404
 
-            cur.execute(
-                """
-                UPDATE applications
-                SET notes = %s, history = %s
-                WHERE id = %s
-                """,
-                (json.dumps(notes_list), json.dumps(history_list), app_id),
-            )
-            conn.commit()
+        record_application_event(cur, app_id, "note", note_text, current_user_email())
 
     return jsonify({"message": "Note added successfully"})
 
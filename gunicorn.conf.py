@@ -0,0 +1,60 @@
+"""
+Gunicorn settings for the KRAS volunteer app.
+
+Gunicorn loads this file automatically from the working directory. Worker
+count still comes from WEB_CONCURRENCY; the hooks below migrate the schema
+before workers start and keep the Postgres connection pool and cache
+listener in app.py safe under the pre-fork model.
+
+Postgres connections: each worker uses at most its pool (DB_POOL_MAX_SIZE,
+or its share of DB_MAX_CONNECTIONS) plus one for the cache listener, so
+the service needs WEB_CONCURRENCY * (pool + 1), plus one per
+`python outbox.py` worker. app._db_pool_max_size() does this sum when
+sizing from DB_MAX_CONNECTIONS.
+"""
+import os
+import sys
+
+
+def on_starting(server):
+    # Migrate in the master before any worker exists. Migrations can run
+    # for minutes (re-encoding images, building indexes); inside a worker's
+    # import the arbiter would kill it for missing its heartbeat. A failed
+    # migration stops gunicorn rather than serving an old schema.
+    if os.getenv("AUTO_MIGRATE", "1") == "0" or not os.getenv("DATABASE_URL"):
+        return
+
+    import migrations
+
+    applied = migrations.apply_migrations()
+    if applied:
+        server.log.info("Applied schema migrations: %s", applied)
+
+
+def when_ready(server):
+    # With preload_app the master imports app.py (which seeds the database)
+    # before forking. Release those connections so no worker inherits them.
+    app_module = sys.modules.get("app")
+    if app_module is not None:
+        app_module.close_db_pool()
+
+
+def post_worker_init(worker):
+    # Start listening for cache invalidations before the first request, so
+    # nothing published in between is missed.
+    app_module = sys.modules.get("app")
+    if app_module is not None:
+        app_module.ensure_cache_listener()
+        # Pick up mail queued while no worker was running
+        app_module.wake_outbox()
+
+
+def worker_exit(server, worker):
+    # Let the outbox thread finish the batch it is sending, then return
+    # this worker's connections to Postgres instead of dropping them, and
+    # say QUIT to the mail server.
+    app_module = sys.modules.get("app")
+    if app_module is not None:
+        app_module.stop_outbox()
+        app_module.close_db_pool()
+        app_module.smtp_pool.close()
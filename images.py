@@ -0,0 +1,205 @@
+"""
+Upload pipeline for opportunity images.
+
+process_image() validates an uploaded file with Pillow, re-encodes it without
+metadata (EXIF, GPS, comments) and renders the resized variants the site
+serves.
+
+Images are stored by content: image_blobs is keyed by the SHA-256 of the
+stored original, so the same picture uploaded for many opportunities is kept
+once. opportunities.image_hash points at a blob, and a trigger keeps each
+blob's refcount equal to the number of opportunities using it.
+collect_garbage() removes blobs nothing points at any more.
+
+Variants are addressed by the original's hash plus their name, width and
+format, e.g. /images/<hash>/card-192.webp, so every URL can be cached forever.
+"""
+import hashlib
+import io
+from dataclasses import dataclass, field
+
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+
+# Refuse decompression bombs before decoding any pixels. Pillow itself only
+# raises above twice this (and merely warns in between), so _open enforces it.
+Image.MAX_IMAGE_PIXELS = 40_000_000
+
+# Longest side of the stored original; larger uploads are scaled down
+MASTER_MAX_SIZE = 1600
+
+# name -> (widths, crop to square, formats). "fallback" is JPEG, or PNG when
+# the image has transparency. Cards render at ~95-110px, so 96w/192w cover 1x
+# and 2x screens. Email clients do not reliably support WebP.
+VARIANTS = {
+    "card": ((96, 192), True, ("webp", "fallback")),
+    "detail": ((480, 960), False, ("webp", "fallback")),
+    "email": ((600,), False, ("fallback",)),
+}
+
+FORMAT_MIME = {
+    "webp": "image/webp",
+    "jpg": "image/jpeg",
+    "png": "image/png",
+}
+
+
+class InvalidImage(ValueError):
+    """The upload is not an image Pillow can decode."""
+
+
+@dataclass
+class ImageVariant:
+    variant: str
+    width: int
+    height: int
+    fmt: str
+    data: bytes
+
+    @property
+    def mime(self) -> str:
+        return FORMAT_MIME[self.fmt]
+
+
+@dataclass
+class ProcessedImage:
+    data: bytes
+    hash: str
+    mime: str
+    width: int
+    height: int
+    variants: list[ImageVariant] = field(default_factory=list)
+
+
+def fallback_format(mime: str | None) -> str:
+    """Extension of the non-WebP variants for an original of this MIME type."""
+    return "png" if mime == "image/png" else "jpg"
+
+
+def _encode(img: Image.Image, fmt: str) -> bytes:
+    # No exif=/icc_profile= arguments, so nothing but pixels is written
+    buf = io.BytesIO()
+    if fmt == "webp":
+        img.save(buf, format="WEBP", quality=80, method=6)
+    elif fmt == "png":
+        img.save(buf, format="PNG", optimize=True)
+    else:
+        img.save(buf, format="JPEG", quality=82, optimize=True, progressive=True)
+    return buf.getvalue()
+
+
+def _resize(img: Image.Image, width: int, square: bool) -> Image.Image:
+    """Scale to width (or a width x width crop), never enlarging."""
+    if square:
+        side = min(width, img.width, img.height)
+        return ImageOps.fit(img, (side, side), Image.Resampling.LANCZOS)
+
+    if img.width <= width:
+        return img.copy()
+    height = max(1, round(img.height * width / img.width))
+    return img.resize((width, height), Image.Resampling.LANCZOS)
+
+
+def _check_pixels(img: Image.Image) -> None:
+    # Header sizes only; nothing has been decoded yet
+    if img.width * img.height > Image.MAX_IMAGE_PIXELS:
+        raise InvalidImage(
+            f"Image is {img.width}x{img.height} pixels, over the "
+            f"{Image.MAX_IMAGE_PIXELS} pixel limit"
+        )
+
+
+def _open(data: bytes) -> Image.Image:
+    try:
+        # verify() checks the file structure but leaves the image unusable
+        with Image.open(io.BytesIO(data)) as probe:
+            _check_pixels(probe)
+            probe.verify()
+        img = Image.open(io.BytesIO(data))
+        _check_pixels(img)
+        img.load()
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError, SyntaxError) as e:
+        raise InvalidImage(str(e)) from e
+    return img
+
+
+def process_image(data: bytes) -> ProcessedImage:
+    """
+    Validate and normalise uploaded image bytes and render every variant.
+    Raises InvalidImage if the bytes are not a decodable image.
+    """
+    img = _open(data)
+
+    # Apply the camera orientation before the EXIF data is thrown away
+    img = ImageOps.exif_transpose(img)
+
+    has_alpha = img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info)
+    img = img.convert("RGBA" if has_alpha else "RGB")
+
+    master = img.copy()
+    master.thumbnail((MASTER_MAX_SIZE, MASTER_MAX_SIZE), Image.Resampling.LANCZOS)
+    master_fmt = "png" if has_alpha else "jpg"
+    master_data = _encode(master, master_fmt)
+
+    variants = []
+    for name, (widths, square, formats) in VARIANTS.items():
+        for width in widths:
+            resized = _resize(master, width, square)
+            for fmt in formats:
+                fmt = master_fmt if fmt == "fallback" else fmt
+                variants.append(
+                    ImageVariant(name, width, resized.height, fmt, _encode(resized, fmt))
+                )
+
+    return ProcessedImage(
+        data=master_data,
+        hash=hashlib.sha256(master_data).hexdigest(),
+        mime=FORMAT_MIME[master_fmt],
+        width=master.width,
+        height=master.height,
+        variants=variants,
+    )
+
+
+def store_image(cur, image: ProcessedImage) -> str:
+    """
+    Put an image and its variants in the store unless it is already there.
+    Returns the hash to reference it by.
+    """
+    # DO UPDATE (not DO NOTHING) locks an existing row, so a concurrent
+    # collect_garbage() cannot delete it before our reference is counted.
+    cur.execute(
+        """
+        INSERT INTO image_blobs (hash, mime, width, height, data)
+        VALUES (%s, %s, %s, %s, %s)
+        ON CONFLICT (hash) DO UPDATE SET refcount = image_blobs.refcount
+        """,
+        (image.hash, image.mime, image.width, image.height, image.data),
+    )
+    cur.executemany(
+        """
+        INSERT INTO image_variants (image_hash, variant, width, height, format, mime, data)
+        VALUES (%s, %s, %s, %s, %s, %s, %s)
+        ON CONFLICT DO NOTHING
+        """,
+        [
+            (image.hash, v.variant, v.width, v.height, v.fmt, v.mime, v.data)
+            for v in image.variants
+        ],
+    )
+    return image.hash
+
+
+def set_opportunity_image(cur, opp_id: int, image: ProcessedImage) -> None:
+    """Store an image and point an opportunity at it."""
+    image_hash = store_image(cur, image)
+    cur.execute(
+        "UPDATE opportunities SET image_hash = %s WHERE id = %s",
+        (image_hash, opp_id),
+    )
+
+
+def collect_garbage(cur) -> int:
+    """Delete unreferenced images (and their variants). Returns how many."""
+    cur.execute("DELETE FROM image_blobs WHERE refcount = 0")
+    return cur.rowcount
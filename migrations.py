@@ -0,0 +1,938 @@
+"""
+Versioned schema migrations for the KRAS volunteer database.
+
+Every migration has a version number, a short name and a step. The step is
+either a SQL string or a function that receives a cursor. Applied versions
+are recorded in schema_migrations, so each migration runs exactly once and
+in order. Each migration runs in its own transaction.
+
+Command line:
+
+    python migrations.py           # apply pending migrations
+    python migrations.py status    # list applied and pending versions
+
+Under gunicorn the master process applies pending migrations before it
+forks any worker (on_starting in gunicorn.conf.py), so a long migration is
+not cut short by the worker timeout. Set AUTO_MIGRATE=0 to turn that off
+and run this script from a release step instead. MIGRATE_ON_IMPORT=1 makes
+app.py migrate when it is imported, for the Flask dev server and tests.
+"""
+import hashlib
+import io
+import logging
+import os
+import sys
+
+import psycopg
+from psycopg.rows import dict_row
+
+
+DATABASE_URL = os.getenv("DATABASE_URL")
+
+log = logging.getLogger("migrations")
+
+# Key for pg_advisory_lock so only one process (CLI or gunicorn worker)
+# migrates at a time; the others wait and then find nothing left to do.
+MIGRATION_LOCK_KEY = 72_617_301
+
+
+# =====
+# Migrations
+# =====
+BASELINE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS applications (
+    id          SERIAL PRIMARY KEY,
+    first_name  TEXT,
+    last_name   TEXT,
+    email       TEXT,
+    phone       TEXT,
+    contact     TEXT,
+    title       TEXT,
+    time        TEXT,
+    duration    TEXT,
+    mode        TEXT,
+    location    TEXT,
+    comments    TEXT,
+    status      TEXT,
+    timestamp   TEXT,
+    history     TEXT,
+    notes       TEXT,
+    is_champion BOOLEAN DEFAULT FALSE
+);
+
+CREATE TABLE IF NOT EXISTS opportunities (
+    id           SERIAL PRIMARY KEY,
+    title        TEXT,
+    time         TEXT,
+    duration     TEXT,
+    mode         TEXT,
+    description  TEXT,
+    requirements TEXT,
+    location     TEXT,
+    image        TEXT,
+    image_base64 TEXT,
+    tags         TEXT,
+    closed       BOOLEAN DEFAULT FALSE,
+    closed_date  TEXT
+);
+
+CREATE TABLE IF NOT EXISTS champions_opportunities (
+    id             SERIAL PRIMARY KEY,
+    champion_id    INTEGER REFERENCES applications(id) ON DELETE CASCADE,
+    opportunity_id INTEGER REFERENCES opportunities(id) ON DELETE CASCADE
+);
+"""
+
+HOT_LOOKUP_INDEXES = """
+-- Title matching between applications and opportunities
+CREATE INDEX IF NOT EXISTS applications_title_norm_idx
+    ON applications (LOWER(TRIM(title)));
+CREATE INDEX IF NOT EXISTS opportunities_title_norm_idx
+    ON opportunities (LOWER(TRIM(title)));
+
+-- Per-volunteer lookups (/check, index assignments, champion checks).
+-- LOWER(email) leads, so plain email lookups use this index as well.
+CREATE INDEX IF NOT EXISTS applications_email_status_ts_idx
+    ON applications (LOWER(email), status, timestamp DESC);
+
+-- Newest-first listings (/review, /volunteers)
+CREATE INDEX IF NOT EXISTS applications_timestamp_idx
+    ON applications (timestamp DESC, id DESC);
+
+-- /api/champions
+CREATE INDEX IF NOT EXISTS applications_champions_idx
+    ON applications (first_name, last_name)
+    WHERE is_champion IS TRUE;
+
+-- Drop duplicate champion assignments before enforcing uniqueness
+DELETE FROM champions_opportunities dup
+USING champions_opportunities keep
+WHERE dup.champion_id = keep.champion_id
+  AND dup.opportunity_id = keep.opportunity_id
+  AND dup.id > keep.id;
+
+CREATE UNIQUE INDEX IF NOT EXISTS champions_opportunities_pair_key
+    ON champions_opportunities (champion_id, opportunity_id);
+CREATE INDEX IF NOT EXISTS champions_opportunities_opportunity_idx
+    ON champions_opportunities (opportunity_id);
+"""
+
+APPLICATION_OPPORTUNITY_FK = """
+ALTER TABLE applications
+    ADD COLUMN IF NOT EXISTS opportunity_id INTEGER
+    REFERENCES opportunities(id) ON DELETE SET NULL;
+
+-- Backfill from the old title match. When several opportunities share a
+-- title, prefer the open one, then the newest.
+UPDATE applications a
+SET opportunity_id = o.id
+FROM (
+    SELECT DISTINCT ON (LOWER(TRIM(title)))
+           id, LOWER(TRIM(title)) AS norm_title
+    FROM opportunities
+    ORDER BY LOWER(TRIM(title)), (closed IS TRUE), id DESC
+) o
+WHERE a.opportunity_id IS NULL
+  AND LOWER(TRIM(a.title)) = o.norm_title;
+
+CREATE INDEX IF NOT EXISTS applications_opportunity_ts_idx
+    ON applications (opportunity_id, timestamp DESC, id DESC);
+"""
+
+LEGACY_UTC_TIME = """
+-- Session-local helper: parse a legacy "YYYY-MM-DD HH:MM" string (UTC).
+-- Anything else gives fallback, including values with a date-like prefix
+-- that still do not cast ("2023-13-45", "2023-01-01 garbage"), so one bad
+-- row cannot abort the migration. The prefix check keeps words such as
+-- 'now' or 'epoch', which Postgres would happily cast, out.
+CREATE OR REPLACE FUNCTION pg_temp.legacy_utc_time(raw TEXT, fallback TIMESTAMPTZ)
+RETURNS TIMESTAMPTZ AS $$
+BEGIN
+    IF raw IS NULL OR TRIM(raw) !~ '^[0-9]{4}-[0-9]{2}-[0-9]{2}' THEN
+        RETURN fallback;
+    END IF;
+    RETURN TRIM(raw)::timestamp AT TIME ZONE 'UTC';
+EXCEPTION WHEN invalid_datetime_format OR datetime_field_overflow THEN
+    RETURN fallback;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+NATIVE_TIMESTAMPS = LEGACY_UTC_TIME + """
+-- Legacy values are "YYYY-MM-DD HH:MM" strings written by datetime.now() on
+-- the app server, which runs in UTC. Rows without a parsable value fall back
+-- to the epoch so the column can be NOT NULL for keyset ordering.
+ALTER TABLE applications
+    ALTER COLUMN timestamp TYPE TIMESTAMPTZ
+    USING pg_temp.legacy_utc_time(timestamp, 'epoch'),
+    ALTER COLUMN timestamp SET DEFAULT now(),
+    ALTER COLUMN timestamp SET NOT NULL;
+
+ALTER TABLE opportunities
+    ALTER COLUMN closed_date TYPE TIMESTAMPTZ
+    USING pg_temp.legacy_utc_time(closed_date, NULL);
+
+-- applications_timestamp_idx (migration 2) is rebuilt by the type change
+-- and now serves range scans on submission time.
+"""
+
+JSONB_HISTORY_NOTES = """
+-- Session-local helper: parse a legacy text blob into a JSON array. Text that
+-- is not a JSON array (the old applicant API appended raw lines to notes) is
+-- kept as a single entry instead of being dropped.
+CREATE FUNCTION pg_temp.legacy_json_array(raw TEXT, text_key TEXT)
+RETURNS JSONB AS $$
+DECLARE
+    parsed JSONB;
+BEGIN
+    IF raw IS NULL OR btrim(raw) = '' THEN
+        RETURN '[]'::jsonb;
+    END IF;
+
+    BEGIN
+        parsed := raw::jsonb;
+    EXCEPTION WHEN others THEN
+        parsed := NULL;
+    END;
+
+    IF parsed IS NOT NULL AND jsonb_typeof(parsed) = 'array' THEN
+        RETURN parsed;
+    END IF;
+
+    RETURN jsonb_build_array(jsonb_build_object(text_key, raw, 'timestamp', ''));
+END;
+$$ LANGUAGE plpgsql;
+
+ALTER TABLE applications
+    ALTER COLUMN history TYPE JSONB USING pg_temp.legacy_json_array(history, 'event'),
+    ALTER COLUMN history SET DEFAULT '[]'::jsonb,
+    ALTER COLUMN history SET NOT NULL,
+    ALTER COLUMN notes TYPE JSONB USING pg_temp.legacy_json_array(notes, 'note'),
+    ALTER COLUMN notes SET DEFAULT '[]'::jsonb,
+    ALTER COLUMN notes SET NOT NULL;
+"""
+
+APPLICATION_EVENTS = LEGACY_UTC_TIME + """
+CREATE TABLE IF NOT EXISTS application_events (
+    id             BIGSERIAL PRIMARY KEY,
+    application_id INTEGER NOT NULL REFERENCES applications(id) ON DELETE CASCADE,
+    kind           TEXT NOT NULL,          -- 'event' (history) or 'note'
+    body           TEXT NOT NULL,
+    actor          TEXT,                   -- email of whoever caused it, if known
+    created_at     TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS application_events_app_created_idx
+    ON application_events (application_id, created_at DESC, id DESC);
+
+-- Legacy entry timestamps are "YYYY-MM-DD HH:MM" strings (UTC); entries
+-- without a parsable one fall back to the application's submission time.
+-- Explode the history arrays. "Note added: ..." entries are skipped because
+-- add_note wrote every note twice; the notes array below carries them.
+INSERT INTO application_events (application_id, kind, body, created_at)
+SELECT a.id,
+       'event',
+       e.value->>'event',
+       pg_temp.legacy_utc_time(e.value->>'timestamp', a.timestamp)
+FROM applications a
+CROSS JOIN LATERAL jsonb_array_elements(a.history) WITH ORDINALITY AS e(value, ord)
+WHERE COALESCE(e.value->>'event', '') <> ''
+  AND (e.value->>'event') NOT LIKE 'Note added: %'
+ORDER BY a.id, e.ord;
+
+INSERT INTO application_events (application_id, kind, body, created_at)
+SELECT a.id,
+       'note',
+       e.value->>'note',
+       pg_temp.legacy_utc_time(e.value->>'timestamp', a.timestamp)
+FROM applications a
+CROSS JOIN LATERAL jsonb_array_elements(a.notes) WITH ORDINALITY AS e(value, ord)
+WHERE COALESCE(e.value->>'note', '') <> ''
+ORDER BY a.id, e.ord;
+
+ALTER TABLE applications
+    DROP COLUMN history,
+    DROP COLUMN notes;
+"""
+
+VOLUNTEER_SEARCH_INDEXES = """
+-- Trigram indexes let the volunteers table's substring filters and search
+-- (ILIKE '%term%') use an index instead of scanning every application.
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- Must match VOLUNTEER_NAME_SQL in app.py
+CREATE INDEX IF NOT EXISTS applications_name_trgm_idx
+    ON applications USING gin (
+        (COALESCE(first_name, '') || ' ' || COALESCE(last_name, '')) gin_trgm_ops
+    );
+CREATE INDEX IF NOT EXISTS applications_email_trgm_idx
+    ON applications USING gin (email gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS applications_phone_trgm_idx
+    ON applications USING gin (phone gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS applications_contact_trgm_idx
+    ON applications USING gin (contact gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS applications_title_trgm_idx
+    ON applications USING gin (title gin_trgm_ops);
+
+-- Keyset ordering for the most common non-date sorts (VOLUNTEER_SORTS)
+CREATE INDEX IF NOT EXISTS applications_name_sort_idx
+    ON applications (LOWER(COALESCE(first_name, '') || ' ' || COALESCE(last_name, '')), id);
+CREATE INDEX IF NOT EXISTS applications_email_sort_idx
+    ON applications (LOWER(COALESCE(email, '')), id);
+CREATE INDEX IF NOT EXISTS applications_opportunity_sort_idx
+    ON applications (LOWER(COALESCE(title, '')), id);
+"""
+
+APPLICATION_SEARCH_VECTOR = """
+-- Full-text search over applications (/api/search). The 'simple'
+-- configuration skips stemming and stop words, which suits names, emails and
+-- phone numbers. Names and emails weigh most, comments least.
+ALTER TABLE applications
+    ADD COLUMN IF NOT EXISTS search_vector TSVECTOR
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', COALESCE(first_name, '') || ' ' || COALESCE(last_name, '')), 'A')
+        || setweight(to_tsvector('simple', COALESCE(email, '')), 'A')
+        || setweight(to_tsvector('simple', COALESCE(phone, '')), 'B')
+        || setweight(to_tsvector('simple', COALESCE(title, '')), 'B')
+        || setweight(to_tsvector('simple', COALESCE(comments, '')), 'C')
+    ) STORED;
+
+CREATE INDEX IF NOT EXISTS applications_search_vector_idx
+    ON applications USING gin (search_vector);
+
+-- Fuzzy name and email matching reuses the trigram indexes from migration 7.
+"""
+
+OPPORTUNITY_IMAGE_BYTES = """
+-- Store uploaded images as raw bytes with a content hash (used in the image
+-- URL and as its ETag) and a MIME type sniffed from the leading bytes.
+ALTER TABLE opportunities
+    ADD COLUMN IF NOT EXISTS image_data BYTEA,
+    ADD COLUMN IF NOT EXISTS image_hash TEXT,
+    ADD COLUMN IF NOT EXISTS image_mime TEXT;
+
+-- Session-local helper: decode legacy base64 text, or NULL if it is invalid.
+CREATE FUNCTION pg_temp.legacy_base64(raw TEXT)
+RETURNS BYTEA AS $$
+BEGIN
+    IF raw IS NULL OR btrim(raw) = '' THEN
+        RETURN NULL;
+    END IF;
+    RETURN decode(regexp_replace(raw, '[[:space:]]', '', 'g'), 'base64');
+EXCEPTION WHEN others THEN
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+UPDATE opportunities
+SET image_data = pg_temp.legacy_base64(image_base64)
+WHERE image_base64 IS NOT NULL;
+
+UPDATE opportunities
+SET image_hash = encode(sha256(image_data), 'hex'),
+    image_mime = CASE
+        WHEN substring(image_data FROM 1 FOR 8) = '\\x89504e470d0a1a0a'::bytea THEN 'image/png'
+        WHEN substring(image_data FROM 1 FOR 3) = '\\xffd8ff'::bytea THEN 'image/jpeg'
+        WHEN substring(image_data FROM 1 FOR 4) = 'GIF8'::bytea THEN 'image/gif'
+        ELSE 'application/octet-stream'
+    END
+WHERE image_data IS NOT NULL;
+
+ALTER TABLE opportunities DROP COLUMN image_base64;
+"""
+
+OPPORTUNITY_IMAGE_VARIANTS = """
+CREATE TABLE IF NOT EXISTS opportunity_image_variants (
+    opportunity_id INTEGER NOT NULL REFERENCES opportunities(id) ON DELETE CASCADE,
+    image_hash     TEXT NOT NULL,      -- hash of the original it was made from
+    variant        TEXT NOT NULL,      -- 'card', 'detail' or 'email'
+    width          INTEGER NOT NULL,
+    height         INTEGER NOT NULL,
+    format         TEXT NOT NULL,      -- 'webp', 'jpg' or 'png'
+    mime           TEXT NOT NULL,
+    data           BYTEA NOT NULL,
+    PRIMARY KEY (opportunity_id, variant, width, format)
+);
+"""
+
+
+# Image processing as it stood when migrations 10 and 11 were written.
+# Like their SQL, it is frozen here so that changes to images.py's pipeline
+# do not change what these migrations do to a fresh database.
+MIGRATION_IMAGE_MAX_PIXELS = 40_000_000
+MIGRATION_IMAGE_MAX_SIZE = 1600
+MIGRATION_IMAGE_VARIANTS = {
+    "card": ((96, 192), True, ("webp", "fallback")),
+    "detail": ((480, 960), False, ("webp", "fallback")),
+    "email": ((600,), False, ("fallback",)),
+}
+MIGRATION_IMAGE_MIME = {"webp": "image/webp", "jpg": "image/jpeg", "png": "image/png"}
+
+
+class UnreadableImage(ValueError):
+    """Stored image bytes Pillow cannot decode."""
+
+
+def process_stored_image(data: bytes) -> dict:
+    """
+    Re-encode an image without metadata and render its variants. Returns
+    the original's data, hash, mime, width and height, plus variants as
+    (variant, width, height, format, mime, data) tuples.
+    """
+    from PIL import Image, ImageOps, UnidentifiedImageError
+
+    def encode(img, fmt):
+        buf = io.BytesIO()
+        if fmt == "webp":
+            img.save(buf, format="WEBP", quality=80, method=6)
+        elif fmt == "png":
+            img.save(buf, format="PNG", optimize=True)
+        else:
+            img.save(buf, format="JPEG", quality=82, optimize=True, progressive=True)
+        return buf.getvalue()
+
+    def resize(img, width, square):
+        if square:
+            side = min(width, img.width, img.height)
+            return ImageOps.fit(img, (side, side), Image.Resampling.LANCZOS)
+        if img.width <= width:
+            return img.copy()
+        height = max(1, round(img.height * width / img.width))
+        return img.resize((width, height), Image.Resampling.LANCZOS)
+
+    try:
+        with Image.open(io.BytesIO(data)) as probe:
+            if probe.width * probe.height > MIGRATION_IMAGE_MAX_PIXELS:
+                raise UnreadableImage(f"{probe.width}x{probe.height} pixels is over the limit")
+            probe.verify()
+        img = Image.open(io.BytesIO(data))
+        img.load()
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError, SyntaxError) as e:
+        raise UnreadableImage(str(e)) from e
+
+    img = ImageOps.exif_transpose(img)
+    has_alpha = img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info)
+    img = img.convert("RGBA" if has_alpha else "RGB")
+
+    master = img.copy()
+    master.thumbnail((MIGRATION_IMAGE_MAX_SIZE, MIGRATION_IMAGE_MAX_SIZE), Image.Resampling.LANCZOS)
+    master_fmt = "png" if has_alpha else "jpg"
+    master_data = encode(master, master_fmt)
+
+    variants = []
+    for name, (widths, square, formats) in MIGRATION_IMAGE_VARIANTS.items():
+        for width in widths:
+            resized = resize(master, width, square)
+            for fmt in formats:
+                fmt = master_fmt if fmt == "fallback" else fmt
+                variants.append(
+                    (name, width, resized.height, fmt, MIGRATION_IMAGE_MIME[fmt], encode(resized, fmt))
+                )
+
+    return {
+        "data": master_data,
+        "hash": hashlib.sha256(master_data).hexdigest(),
+        "mime": MIGRATION_IMAGE_MIME[master_fmt],
+        "width": master.width,
+        "height": master.height,
+        "variants": variants,
+    }
+
+
+def build_image_variants(cur) -> None:
+    """
+    Create the variants table and run every stored image through the upload
+    pipeline, which also re-encodes the original without metadata. Images
+    Pillow cannot decode could never display either, so they are cleared.
+    """
+    cur.execute(OPPORTUNITY_IMAGE_VARIANTS)
+
+    cur.execute("SELECT id FROM opportunities WHERE image_data IS NOT NULL ORDER BY id")
+    opp_ids = [row["id"] for row in cur.fetchall()]
+
+    for opp_id in opp_ids:
+        cur.execute("SELECT image_data FROM opportunities WHERE id = %s", (opp_id,))
+        data = bytes(cur.fetchone()["image_data"])
+        try:
+            image = process_stored_image(data)
+        except UnreadableImage as e:
+            log.warning("Opportunity %s: unreadable image removed (%s)", opp_id, e)
+            cur.execute(
+                """
+                UPDATE opportunities
+                SET image_data = NULL, image_hash = NULL, image_mime = NULL
+                WHERE id = %s
+                """,
+                (opp_id,),
+            )
+            continue
+
+        # Written against this migration's schema, not images.py's current one
+        cur.execute(
+            """
+            UPDATE opportunities
+            SET image_data = %s, image_hash = %s, image_mime = %s
+            WHERE id = %s
+            """,
+            (image["data"], image["hash"], image["mime"], opp_id),
+        )
+        cur.executemany(
+            """
+            INSERT INTO opportunity_image_variants
+                (opportunity_id, image_hash, variant, width, height, format, mime, data)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+            """,
+            [(opp_id, image["hash"], *variant) for variant in image["variants"]],
+        )
+
+
+IMAGE_STORE = """
+-- Content-addressed image store. hash is the SHA-256 of data; refcount is
+-- the number of opportunities whose image_hash points here (kept by the
+-- trigger below). images.collect_garbage() deletes rows at refcount 0.
+CREATE TABLE IF NOT EXISTS image_blobs (
+    hash       TEXT PRIMARY KEY,
+    mime       TEXT NOT NULL,
+    width      INTEGER,
+    height     INTEGER,
+    data       BYTEA NOT NULL,
+    refcount   INTEGER NOT NULL DEFAULT 0 CHECK (refcount >= 0),
+    created_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS image_blobs_unreferenced_idx
+    ON image_blobs (hash) WHERE refcount = 0;
+
+-- Resized copies, shared by every opportunity using the same original
+CREATE TABLE IF NOT EXISTS image_variants (
+    image_hash TEXT NOT NULL REFERENCES image_blobs(hash) ON DELETE CASCADE,
+    variant    TEXT NOT NULL,
+    width      INTEGER NOT NULL,
+    height     INTEGER NOT NULL,
+    format     TEXT NOT NULL,
+    mime       TEXT NOT NULL,
+    data       BYTEA NOT NULL,
+    PRIMARY KEY (image_hash, variant, width, format)
+);
+
+-- Move existing images in, keeping one copy of each distinct hash
+INSERT INTO image_blobs (hash, mime, data)
+SELECT DISTINCT ON (image_hash) image_hash, image_mime, image_data
+FROM opportunities
+WHERE image_hash IS NOT NULL AND image_data IS NOT NULL
+ORDER BY image_hash, id
+ON CONFLICT (hash) DO NOTHING;
+
+INSERT INTO image_variants (image_hash, variant, width, height, format, mime, data)
+SELECT DISTINCT ON (image_hash, variant, width, format)
+       image_hash, variant, width, height, format, mime, data
+FROM opportunity_image_variants
+WHERE image_hash IN (SELECT hash FROM image_blobs)
+ORDER BY image_hash, variant, width, format, opportunity_id
+ON CONFLICT DO NOTHING;
+
+DROP TABLE opportunity_image_variants;
+
+ALTER TABLE opportunities
+    DROP COLUMN image_data,
+    DROP COLUMN image_mime,
+    ADD CONSTRAINT opportunities_image_hash_fkey
+        FOREIGN KEY (image_hash) REFERENCES image_blobs(hash);
+
+UPDATE image_blobs b
+SET refcount = (SELECT count(*) FROM opportunities o WHERE o.image_hash = b.hash);
+
+CREATE OR REPLACE FUNCTION image_blobs_track_refcount()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'UPDATE' AND NEW.image_hash IS NOT DISTINCT FROM OLD.image_hash THEN
+        RETURN NULL;
+    END IF;
+
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        IF OLD.image_hash IS NOT NULL THEN
+            UPDATE image_blobs SET refcount = refcount - 1 WHERE hash = OLD.image_hash;
+        END IF;
+    END IF;
+
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        IF NEW.image_hash IS NOT NULL THEN
+            UPDATE image_blobs SET refcount = refcount + 1 WHERE hash = NEW.image_hash;
+        END IF;
+    END IF;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS opportunities_image_refcount ON opportunities;
+CREATE TRIGGER opportunities_image_refcount
+    AFTER INSERT OR DELETE OR UPDATE OF image_hash ON opportunities
+    FOR EACH ROW EXECUTE FUNCTION image_blobs_track_refcount();
+"""
+
+STATIC_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+
+
+def build_image_store(cur) -> None:
+    """
+    Move images into the content-addressed store (see IMAGE_STORE), then
+    import opportunities that still only name a file under static/ (this
+    replaces the old migrate_images_to_base64.py script).
+    """
+    from PIL import Image
+
+    cur.execute(IMAGE_STORE)
+
+    # Dimensions for the blobs moved over from opportunities
+    cur.execute("SELECT hash FROM image_blobs WHERE width IS NULL")
+    for image_hash in [row["hash"] for row in cur.fetchall()]:
+        cur.execute("SELECT data FROM image_blobs WHERE hash = %s", (image_hash,))
+        with Image.open(io.BytesIO(bytes(cur.fetchone()["data"]))) as img:
+            width, height = img.size
+        cur.execute(
+            "UPDATE image_blobs SET width = %s, height = %s WHERE hash = %s",
+            (width, height, image_hash),
+        )
+
+    cur.execute(
+        """
+        SELECT id, image
+        FROM opportunities
+        WHERE image_hash IS NULL AND COALESCE(TRIM(image), '') <> ''
+        ORDER BY id
+        """
+    )
+    for row in cur.fetchall():
+        candidates = [
+            os.path.join(STATIC_FOLDER, row["image"]),
+            os.path.join(STATIC_FOLDER, "uploads", row["image"]),
+        ]
+        path = next((p for p in candidates if os.path.isfile(p)), None)
+        if not path:
+            log.warning("Opportunity %s: image file not found: %s", row["id"], row["image"])
+            continue
+
+        try:
+            with open(path, "rb") as f:
+                image = process_stored_image(f.read())
+        except (OSError, UnreadableImage) as e:
+            log.warning("Opportunity %s: could not read %s (%s)", row["id"], path, e)
+            continue
+
+        # Identical files end up as one blob with a higher refcount (the
+        # trigger counts the UPDATE below)
+        cur.execute(
+            """
+            INSERT INTO image_blobs (hash, mime, width, height, data)
+            VALUES (%s, %s, %s, %s, %s)
+            ON CONFLICT (hash) DO NOTHING
+            """,
+            (image["hash"], image["mime"], image["width"], image["height"], image["data"]),
+        )
+        cur.executemany(
+            """
+            INSERT INTO image_variants (image_hash, variant, width, height, format, mime, data)
+            VALUES (%s, %s, %s, %s, %s, %s, %s)
+            ON CONFLICT DO NOTHING
+            """,
+            [(image["hash"], *variant) for variant in image["variants"]],
+        )
+        cur.execute(
+            "UPDATE opportunities SET image_hash = %s WHERE id = %s",
+            (image["hash"], row["id"]),
+        )
+
+    cur.execute("DELETE FROM image_blobs WHERE refcount = 0")
+
+
+UPDATED_AT_COLUMNS = """
+-- Last-change times for conditional GETs (ETag / Last-Modified). Triggers
+-- keep them current so no write path can forget. clock_timestamp() rather
+-- than now(): updates to a row are serialised by its row lock, so the clock
+-- only moves forward, while a transaction's start time can be older than a
+-- change another transaction already committed.
+ALTER TABLE opportunities
+    ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ NOT NULL DEFAULT now();
+ALTER TABLE applications
+    ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ NOT NULL DEFAULT now();
+
+UPDATE applications SET updated_at = timestamp
+WHERE timestamp IS NOT NULL AND timestamp < updated_at;
+
+CREATE OR REPLACE FUNCTION set_updated_at()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.updated_at := clock_timestamp();
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS opportunities_set_updated_at ON opportunities;
+CREATE TRIGGER opportunities_set_updated_at
+    BEFORE UPDATE ON opportunities
+    FOR EACH ROW EXECUTE FUNCTION set_updated_at();
+
+DROP TRIGGER IF EXISTS applications_set_updated_at ON applications;
+CREATE TRIGGER applications_set_updated_at
+    BEFORE UPDATE ON applications
+    FOR EACH ROW EXECUTE FUNCTION set_updated_at();
+"""
+
+EMAIL_OUTBOX = """
+-- Outgoing mail, written in the same transaction as the change that causes
+-- it and delivered by outbox.py. message holds the complete RFC 5322 bytes.
+CREATE TABLE IF NOT EXISTS email_outbox (
+    id              BIGSERIAL PRIMARY KEY,
+    kind            TEXT NOT NULL,          -- e.g. 'volunteer_confirmation'
+    recipient       TEXT NOT NULL,
+    subject         TEXT NOT NULL DEFAULT '',
+    message         BYTEA NOT NULL,
+    status          TEXT NOT NULL DEFAULT 'pending'
+                    CHECK (status IN ('pending', 'sending', 'sent', 'failed')),
+    attempts        INTEGER NOT NULL DEFAULT 0,
+    last_error      TEXT,
+    created_at      TIMESTAMPTZ NOT NULL DEFAULT now(),
+    next_attempt_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    locked_until    TIMESTAMPTZ,            -- lease of the worker sending it
+    sent_at         TIMESTAMPTZ
+);
+
+-- Only undelivered rows are ever scanned by the workers
+CREATE INDEX IF NOT EXISTS email_outbox_due_idx
+    ON email_outbox (next_attempt_at, id)
+    WHERE status IN ('pending', 'sending');
+"""
+
+CHAMPION_DIGESTS = """
+-- How each champion wants new-application emails: one per application
+-- ('immediate') or one summary per window. Keyed by lowercased email
+-- because a champion can have several application rows.
+CREATE TABLE IF NOT EXISTS champion_notification_prefs (
+    email      TEXT PRIMARY KEY,
+    digest     TEXT NOT NULL DEFAULT 'immediate'
+               CHECK (digest IN ('immediate', '15min', 'hourly', 'daily')),
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+-- An open digest is a pending email_outbox row due at window_ends_at. Each
+-- new application adds an item and re-renders that row until it is sent.
+CREATE TABLE IF NOT EXISTS champion_digests (
+    id             BIGSERIAL PRIMARY KEY,
+    champion_email TEXT NOT NULL,
+    outbox_id      BIGINT NOT NULL REFERENCES email_outbox(id) ON DELETE CASCADE,
+    window_ends_at TIMESTAMPTZ NOT NULL,
+    created_at     TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS champion_digests_email_idx
+    ON champion_digests (champion_email, window_ends_at DESC);
+
+CREATE TABLE IF NOT EXISTS champion_digest_items (
+    id             BIGSERIAL PRIMARY KEY,
+    digest_id      BIGINT NOT NULL REFERENCES champion_digests(id) ON DELETE CASCADE,
+    application_id INTEGER NOT NULL REFERENCES applications(id) ON DELETE CASCADE,
+    opportunity_id INTEGER REFERENCES opportunities(id) ON DELETE SET NULL,
+    created_at     TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS champion_digest_items_digest_idx
+    ON champion_digest_items (digest_id, id);
+"""
+
+EMAIL_CAMPAIGNS = """
+-- Bulk emails to volunteers. body is a sandboxed Jinja template rendered
+-- per recipient; recipients are snapshotted when the campaign is created,
+-- one row per distinct email, and delivered by outbox.py.
+CREATE TABLE IF NOT EXISTS email_campaigns (
+    id           BIGSERIAL PRIMARY KEY,
+    subject      TEXT NOT NULL,
+    body         TEXT NOT NULL,
+    filters      JSONB NOT NULL DEFAULT '{}',
+    logo_url     TEXT,
+    rate         REAL,                   -- messages per second; NULL = CAMPAIGN_RATE
+    status       TEXT NOT NULL DEFAULT 'draft'
+                 CHECK (status IN ('draft', 'sending', 'sent', 'cancelled')),
+    created_by   TEXT,
+    created_at   TIMESTAMPTZ NOT NULL DEFAULT now(),
+    started_at   TIMESTAMPTZ,
+    completed_at TIMESTAMPTZ,
+    locked_until TIMESTAMPTZ             -- lease of the worker sending it
+);
+
+CREATE TABLE IF NOT EXISTS campaign_recipients (
+    id             BIGSERIAL PRIMARY KEY,
+    campaign_id    BIGINT NOT NULL REFERENCES email_campaigns(id) ON DELETE CASCADE,
+    email          TEXT NOT NULL,        -- lowercased
+    first_name     TEXT,
+    last_name      TEXT,
+    application_id INTEGER REFERENCES applications(id) ON DELETE SET NULL,
+    status         TEXT NOT NULL DEFAULT 'pending'
+                   CHECK (status IN ('pending', 'sent', 'failed')),
+    attempts       INTEGER NOT NULL DEFAULT 0,
+    last_error     TEXT,
+    sent_at        TIMESTAMPTZ,
+    UNIQUE (campaign_id, email)
+);
+
+CREATE INDEX IF NOT EXISTS campaign_recipients_pending_idx
+    ON campaign_recipients (campaign_id, id)
+    WHERE status = 'pending';
+"""
+
+EMAIL_DEDUPE = """
+-- When mail of a kind was last queued for an address, so repeated requests
+-- (e.g. clicking "send verification email" again) within a window queue
+-- nothing new.
+CREATE TABLE IF NOT EXISTS email_dedupe (
+    kind      TEXT NOT NULL,
+    recipient TEXT NOT NULL,
+    queued_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    PRIMARY KEY (kind, recipient)
+);
+"""
+
+CAMPAIGN_LEASE_OWNER = """
+-- Which worker's lease email_campaigns.locked_until is, so a worker whose
+-- lease ran out can tell and stop sending.
+ALTER TABLE email_campaigns
+    ADD COLUMN IF NOT EXISTS locked_by TEXT;
+"""
+
+VOLUNTEER_SORT_INDEXES = """
+-- The rest of VOLUNTEER_SORTS in app.py, so every sort of the volunteers
+-- table reads its keyset page from an index instead of sorting the table.
+-- Each expression must match its VOLUNTEER_SORTS entry exactly.
+CREATE INDEX IF NOT EXISTS applications_phone_sort_idx
+    ON applications (COALESCE(phone, ''), id);
+CREATE INDEX IF NOT EXISTS applications_contact_sort_idx
+    ON applications (LOWER(COALESCE(contact, '')), id);
+CREATE INDEX IF NOT EXISTS applications_status_sort_idx
+    ON applications (COALESCE(status, ''), id);
+
+-- ?q= ORs every VOLUNTEER_FILTER_COLUMNS entry together; one arm without a
+-- trigram index turns the whole search into a sequential scan.
+CREATE INDEX IF NOT EXISTS applications_status_trgm_idx
+    ON applications USING gin (status gin_trgm_ops);
+"""
+
+EMAIL_OUTBOX_FAILED_INDEX = """
+-- /api/admin/metrics counts mail that will never be sent; email_outbox_due_idx
+-- only covers pending and sending rows.
+CREATE INDEX IF NOT EXISTS email_outbox_failed_idx
+    ON email_outbox (id)
+    WHERE status = 'failed';
+"""
+
+
+MIGRATIONS = [
+    (1, "baseline schema", BASELINE_SCHEMA),
+    (2, "hot lookup indexes", HOT_LOOKUP_INDEXES),
+    (3, "applications.opportunity_id foreign key", APPLICATION_OPPORTUNITY_FK),
+    (4, "timestamptz submission and close times", NATIVE_TIMESTAMPS),
+    (5, "jsonb history and notes", JSONB_HISTORY_NOTES),
+    (6, "application_events table", APPLICATION_EVENTS),
+    (7, "volunteer search indexes", VOLUNTEER_SEARCH_INDEXES),
+    (8, "applications full-text search vector", APPLICATION_SEARCH_VECTOR),
+    (9, "opportunity images as bytea", OPPORTUNITY_IMAGE_BYTES),
+    (10, "resized opportunity image variants", build_image_variants),
+    (11, "content-addressed image store", build_image_store),
+    (12, "updated_at columns", UPDATED_AT_COLUMNS),
+    (13, "email outbox", EMAIL_OUTBOX),
+    (14, "champion notification digests", CHAMPION_DIGESTS),
+    (15, "email campaigns", EMAIL_CAMPAIGNS),
+    (16, "email dedupe", EMAIL_DEDUPE),
+    (17, "campaign lease owner", CAMPAIGN_LEASE_OWNER),
+    (18, "volunteer sort and status indexes", VOLUNTEER_SORT_INDEXES),
+    (19, "failed outbox mail index", EMAIL_OUTBOX_FAILED_INDEX),
+]
+
+
+# =====
+# Runner
+# =====
+def _connect(conninfo: str | None):
+    conninfo = conninfo or DATABASE_URL
+    if not conninfo:
+        raise RuntimeError("DATABASE_URL environment variable is not set.")
+    return psycopg.connect(conninfo, autocommit=True, row_factory=dict_row)
+
+
+def _ensure_migrations_table(cur) -> None:
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version    INTEGER PRIMARY KEY,
+            name       TEXT NOT NULL,
+            applied_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        )
+        """
+    )
+
+
+def applied_versions(cur) -> set[int]:
+    cur.execute("SELECT version FROM schema_migrations")
+    return {row["version"] for row in cur.fetchall()}
+
+
+def apply_migrations(conninfo: str | None = None) -> list[int]:
+    """
+    Apply every pending migration in version order.
+
+    Returns the list of versions applied by this call.
+    """
+    newly_applied = []
+
+    with _connect(conninfo) as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT pg_advisory_lock(%s)", (MIGRATION_LOCK_KEY,))
+            try:
+                _ensure_migrations_table(cur)
+                done = applied_versions(cur)
+
+                for version, name, step in sorted(MIGRATIONS, key=lambda m: m[0]):
+                    if version in done:
+                        continue
+
+                    with conn.transaction():
+                        if callable(step):
+                            step(cur)
+                        else:
+                            cur.execute(step)
+                        cur.execute(
+                            "INSERT INTO schema_migrations (version, name) VALUES (%s, %s)",
+                            (version, name),
+                        )
+                    newly_applied.append(version)
+            finally:
+                cur.execute("SELECT pg_advisory_unlock(%s)", (MIGRATION_LOCK_KEY,))
+
+    return newly_applied
+
+
+def print_status(conninfo: str | None = None) -> None:
+    with _connect(conninfo) as conn:
+        with conn.cursor() as cur:
+            _ensure_migrations_table(cur)
+            done = applied_versions(cur)
+
+    for version, name, _ in sorted(MIGRATIONS, key=lambda m: m[0]):
+        state = "applied" if version in done else "pending"
+        print(f"{version:>4}  {state:<8} {name}")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+    command = sys.argv[1] if len(sys.argv) > 1 else "upgrade"
+
+    if command == "status":
+        print_status()
+    elif command == "upgrade":
+        versions = apply_migrations()
+        if versions:
+            print("Applied migrations: " + ", ".join(str(v) for v in versions))
+        else:
+            print("Database schema is up to date.")
+    else:
+        print("Usage: python migrations.py [upgrade|status]")
+        sys.exit(2)
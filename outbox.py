@@ -0,0 +1,822 @@
+"""
+Durable outgoing email.
+
+enqueue_email() writes a message to email_outbox in the caller's
+transaction, so a request that rolls back sends nothing and one that
+commits cannot lose its mail to a worker restart. Delivery happens
+elsewhere:
+
+    python outbox.py        # long-running delivery worker
+
+Workers claim batches of due messages with FOR UPDATE SKIP LOCKED, so any
+number of them (plus app.py's in-process drain, see OUTBOX_INLINE_DELIVERY)
+can run side by side. A claim is a lease: a message whose worker died
+mid-send is claimed again once the lease runs out.
+
+Mail goes out through smtp_pool, which keeps authenticated SMTP
+connections open between messages and sends a whole batch per session.
+A message that fails is tried a few more times with tenacity for short SMTP
+hiccups, then put back with a growing delay. Permanent rejections and
+messages out of attempts are marked 'failed' with the last error.
+
+The same workers send bulk campaigns (email_campaigns) between outbox
+batches. One worker at a time holds a lease on a campaign and renews it
+before every message. It renders and sends recipients up to a second's
+worth at a time, no faster than the campaign's rate, and records each
+recipient's status as it goes, so a campaign interrupted by a crash resumes
+where it stopped. A throttle wait that would outlast the worker's turn is
+left on the campaign's lease rather than slept through.
+"""
+import functools
+import logging
+import math
+import os
+import smtplib
+import sys
+import threading
+import time
+import uuid
+from contextlib import nullcontext
+from email import policy
+from email.message import EmailMessage
+from email.parser import BytesParser
+
+import psycopg
+from jinja2 import FileSystemLoader, select_autoescape
+from jinja2.sandbox import SandboxedEnvironment
+from psycopg.rows import dict_row
+from tenacity import retry, retry_if_exception, stop_after_attempt, wait_exponential
+
+
+DATABASE_URL = os.getenv("DATABASE_URL")
+
+# NOTIFY channel that wakes idle workers when a message is queued
+CHANNEL = "email_outbox"
+
+BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "20"))
+POLL_SECONDS = float(os.getenv("OUTBOX_POLL_SECONDS", "15"))
+# A lease is renewed before each message is sent and again before its
+# retries, so it only has to outlast the longer of those stretches:
+# deliver()'s three connect-and-send attempts, about 6 x SMTP_TIMEOUT.
+LEASE_SECONDS = int(os.getenv("OUTBOX_LEASE_SECONDS", "300"))
+MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "8"))
+MAX_BACKOFF_SECONDS = 6 * 3600
+
+SMTP_TIMEOUT = float(os.getenv("SMTP_TIMEOUT", "30"))
+SMTP_MAX_CONNECTIONS = int(os.getenv("SMTP_MAX_CONNECTIONS", "2"))       # per process
+SMTP_MAX_IDLE_SECONDS = float(os.getenv("SMTP_MAX_IDLE_SECONDS", "60"))
+SMTP_MAX_MESSAGES_PER_CONNECTION = int(os.getenv("SMTP_MAX_MESSAGES_PER_CONNECTION", "100"))
+# Reused connections idle longer than this are checked with NOOP first
+SMTP_NOOP_AFTER_SECONDS = 5
+
+# Campaign messages per second, unless a campaign sets its own rate. Only
+# one worker sends a campaign at a time, so this is the campaign's total
+# rate. A worker keeps a campaign for CAMPAIGN_BATCH_SECONDS of sending
+# before checking the outbox again.
+CAMPAIGN_RATE = float(os.getenv("CAMPAIGN_RATE", "5"))
+# Slowest and fastest rate a campaign may set. Stored rates outside them
+# are clamped when sent, and ones that are not a number use CAMPAIGN_RATE.
+CAMPAIGN_MIN_RATE = 0.01
+CAMPAIGN_MAX_RATE = 50.0
+CAMPAIGN_BATCH_SECONDS = 10
+CAMPAIGN_MAX_ATTEMPTS = 3
+
+TEMPLATE_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "templates")
+
+log = logging.getLogger("outbox")
+
+
+# =====
+# Queueing
+# =====
+def enqueue_email(cur, kind: str, msg: EmailMessage, send_at=None) -> int:
+    """
+    Queue msg for delivery in cur's transaction, now or not before send_at.
+    Returns the outbox id.
+    """
+    cur.execute(
+        """
+        INSERT INTO email_outbox (kind, recipient, subject, message, next_attempt_at)
+        VALUES (%s, %s, %s, %s, COALESCE(%s, now()))
+        RETURNING id
+        """,
+        (kind, msg["To"], msg["Subject"] or "", msg.as_bytes(policy=policy.SMTP), send_at),
+    )
+    outbox_id = cur.fetchone()["id"]
+    if send_at is None:
+        notify_workers(cur)
+    return outbox_id
+
+
+def notify_workers(cur) -> None:
+    """Wake idle workers once cur's transaction commits."""
+    # Delivered on commit only, like the rows that prompted it
+    cur.execute("SELECT pg_notify(%s, '')", (CHANNEL,))
+
+
+def replace_queued_email(cur, outbox_id: int, msg: EmailMessage) -> None:
+    """
+    Swap the content of a message that is still pending. The caller must
+    hold the row lock (SELECT ... FOR UPDATE) and have seen it pending.
+    """
+    cur.execute(
+        "UPDATE email_outbox SET subject = %s, message = %s WHERE id = %s",
+        (msg["Subject"] or "", msg.as_bytes(policy=policy.SMTP), outbox_id),
+    )
+
+
+# =====
+# SMTP
+# =====
+class SendSkipped(Exception):
+    """send_many() did not send a message because before_send declined it."""
+
+
+def _connection_broken(exc: BaseException) -> bool:
+    """
+    Whether exc means the SMTP connection itself is gone. smtplib errors are
+    OSErrors too, but a rejected message (4xx/5xx reply) leaves the session
+    usable: smtplib resets it with RSET.
+    """
+    if isinstance(exc, smtplib.SMTPServerDisconnected):
+        return True
+    return isinstance(exc, OSError) and not isinstance(exc, smtplib.SMTPException)
+
+
+class _Session:
+    def __init__(self, server: smtplib.SMTP):
+        self.server = server
+        self.sent = 0
+        self.last_used = time.monotonic()
+
+
+class SMTPConnectionPool:
+    """
+    Authenticated SMTP connections shared by the threads of one process.
+
+    A connection stays open after use, so STARTTLS and AUTH happen once per
+    connection rather than once per email. At most max_connections are in
+    use at a time; others wait for a free one. Idle connections are closed
+    after max_idle seconds, checked with NOOP before reuse, and retired after
+    max_messages so servers that cap messages per session are respected.
+    """
+
+    def __init__(self, max_connections: int = SMTP_MAX_CONNECTIONS,
+                 max_idle: float = SMTP_MAX_IDLE_SECONDS,
+                 max_messages: int = SMTP_MAX_MESSAGES_PER_CONNECTION):
+        self.max_connections = max_connections
+        self.max_idle = max_idle
+        self.max_messages = max_messages
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self) -> None:
+        self._pid = os.getpid()
+        self._idle = []
+        self._slots = threading.BoundedSemaphore(self.max_connections)
+
+    def _open(self) -> _Session:
+        smtp_host = os.environ.get("SMTP_HOST", "localhost")
+        smtp_port = int(os.environ.get("SMTP_PORT", "25"))
+        smtp_user = os.environ.get("SMTP_USER")
+        smtp_password = os.environ.get("SMTP_PASSWORD")
+
+        server = smtplib.SMTP(smtp_host, smtp_port, timeout=SMTP_TIMEOUT)
+        try:
+            if smtp_user and smtp_password:
+                server.starttls()
+                server.login(smtp_user, smtp_password)
+        except BaseException:
+            server.close()
+            raise
+        return _Session(server)
+
+    @staticmethod
+    def _close(session: _Session) -> None:
+        try:
+            session.server.quit()
+        except Exception:
+            session.server.close()
+
+    def _acquire(self) -> None:
+        with self._lock:
+            if self._pid != os.getpid():
+                # Inherited through fork; those sockets belong to the parent
+                self._reset()
+            slots = self._slots
+        if not slots.acquire(timeout=SMTP_TIMEOUT):
+            raise TimeoutError("Timed out waiting for a free SMTP connection")
+
+    def _release(self) -> None:
+        self._slots.release()
+
+    def _checkout(self) -> _Session:
+        now = time.monotonic()
+        expired = []
+        session = None
+        with self._lock:
+            while self._idle:
+                candidate = self._idle.pop()
+                if now - candidate.last_used > self.max_idle:
+                    expired.append(candidate)
+                else:
+                    session = candidate
+                    break
+        for old in expired:
+            self._close(old)
+
+        if session is not None and now - session.last_used > SMTP_NOOP_AFTER_SECONDS:
+            try:
+                healthy = session.server.noop()[0] == 250
+            except Exception:
+                healthy = False
+            if not healthy:
+                session.server.close()
+                session = None
+
+        return session or self._open()
+
+    def _checkin(self, session: _Session) -> None:
+        if session.sent >= self.max_messages:
+            self._close(session)
+            return
+        session.last_used = time.monotonic()
+        with self._lock:
+            if self._pid == os.getpid():
+                self._idle.append(session)
+                return
+        session.server.close()
+
+    def send_many(self, messages: list[EmailMessage],
+                  before_send=None) -> list[Exception | None]:
+        """
+        Send messages over one connection. Returns one entry per message:
+        None if it was accepted, otherwise the exception. A connection that
+        drops mid-batch is replaced and the message retried once on the new
+        one; if no connection can be made, the remaining messages all get
+        that error.
+
+        before_send(i), if given, is called before messages[i] is sent;
+        when it returns False the message is skipped with SendSkipped.
+        """
+        results = [None] * len(messages)
+        if not messages:
+            return results
+
+        try:
+            self._acquire()
+        except TimeoutError as e:
+            return [e] * len(messages)
+
+        session = None
+        try:
+            i = 0
+            retried = False
+            while i < len(messages):
+                if not retried and before_send is not None and not before_send(i):
+                    results[i] = SendSkipped()
+                    i += 1
+                    continue
+
+                if session is None:
+                    try:
+                        session = self._checkout()
+                    except Exception as e:
+                        results[i:] = [e] * (len(messages) - i)
+                        break
+
+                try:
+                    session.server.send_message(messages[i])
+                except Exception as e:
+                    if _connection_broken(e):
+                        session.server.close()
+                        session = None
+                        if not retried:
+                            retried = True
+                            continue
+                    results[i] = e
+                else:
+                    session.sent += 1
+                    if session.sent >= self.max_messages:
+                        self._close(session)
+                        session = None
+
+                i += 1
+                retried = False
+        finally:
+            if session is not None:
+                self._checkin(session)
+            self._release()
+
+        return results
+
+    def send(self, msg: EmailMessage) -> None:
+        error = self.send_many([msg])[0]
+        if error is not None:
+            raise error
+
+    def close(self) -> None:
+        """Close every idle connection (e.g. on worker exit)."""
+        with self._lock:
+            idle, self._idle = self._idle, []
+            owned = self._pid == os.getpid()
+        for session in idle:
+            if owned:
+                self._close(session)
+            else:
+                session.server.close()
+
+
+smtp_pool = SMTPConnectionPool()
+
+
+def smtp_send(msg: EmailMessage) -> None:
+    smtp_pool.send(msg)
+
+
+def is_transient(exc: BaseException) -> bool:
+    """
+    Whether a delivery error is worth retrying. 4xx replies, dropped
+    connections and network errors are; 5xx replies and refused recipients
+    are not. Bad credentials are treated as transient so a configuration
+    mistake delays mail instead of failing it.
+    """
+    if isinstance(exc, smtplib.SMTPAuthenticationError):
+        return True
+    if isinstance(exc, smtplib.SMTPRecipientsRefused):
+        return False
+    if isinstance(exc, smtplib.SMTPResponseException):
+        return 400 <= exc.smtp_code < 500
+    return isinstance(exc, (smtplib.SMTPException, OSError))
+
+
+@retry(
+    retry=retry_if_exception(is_transient),
+    stop=stop_after_attempt(3),
+    wait=wait_exponential(multiplier=1, max=10),
+    reraise=True,
+)
+def deliver(msg: EmailMessage) -> None:
+    smtp_send(msg)
+
+
+# =====
+# Delivery
+# =====
+CLAIM_SQL = """
+UPDATE email_outbox o
+SET status = 'sending',
+    attempts = o.attempts + 1,
+    locked_until = now() + make_interval(secs => %s)
+FROM (
+    SELECT id
+    FROM email_outbox
+    WHERE (status = 'pending' AND next_attempt_at <= now())
+       OR (status = 'sending' AND locked_until < now())
+    ORDER BY next_attempt_at, id
+    LIMIT %s
+    FOR UPDATE SKIP LOCKED
+) due
+WHERE o.id = due.id
+RETURNING o.id, o.message, o.attempts
+"""
+
+
+def backoff_seconds(attempts: int) -> int:
+    """Delay before attempt attempts + 1: 1 min, 2 min, 4 min, ... up to 6 h."""
+    return min(60 * 2 ** max(0, attempts - 1), MAX_BACKOFF_SECONDS)
+
+
+def claim_batch(conn, limit: int = BATCH_SIZE) -> list[dict]:
+    with conn.transaction():
+        with conn.cursor(row_factory=dict_row) as cur:
+            cur.execute(CLAIM_SQL, (LEASE_SECONDS, limit))
+            return cur.fetchall()
+
+
+def renew_lease(conn, outbox_id: int, attempts: int) -> bool:
+    """
+    Extend the lease on a message this worker claimed. Returns False if
+    the lease already ran out and another worker claimed it again (which
+    bumped attempts), in which case this worker must not send it.
+    """
+    with conn.transaction():
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                UPDATE email_outbox
+                SET locked_until = now() + make_interval(secs => %s)
+                WHERE id = %s AND status = 'sending' AND attempts = %s
+                """,
+                (LEASE_SECONDS, outbox_id, attempts),
+            )
+            return cur.rowcount == 1
+
+
+def mark_sent(conn, outbox_id: int) -> None:
+    with conn.transaction():
+        conn.execute(
+            """
+            UPDATE email_outbox
+            SET status = 'sent', sent_at = now(), locked_until = NULL, last_error = NULL
+            WHERE id = %s
+            """,
+            (outbox_id,),
+        )
+
+
+def mark_failed(conn, outbox_id: int, attempts: int, error: BaseException) -> None:
+    permanent = not is_transient(error) or attempts >= MAX_ATTEMPTS
+    with conn.transaction():
+        conn.execute(
+            """
+            UPDATE email_outbox
+            SET status = %s,
+                last_error = %s,
+                locked_until = NULL,
+                next_attempt_at = now() + make_interval(secs => %s)
+            WHERE id = %s AND status = 'sending' AND attempts = %s
+            """,
+            (
+                "failed" if permanent else "pending",
+                f"{type(error).__name__}: {error}"[:2000],
+                backoff_seconds(attempts),
+                outbox_id,
+                attempts,
+            ),
+        )
+
+
+def deliver_batch(connect, limit: int = BATCH_SIZE) -> int:
+    """
+    Claim up to limit due messages and try to send each. Returns how many
+    were claimed.
+
+    connect() is as for deliver_campaign_batch: it is entered only around
+    each database step (the claim, every lease renewal, marking a message
+    sent or failed), so neither a row lock nor a pooled connection is held
+    while talking to SMTP or waiting between retries. Each message's lease
+    is renewed right before it is sent, and a message whose lease ran out
+    in the meantime is left to whoever claimed it.
+    """
+    with connect() as conn:
+        rows = claim_batch(conn, limit)
+    if not rows:
+        return 0
+
+    messages = [
+        BytesParser(policy=policy.default).parsebytes(bytes(row["message"]))
+        for row in rows
+    ]
+
+    def still_ours(i: int) -> bool:
+        with connect() as conn:
+            return renew_lease(conn, rows[i]["id"], rows[i]["attempts"])
+
+    # The whole batch in one SMTP session; only failures take the slow path
+    errors = smtp_pool.send_many(messages, before_send=still_ours)
+
+    for i, (row, msg, error) in enumerate(zip(rows, messages, errors)):
+        if isinstance(error, SendSkipped):
+            log.warning("Outbox message %s was claimed by another worker; skipped", row["id"])
+            continue
+
+        if error is not None and is_transient(error) and still_ours(i):
+            try:
+                deliver(msg)
+                error = None
+            except Exception as e:
+                error = e
+
+        with connect() as conn:
+            if error is None:
+                mark_sent(conn, row["id"])
+            else:
+                log.warning("Outbox message %s failed (attempt %s): %s", row["id"], row["attempts"], error)
+                mark_failed(conn, row["id"], row["attempts"], error)
+    return len(rows)
+
+
+def drain(connect, stop: threading.Event | None = None) -> int:
+    """
+    Deliver batches until nothing is due, or until stop is set (checked
+    between batches). Returns how many were claimed.
+    """
+    total = 0
+    while stop is None or not stop.is_set():
+        claimed = deliver_batch(connect)
+        if not claimed:
+            return total
+        total += claimed
+    return total
+
+
+# =====
+# Campaigns
+# =====
+# Campaign subjects and bodies are written by admins, so they are rendered
+# in Jinja's sandbox with only the recipient's merge fields in scope.
+_campaign_env = SandboxedEnvironment(
+    loader=FileSystemLoader(TEMPLATE_FOLDER),
+    autoescape=select_autoescape(["html"], default_for_string=False),
+)
+
+CAMPAIGN_MERGE_FIELDS = ("first_name", "last_name", "full_name", "email")
+
+CLAIM_CAMPAIGN_SQL = """
+UPDATE email_campaigns c
+SET locked_until = now() + make_interval(secs => %s),
+    locked_by = %s
+FROM (
+    SELECT id
+    FROM email_campaigns
+    WHERE status = 'sending'
+      AND (locked_until IS NULL OR locked_until < now())
+    ORDER BY started_at, id
+    LIMIT 1
+    FOR UPDATE SKIP LOCKED
+) due
+WHERE c.id = due.id
+RETURNING c.id, c.subject, c.body, c.logo_url, c.rate
+"""
+
+
+@functools.lru_cache(maxsize=32)
+def compile_campaign(subject: str, body: str):
+    """
+    Compile a campaign's subject and body templates. Raises
+    jinja2.TemplateError if either does not parse.
+    """
+    return _campaign_env.from_string(subject), _campaign_env.from_string(body)
+
+
+def render_campaign_email(campaign: dict, recipient: dict) -> EmailMessage:
+    """The campaign message for one recipient row."""
+    subject_template, body_template = compile_campaign(campaign["subject"], campaign["body"])
+    first_name = recipient.get("first_name") or ""
+    last_name = recipient.get("last_name") or ""
+    fields = {
+        "first_name": first_name,
+        "last_name": last_name,
+        "full_name": f"{first_name} {last_name}".strip(),
+        "email": recipient["email"],
+    }
+    subject = " ".join(subject_template.render(fields).split())
+    text_body = body_template.render(fields)
+    html_body = _campaign_env.get_template("email/campaign.html").render(
+        body=text_body, subject=subject, logo_url=campaign.get("logo_url"),
+    )
+
+    msg = EmailMessage()
+    msg["Subject"] = subject
+    msg["From"] = os.environ.get("SMTP_FROM", "no-reply@kraskickers.org")
+    msg["To"] = recipient["email"]
+    msg.set_content(text_body)
+    msg.add_alternative(html_body, subtype="html")
+    return msg
+
+
+def campaign_rate(rate: float | None) -> float:
+    """The messages per second to send a campaign at, given its stored rate."""
+    if rate is None or not math.isfinite(rate):
+        return CAMPAIGN_RATE
+    return min(max(rate, CAMPAIGN_MIN_RATE), CAMPAIGN_MAX_RATE)
+
+
+def claim_campaign(conn, token: str) -> dict | None:
+    """Lease one sending campaign nobody else is working on, as token."""
+    with conn.transaction():
+        with conn.cursor(row_factory=dict_row) as cur:
+            cur.execute(CLAIM_CAMPAIGN_SQL, (LEASE_SECONDS, token))
+            return cur.fetchone()
+
+
+def renew_campaign_lease(conn, campaign_id: int, token: str) -> bool:
+    """
+    Extend token's lease on a campaign. False if the campaign was cancelled
+    or finished, or the lease ran out and another worker holds it now.
+    """
+    with conn.transaction():
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                UPDATE email_campaigns
+                SET locked_until = now() + make_interval(secs => %s)
+                WHERE id = %s AND locked_by = %s AND status = 'sending'
+                """,
+                (LEASE_SECONDS, campaign_id, token),
+            )
+            return cur.rowcount == 1
+
+
+def release_campaign(conn, campaign_id: int, token: str, hold_seconds: float = 0.0) -> None:
+    """
+    Give up token's lease. With hold_seconds, nobody may claim the campaign
+    again until they pass (the rest of a throttle wait).
+    """
+    with conn.transaction():
+        conn.execute(
+            """
+            UPDATE email_campaigns
+            SET locked_until = CASE WHEN %s > 0 THEN now() + make_interval(secs => %s) END,
+                locked_by = NULL
+            WHERE id = %s AND locked_by = %s
+            """,
+            (hold_seconds, hold_seconds, campaign_id, token),
+        )
+
+
+def pending_recipients(conn, campaign_id: int, limit: int) -> list[dict]:
+    with conn.transaction():
+        with conn.cursor(row_factory=dict_row) as cur:
+            cur.execute(
+                """
+                SELECT id, email, first_name, last_name, attempts
+                FROM campaign_recipients
+                WHERE campaign_id = %s AND status = 'pending'
+                ORDER BY id
+                LIMIT %s
+                """,
+                (campaign_id, limit),
+            )
+            return cur.fetchall()
+
+
+def finish_campaign(conn, campaign_id: int) -> None:
+    with conn.transaction():
+        conn.execute(
+            """
+            UPDATE email_campaigns
+            SET status = 'sent', completed_at = now(), locked_until = NULL, locked_by = NULL
+            WHERE id = %s AND status = 'sending'
+            """,
+            (campaign_id,),
+        )
+    log.info("Campaign %s finished", campaign_id)
+
+
+def _record_campaign_results(conn, results: list[tuple[dict, BaseException | None]]) -> None:
+    rows = []
+    for recipient, error in results:
+        if isinstance(error, SendSkipped):
+            # Not sent; still pending for whoever holds the campaign now
+            continue
+        if error is None:
+            rows.append(("sent", None, recipient["id"]))
+            continue
+        attempts = recipient["attempts"] + 1
+        retry = is_transient(error) and attempts < CAMPAIGN_MAX_ATTEMPTS
+        log.warning("Campaign recipient %s failed (attempt %s): %s", recipient["id"], attempts, error)
+        rows.append(("pending" if retry else "failed", f"{type(error).__name__}: {error}"[:2000], recipient["id"]))
+
+    if not rows:
+        return
+    with conn.transaction():
+        with conn.cursor() as cur:
+            cur.executemany(
+                """
+                UPDATE campaign_recipients
+                SET status = %s,
+                    last_error = %s,
+                    attempts = attempts + 1,
+                    sent_at = CASE WHEN %s::text = 'sent' THEN now() END
+                WHERE id = %s
+                """,
+                [(status, error, status, recipient_id) for status, error, recipient_id in rows],
+            )
+
+
+def deliver_campaign_batch(connect) -> int:
+    """
+    Lease one campaign and send it for up to CAMPAIGN_BATCH_SECONDS at its
+    rate, up to a second's worth of recipients at a time. Returns how many
+    recipients were attempted.
+
+    The throttle never sleeps past CAMPAIGN_BATCH_SECONDS: when the next
+    chunk is due later than that, the campaign is released with the rest
+    of the wait as its lease, so this thread gets back to the outbox on
+    time and nobody sends the campaign early.
+
+    connect() must return a context manager yielding a connection. It is
+    entered only around each database step, so a pooled connection is not
+    held while talking to SMTP or waiting out the throttle. The lease is
+    renewed before every message; once it cannot be (cancelled, or lost to
+    another worker) nothing more is sent. Recipients are marked as they
+    are sent, so a crash resends at most the messages in flight.
+    """
+    token = uuid.uuid4().hex
+    with connect() as conn:
+        campaign = claim_campaign(conn, token)
+    if campaign is None:
+        return 0
+
+    campaign_id = campaign["id"]
+    rate = campaign_rate(campaign["rate"])
+    deadline = time.monotonic() + CAMPAIGN_BATCH_SECONDS
+
+    def still_ours(i: int = 0) -> bool:
+        with connect() as conn:
+            return renew_campaign_lease(conn, campaign_id, token)
+
+    release_lease = True
+    hold_seconds = 0.0
+    attempted = 0
+    try:
+        while True:
+            started = time.monotonic()
+            if started >= deadline or not still_ours():
+                break
+            # A second's worth, or as many as the rest of the turn allows at
+            # this rate; at least one, so a slow campaign still moves
+            limit = max(1, min(math.ceil(rate), int(rate * (deadline - started))))
+            with connect() as conn:
+                recipients = pending_recipients(conn, campaign_id, limit)
+                if not recipients:
+                    finish_campaign(conn, campaign_id)
+                    break
+
+            results = []
+            messages = []
+            for recipient in recipients:
+                try:
+                    messages.append((recipient, render_campaign_email(campaign, recipient)))
+                except Exception as e:
+                    results.append((recipient, e))
+
+            errors = smtp_pool.send_many([msg for _, msg in messages], before_send=still_ours)
+            results.extend((recipient, error) for (recipient, _), error in zip(messages, errors))
+            with connect() as conn:
+                _record_campaign_results(conn, results)
+            attempted += len(recipients)
+
+            if any(isinstance(error, SendSkipped) for error in errors):
+                break
+            if messages and all(error is not None and is_transient(error) for error in errors):
+                # SMTP looks down: keep the lease so nobody retries until it expires
+                release_lease = False
+                break
+
+            next_chunk = started + len(recipients) / rate
+            if next_chunk > deadline:
+                hold_seconds = max(0.0, next_chunk - time.monotonic())
+                break
+            time.sleep(max(0.0, next_chunk - time.monotonic()))
+    finally:
+        if release_lease:
+            with connect() as conn:
+                release_campaign(conn, campaign_id, token, hold_seconds)
+
+    return attempted
+
+
+def deliver_due(connect, stop: threading.Event | None = None) -> int:
+    """
+    Drain the outbox, then send campaign batches until none is ready,
+    draining the outbox again between them so transactional mail is never
+    stuck behind a campaign. connect() is as for deliver_campaign_batch.
+    Once stop is set, returns after the batch in progress. Returns how many
+    messages were attempted.
+    """
+    total = drain(connect, stop)
+    while stop is None or not stop.is_set():
+        sent = deliver_campaign_batch(connect)
+        if not sent:
+            break
+        total += sent + drain(connect, stop)
+    return total
+
+
+def run_worker(conninfo: str | None = None) -> None:
+    """
+    Deliver mail forever. Sleeps between rounds until a message is queued
+    or a campaign started (NOTIFY), or POLL_SECONDS pass, which is when
+    retries come due.
+    """
+    conninfo = conninfo or DATABASE_URL
+    if not conninfo:
+        raise RuntimeError("DATABASE_URL environment variable is not set.")
+
+    while True:
+        try:
+            with psycopg.connect(conninfo, autocommit=True, row_factory=dict_row) as conn:
+                conn.execute(f"LISTEN {CHANNEL}")
+                log.info("Outbox worker listening")
+                while True:
+                    sent = deliver_due(lambda: nullcontext(conn))
+                    if sent:
+                        log.info("Processed %s message(s)", sent)
+                    for _ in conn.notifies(timeout=POLL_SECONDS, stop_after=1):
+                        pass
+        except psycopg.OperationalError:
+            log.exception("Outbox worker lost its database connection; retrying")
+            time.sleep(POLL_SECONDS)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+    try:
+        run_worker()
+    except KeyboardInterrupt:
+        sys.exit(0)
+    finally:
+        smtp_pool.close()
@@ -0,0 +1,62 @@
+// "Load more" for keyset-paginated listings.
+//
+// A page marks the element holding its rows with data-page-items and renders
+//   <button id="loadMoreBtn" data-next-url="..."></button>
+// when another page exists. Clicking fetches the next page as HTML, appends
+// its rows to the container, and moves the button to the following page.
+// A "page-loaded" event is fired on document so page scripts can re-apply
+// filters to the new rows.
+(function () {
+  function container(root) {
+    return root.querySelector("[data-page-items]");
+  }
+
+  function loadMore(btn) {
+    const url = btn.dataset.nextUrl;
+    if (!url) return;
+
+    btn.disabled = true;
+    const label = btn.textContent;
+    btn.textContent = "Loading...";
+
+    fetch(url, { headers: { "X-Requested-With": "fetch" } })
+      .then(res => {
+        if (!res.ok) throw new Error("HTTP " + res.status);
+        return res.text();
+      })
+      .then(html => {
+        const doc = new DOMParser().parseFromString(html, "text/html");
+        const incoming = container(doc);
+        const target = container(document);
+        if (incoming && target) {
+          Array.from(incoming.children).forEach(el => {
+            target.appendChild(document.importNode(el, true));
+          });
+        }
+
+        const nextBtn = doc.getElementById("loadMoreBtn");
+        if (nextBtn && nextBtn.dataset.nextUrl) {
+          btn.dataset.nextUrl = nextBtn.dataset.nextUrl;
+          btn.disabled = false;
+          btn.textContent = label;
+        } else {
+          btn.remove();
+        }
+
+        document.dispatchEvent(new CustomEvent("page-loaded"));
+      })
+      .catch(() => {
+        btn.disabled = false;
+        btn.textContent = label;
+        alert("Could not load more results. Please try again.");
+      });
+  }
+
+  document.addEventListener("click", function (e) {
+    const btn = e.target.closest("#loadMoreBtn");
+    if (btn) {
+      e.preventDefault();
+      loadMore(btn);
+    }
+  });
+})();
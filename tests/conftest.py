@@ -0,0 +1,59 @@
+"""
+Integration tests run against a scratch Postgres database.
+
+Set TEST_DATABASE_URL to a database the tests may write to; app.py migrates
+its schema on import. Without it, or without the app's dependencies
+installed, the tests are skipped. Unit tests that only need app.py's code
+use the app_code fixture and run either way.
+"""
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+
+
+def _import_app():
+    for module in ("flask", "psycopg_pool", "PIL", "tenacity"):
+        pytest.importorskip(module)
+
+    if TEST_DATABASE_URL:
+        os.environ["DATABASE_URL"] = TEST_DATABASE_URL
+    else:
+        # Never let the tests reach whatever database the shell points at
+        os.environ.pop("DATABASE_URL", None)
+    # A small pool, so a leaked connection shows up within a few requests
+    os.environ.setdefault("DB_POOL_MAX_SIZE", "3")
+    os.environ.setdefault("DB_POOL_TIMEOUT", "5")
+    os.environ.setdefault("OUTBOX_INLINE_DELIVERY", "0")
+    os.environ.setdefault("MIGRATE_ON_IMPORT", "1")
+
+    import app
+    return app
+
+
+@pytest.fixture(scope="session")
+def app_module():
+    if not TEST_DATABASE_URL:
+        pytest.skip("TEST_DATABASE_URL is not set")
+    return _import_app()
+
+
+@pytest.fixture(scope="session")
+def app_code():
+    """app.py for unit tests; connected to TEST_DATABASE_URL only if it is set."""
+    return _import_app()
+
+
+@pytest.fixture
+def db(app_module):
+    """An autocommit connection outside the app's pool, for setup and checks."""
+    import psycopg
+    from psycopg.rows import dict_row
+
+    with psycopg.connect(TEST_DATABASE_URL, autocommit=True, row_factory=dict_row) as conn:
+        yield conn
@@ -0,0 +1,134 @@
+import uuid
+
+import pytest
+
+
+@pytest.fixture
+def opportunities(db):
+    """An open and a closed opportunity, plus a Champion-Leader one."""
+    suffix = uuid.uuid4().hex[:8]
+    ids = {}
+    for key, title, closed in [
+        ("open", f"Open {suffix}", False),
+        ("closed", f"Closed {suffix}", True),
+        ("leader", "Champion-Leader", False),
+    ]:
+        cur = db.execute(
+            """
+            INSERT INTO opportunities (title, time, duration, mode, location, closed)
+            VALUES (%s, 'Saturday', '2 hours', 'Remote', 'Online', %s)
+            RETURNING id
+            """,
+            (title, closed),
+        )
+        ids[key] = cur.fetchone()["id"]
+
+    yield ids
+
+    db.execute("DELETE FROM applications WHERE opportunity_id = ANY(%s)", (list(ids.values()),))
+    db.execute("DELETE FROM opportunities WHERE id = ANY(%s)", (list(ids.values()),))
+
+
+@pytest.fixture
+def volunteer(app_module):
+    email = f"{uuid.uuid4().hex[:10]}@example.org"
+    client = app_module.app.test_client()
+    with client.session_transaction() as sess:
+        sess["email_verified"] = True
+        sess["verified_email"] = email
+    return client, email
+
+
+def apply(client, email, **fields):
+    form = {"first_name": "Test", "last_name": "Volunteer", "email": email}
+    form.update(fields)
+    return client.post("/", data=form)
+
+
+def test_apply_takes_title_from_the_opportunity(db, opportunities, volunteer):
+    client, email = volunteer
+    response = apply(client, email, opportunity_id=opportunities["open"], title="Something else")
+    assert response.status_code == 200
+
+    row = db.execute(
+        "SELECT title, opportunity_id FROM applications WHERE id = %s",
+        (response.get_json()["application_id"],),
+    ).fetchone()
+    assert row["opportunity_id"] == opportunities["open"]
+    assert row["title"].startswith("Open ")
+
+
+@pytest.mark.parametrize("key", ["closed", "missing"])
+def test_apply_rejects_closed_or_missing_opportunity(db, opportunities, volunteer, key):
+    client, email = volunteer
+    opp_id = opportunities["closed"] if key == "closed" else max(opportunities.values()) + 1000
+    response = apply(client, email, opportunity_id=opp_id, title="Anything")
+    assert response.status_code == 400
+
+    count = db.execute(
+        "SELECT COUNT(*) AS n FROM applications WHERE LOWER(email) = %s", (email,)
+    ).fetchone()["n"]
+    assert count == 0
+
+
+def test_assigning_champion_leader_promotes_by_opportunity_id(app_module, db, opportunities):
+    email = f"{uuid.uuid4().hex[:10]}@example.org"
+    # The title is stale on purpose: promotion follows the opportunity key
+    app_id = db.execute(
+        """
+        INSERT INTO applications (first_name, last_name, email, title, status, opportunity_id)
+        VALUES ('Test', 'Leader', %s, 'Renamed', 'Pending', %s)
+        RETURNING id
+        """,
+        (email, opportunities["leader"]),
+    ).fetchone()["id"]
+
+    client = app_module.app.test_client()
+    with client.session_transaction() as sess:
+        sess["admin_verified"] = True
+    response = client.post(f"/update_status/{app_id}", data={"status": "Assigned"})
+    assert response.status_code == 200
+
+    row = db.execute("SELECT is_champion FROM applications WHERE id = %s", (app_id,)).fetchone()
+    assert row["is_champion"] is True
+
+
+@pytest.mark.parametrize("path, form", [
+    ("/update_status/{}", {"status": "Assigned"}),
+    ("/add_note/{}", {"note": "Hello"}),
+])
+def test_champion_cannot_act_on_other_opportunities_via_opp_id(app_module, db, opportunities, path, form):
+    # A champion of the open opportunity, and an application to the leader one
+    email = f"{uuid.uuid4().hex[:10]}@example.org"
+    champion_id = db.execute(
+        """
+        INSERT INTO applications (first_name, last_name, email, status, is_champion, opportunity_id)
+        VALUES ('Cham', 'Pion', %s, 'Assigned', TRUE, %s)
+        RETURNING id
+        """,
+        (email, opportunities["open"]),
+    ).fetchone()["id"]
+    db.execute(
+        "INSERT INTO champions_opportunities (champion_id, opportunity_id) VALUES (%s, %s)",
+        (champion_id, opportunities["open"]),
+    )
+    other_id = db.execute(
+        """
+        INSERT INTO applications (first_name, last_name, email, status, opportunity_id)
+        VALUES ('Some', 'One', 'someone@example.org', 'Pending', %s)
+        RETURNING id
+        """,
+        (opportunities["leader"],),
+    ).fetchone()["id"]
+
+    client = app_module.app.test_client()
+    with client.session_transaction() as sess:
+        sess["email_verified"] = True
+        sess["verified_email"] = email
+    try:
+        response = client.post(path.format(other_id), query_string={"opp_id": opportunities["open"]}, data=form)
+        assert response.status_code == 403
+        # Their own opportunity's applications are still theirs to manage
+        assert client.post(path.format(champion_id), data=form).status_code == 200
+    finally:
+        db.execute("DELETE FROM champions_opportunities WHERE champion_id = %s", (champion_id,))
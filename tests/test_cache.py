@@ -0,0 +1,113 @@
+import threading
+
+import pytest
+
+
+@pytest.fixture
+def cache(app_code):
+    return app_code.VersionedCache(ttl=60)
+
+
+def test_build_from_snapshot_older_than_invalidation_is_not_stored(cache):
+    # A GET request took its snapshot, then another worker's write was
+    # invalidated before the request got round to building the key
+    as_of = cache.clock()
+    cache.invalidate("key")
+
+    assert cache.get_or_build("key", lambda: "stale", as_of=as_of) == "stale"
+    assert cache.get_or_build("key", lambda: "fresh") == "fresh"
+
+
+def test_build_from_snapshot_newer_than_invalidation_is_stored(cache):
+    cache.invalidate("key")
+    as_of = cache.clock()
+
+    assert cache.get_or_build("key", lambda: "fresh", as_of=as_of) == "fresh"
+    assert cache.get_or_build("key", lambda: "rebuilt") == "fresh"
+
+
+def test_invalidating_other_keys_does_not_block_storing(cache):
+    as_of = cache.clock()
+    cache.invalidate("other")
+
+    assert cache.get_or_build("key", lambda: "value", as_of=as_of) == "value"
+    assert cache.get_or_build("key", lambda: "rebuilt") == "value"
+
+
+def test_value_is_cached_until_invalidated(cache):
+    calls = []
+
+    def build():
+        calls.append(1)
+        return len(calls)
+
+    assert cache.get_or_build("key", build) == 1
+    assert cache.get_or_build("key", build) == 1
+    cache.invalidate("key")
+    assert cache.get_or_build("key", build) == 2
+
+
+def test_value_expires_after_ttl(app_code):
+    cache = app_code.VersionedCache(ttl=0)
+    assert cache.get_or_build("key", lambda: 1) == 1
+    assert cache.get_or_build("key", lambda: 2) == 2
+
+
+def test_invalidate_prefix_and_clear(cache):
+    for key in ("opportunity_champions:1", "opportunity_champions:2", "champions"):
+        cache.get_or_build(key, lambda: "old")
+
+    cache.invalidate_prefix("opportunity_champions:")
+    assert cache.get_or_build("opportunity_champions:1", lambda: "new") == "new"
+    assert cache.get_or_build("opportunity_champions:2", lambda: "new") == "new"
+    assert cache.get_or_build("champions", lambda: "new") == "old"
+
+    cache.clear()
+    assert cache.get_or_build("champions", lambda: "newer") == "newer"
+
+
+def test_concurrent_requests_share_one_build(cache):
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def slow_build():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return "value"
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(cache.get_or_build("key", slow_build)))
+        for _ in range(5)
+    ]
+    threads[0].start()
+    started.wait(5)
+    for thread in threads[1:]:
+        thread.start()
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert calls == [1]
+    assert results == ["value"] * 5
+
+
+def test_build_overtaken_by_invalidation_is_returned_but_not_stored(cache):
+    def build():
+        # A write commits and is invalidated while this build runs
+        cache.invalidate("key")
+        return "stale"
+
+    assert cache.get_or_build("key", build) == "stale"
+    assert cache.get_or_build("key", lambda: "fresh") == "fresh"
+
+
+def test_failed_build_does_not_block_the_next_one(cache):
+    def broken():
+        raise RuntimeError("database down")
+
+    with pytest.raises(RuntimeError):
+        cache.get_or_build("key", broken)
+    assert cache.get_or_build("key", lambda: "value") == "value"
@@ -0,0 +1,91 @@
+import os
+import time
+import uuid
+
+import pytest
+
+psycopg = pytest.importorskip("psycopg")
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def test_wildcard_keys_evict_by_prefix(app_code):
+    cache = app_code.cache
+    cache.get_or_build("opportunity_champions:7", lambda: "old")
+    cache.get_or_build("champions", lambda: "old")
+
+    app_code.evict_cache_keys(["opportunity_champions:*"])
+
+    assert cache.get_or_build("opportunity_champions:7", lambda: "new") == "new"
+    assert cache.get_or_build("champions", lambda: "new") == "old"
+    cache.clear()
+
+
+# =====
+# Against Postgres
+# =====
+@pytest.fixture
+def listener(app_module):
+    """A connection LISTENing on the cache channel, like another worker."""
+    with psycopg.connect(os.environ["TEST_DATABASE_URL"], autocommit=True) as conn:
+        conn.execute(f"LISTEN {app_module.CACHE_CHANNEL}")
+        yield lambda: [n.payload for n in conn.notifies(timeout=0.5, stop_after=10)]
+
+
+@pytest.fixture
+def admin(app_module):
+    client = app_module.app.test_client()
+    with client.session_transaction() as sess:
+        sess["admin_verified"] = True
+    return client
+
+
+@pytest.fixture
+def application(db):
+    app_id = db.execute(
+        """
+        INSERT INTO applications (first_name, last_name, email, status)
+        VALUES ('Test', 'Volunteer', %s, 'Pending')
+        RETURNING id
+        """,
+        (f"{uuid.uuid4().hex[:10]}@example.org",),
+    ).fetchone()["id"]
+    yield app_id
+    db.execute("DELETE FROM applications WHERE id = %s", (app_id,))
+
+
+def test_committed_write_notifies_other_workers(app_module, admin, listener, application):
+    response = admin.post(f"/update_status/{application}", data={"status": "Assigned"})
+    assert response.status_code == 200
+
+    payloads = listener()
+    assert app_module.CHAMPIONS_KEY in payloads
+    assert app_module.champion_candidates_key("*") in payloads
+
+
+def test_rolled_back_write_notifies_nobody(app_module, admin, listener):
+    # No such application: the route answers 404 and the request rolls back
+    response = admin.post("/update_status/0", data={"status": "Assigned"})
+    assert response.status_code == 404
+    assert listener() == []
+
+
+def test_listener_evicts_keys_published_by_other_workers(app_module, db):
+    cache = app_module.cache
+    app_module.ensure_cache_listener()
+
+    def evicted():
+        # The listener clears the cache whenever it (re)connects, so keep
+        # re-caching until a NOTIFY is seen to evict the key
+        cache.get_or_build(app_module.CHAMPIONS_KEY, lambda: "cached")
+        db.execute("SELECT pg_notify(%s, %s)", (app_module.CACHE_CHANNEL, app_module.CHAMPIONS_KEY))
+        return wait_for(lambda: app_module.CHAMPIONS_KEY not in cache._entries, timeout=0.5)
+
+    assert wait_for(evicted)
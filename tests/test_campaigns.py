@@ -0,0 +1,86 @@
+import pytest
+
+
+@pytest.fixture
+def admin(app_module):
+    client = app_module.app.test_client()
+    with client.session_transaction() as sess:
+        sess["admin_verified"] = True
+    return client
+
+
+def create(admin, **fields):
+    return admin.post("/api/admin/campaigns", json={"subject": "Hello", "body": "Hi {{ first_name }}", **fields})
+
+
+@pytest.mark.parametrize("rate", ["NaN", "inf", "-inf", 0, -1, 0.001, 1000])
+def test_rate_outside_the_allowed_range_is_rejected(admin, rate):
+    response = create(admin, rate=rate)
+    assert response.status_code == 400
+    assert "rate must be between" in response.get_json()["error"]
+
+
+def test_campaign_is_created_as_a_draft(admin, db):
+    response = create(admin, rate=0.5, filters={"status": "Assigned"})
+    assert response.status_code == 201
+    campaign = response.get_json()
+    assert campaign["status"] == "draft"
+    assert campaign["rate"] == 0.5
+    db.execute("DELETE FROM email_campaigns WHERE id = %s", (campaign["id"],))
+
+
+@pytest.mark.parametrize("filters", [
+    {"from": 20240101},
+    {"to": ["2024-01-01"]},
+    {"days": [7]},
+    {"opportunity_id": {"id": 1}},
+    {"opportunity_id": True},
+    {"status": 3},
+    {"status": ["Assigned", 4]},
+])
+def test_filter_of_the_wrong_type_is_rejected(admin, filters):
+    response = create(admin, filters=filters)
+    assert response.status_code == 400
+    assert response.get_json()["error"] == "Invalid rate or filters"
+
+
+def test_subject_that_is_not_a_string_is_rejected(admin):
+    assert create(admin, subject=["Hello"]).status_code == 400
+    assert admin.post("/api/admin/campaigns", json=["not", "an", "object"]).status_code == 400
+
+
+def test_admin_page_lists_the_form_and_is_on_the_menu(admin, app_module):
+    page = admin.get("/campaigns")
+    assert page.status_code == 200
+    assert b'id="campaignForm"' in page.data
+    assert b"/campaigns" in admin.get("/menu").data
+
+    visitor = app_module.app.test_client()
+    assert visitor.get("/campaigns").status_code == 302
+
+
+def test_metrics_count_failed_mail_and_campaign_backlog(admin, db):
+    before = admin.get("/api/admin/metrics").get_json()
+
+    outbox_id = db.execute(
+        "INSERT INTO email_outbox (kind, recipient, message, status) VALUES ('test', 'x@example.org', '', 'failed') RETURNING id"
+    ).fetchone()["id"]
+    campaign_id = db.execute(
+        "INSERT INTO email_campaigns (subject, body, status) VALUES ('Hi', 'Hello', 'sending') RETURNING id"
+    ).fetchone()["id"]
+    db.execute(
+        """
+        INSERT INTO campaign_recipients (campaign_id, email, status)
+        VALUES (%s, 'a@example.org', 'pending'), (%s, 'b@example.org', 'pending'), (%s, 'c@example.org', 'failed')
+        """,
+        (campaign_id, campaign_id, campaign_id),
+    )
+    try:
+        after = admin.get("/api/admin/metrics").get_json()
+    finally:
+        db.execute("DELETE FROM email_outbox WHERE id = %s", (outbox_id,))
+        db.execute("DELETE FROM email_campaigns WHERE id = %s", (campaign_id,))
+
+    assert after["outbox"]["failed"] == before["outbox"]["failed"] + 1
+    assert after["campaigns"]["pending"] == before["campaigns"]["pending"] + 2
+    assert after["campaigns"]["failed"] == before["campaigns"]["failed"] + 1
@@ -0,0 +1,128 @@
+import uuid
+
+import pytest
+
+
+@pytest.fixture
+def championed_opportunity(db):
+    """An open opportunity with one champion; yields (opp_id, champion_email)."""
+    suffix = uuid.uuid4().hex[:8]
+    champion_email = f"champion-{suffix}@example.org"
+    opp_id = db.execute(
+        "INSERT INTO opportunities (title, closed) VALUES (%s, FALSE) RETURNING id",
+        (f"Digest {suffix}",),
+    ).fetchone()["id"]
+    champion_id = db.execute(
+        """
+        INSERT INTO applications (first_name, last_name, email, status, is_champion)
+        VALUES ('Cham', 'Pion', %s, 'Assigned', TRUE)
+        RETURNING id
+        """,
+        (champion_email,),
+    ).fetchone()["id"]
+    db.execute(
+        "INSERT INTO champions_opportunities (champion_id, opportunity_id) VALUES (%s, %s)",
+        (champion_id, opp_id),
+    )
+
+    yield opp_id, champion_email
+
+    db.execute("DELETE FROM email_outbox WHERE recipient = %s", (champion_email,))
+    db.execute("DELETE FROM champion_notification_prefs WHERE email = %s", (champion_email,))
+    db.execute("DELETE FROM champions_opportunities WHERE opportunity_id = %s", (opp_id,))
+    db.execute("DELETE FROM applications WHERE opportunity_id = %s OR id = %s", (opp_id, champion_id))
+    db.execute("DELETE FROM opportunities WHERE id = %s", (opp_id,))
+
+
+def set_digest(db, email, digest):
+    db.execute(
+        "INSERT INTO champion_notification_prefs (email, digest) VALUES (%s, %s)",
+        (email, digest),
+    )
+
+
+def apply(app_module, opp_id):
+    email = f"{uuid.uuid4().hex[:10]}@example.org"
+    client = app_module.app.test_client()
+    with client.session_transaction() as sess:
+        sess["email_verified"] = True
+        sess["verified_email"] = email
+    response = client.post("/", data={
+        "first_name": "Test", "last_name": "Volunteer", "email": email, "opportunity_id": opp_id,
+    })
+    assert response.status_code == 200
+
+
+def champion_mail(db, email):
+    return db.execute(
+        """
+        SELECT id, kind, subject, status, next_attempt_at > now() + interval '50 minutes' AS held
+        FROM email_outbox
+        WHERE recipient = %s
+        ORDER BY id
+        """,
+        (email,),
+    ).fetchall()
+
+
+def test_immediate_sends_one_email_per_application(app_module, db, championed_opportunity):
+    opp_id, champion_email = championed_opportunity
+    apply(app_module, opp_id)
+    apply(app_module, opp_id)
+
+    mail = champion_mail(db, champion_email)
+    assert [m["kind"] for m in mail] == ["champion_notification"] * 2
+
+
+def test_applications_within_a_window_share_one_digest(app_module, db, championed_opportunity):
+    opp_id, champion_email = championed_opportunity
+    set_digest(db, champion_email, "hourly")
+    for _ in range(3):
+        apply(app_module, opp_id)
+
+    mail = champion_mail(db, champion_email)
+    assert len(mail) == 1
+    assert mail[0]["kind"] == "champion_digest"
+    assert mail[0]["subject"] == "3 New Volunteer Applications"
+    assert mail[0]["status"] == "pending"
+    assert mail[0]["held"]
+
+    items = db.execute(
+        """
+        SELECT COUNT(*) AS n
+        FROM champion_digest_items i
+        JOIN champion_digests d ON d.id = i.digest_id
+        WHERE d.outbox_id = %s
+        """,
+        (mail[0]["id"],),
+    ).fetchone()["n"]
+    assert items == 3
+
+
+def test_digest_claimed_for_sending_is_not_added_to(app_module, db, championed_opportunity):
+    opp_id, champion_email = championed_opportunity
+    set_digest(db, champion_email, "hourly")
+    apply(app_module, opp_id)
+    first = champion_mail(db, champion_email)[0]
+    db.execute("UPDATE email_outbox SET status = 'sending' WHERE id = %s", (first["id"],))
+
+    apply(app_module, opp_id)
+
+    mail = champion_mail(db, champion_email)
+    assert len(mail) == 2
+    assert mail[0]["subject"] == first["subject"]
+    assert mail[1]["status"] == "pending"
+
+
+def test_application_after_the_window_opens_a_new_digest(app_module, db, championed_opportunity):
+    opp_id, champion_email = championed_opportunity
+    set_digest(db, champion_email, "15min")
+    apply(app_module, opp_id)
+    db.execute(
+        "UPDATE champion_digests SET window_ends_at = now() - interval '1 second' WHERE champion_email = %s",
+        (champion_email,),
+    )
+
+    apply(app_module, opp_id)
+
+    assert len(champion_mail(db, champion_email)) == 2
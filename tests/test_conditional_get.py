@@ -0,0 +1,34 @@
+from datetime import datetime, timezone
+
+from werkzeug.http import http_date
+
+EDITED = datetime(2026, 3, 1, 12, 0, 0, 800_000, tzinfo=timezone.utc)
+
+
+def test_if_modified_since_alone_is_not_trusted_when_there_is_an_etag(app_code):
+    # The client's copy was served at 12:00:00.3; an edit at 12:00:00.8
+    # falls in the same second
+    headers = {"If-Modified-Since": http_date(EDITED.replace(microsecond=0))}
+    with app_code.app.test_request_context("/", headers=headers):
+        assert app_code.not_modified("etag", EDITED) is None
+
+
+def test_if_modified_since_compares_against_the_rounded_up_time(app_code):
+    stale = {"If-Modified-Since": http_date(EDITED.replace(microsecond=0))}
+    with app_code.app.test_request_context("/", headers=stale):
+        assert app_code.not_modified(None, EDITED) is None
+
+    current = {"If-Modified-Since": "Sun, 01 Mar 2026 12:00:01 GMT"}
+    with app_code.app.test_request_context("/", headers=current):
+        assert app_code.not_modified(None, EDITED).status_code == 304
+
+
+def test_last_modified_header_is_rounded_up(app_code):
+    with app_code.app.test_request_context("/"):
+        response = app_code.with_validators(app_code.app.response_class(), "etag", EDITED)
+    assert response.headers["Last-Modified"] == "Sun, 01 Mar 2026 12:00:01 GMT"
+
+
+def test_matching_etag_is_not_modified(app_code):
+    with app_code.app.test_request_context("/", headers={"If-None-Match": 'W/"etag"'}):
+        assert app_code.not_modified("etag", EDITED).status_code == 304
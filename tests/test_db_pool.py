@@ -0,0 +1,39 @@
+import contextlib
+
+import pytest
+
+psycopg = pytest.importorskip("psycopg")
+
+
+def _terminate(db, backend_pid):
+    db.execute("SELECT pg_terminate_backend(%s)", (backend_pid,))
+
+
+def test_pool_recovers_when_backend_dies_mid_request(app_module, db):
+    flask_app = app_module.app
+    pool = app_module.get_db_pool()
+
+    # More dead backends than the pool has slots: a leak would exhaust it
+    for method in ["GET", "POST"] * pool.max_size:
+        with contextlib.suppress(psycopg.OperationalError):
+            with flask_app.test_request_context("/", method=method):
+                conn = app_module.get_db()
+                backend_pid = conn.execute("SELECT pg_backend_pid() AS pid").fetchone()["pid"]
+                _terminate(db, backend_pid)
+
+    with flask_app.test_request_context("/"):
+        conn = app_module.get_db()
+        assert conn.execute("SELECT 1 AS ok").fetchone()["ok"] == 1
+
+    assert pool.get_stats().get("pool_size", 0) <= pool.max_size
+
+
+def test_released_connection_has_default_isolation_level(app_module):
+    flask_app = app_module.app
+
+    with flask_app.test_request_context("/", method="GET"):
+        conn = app_module.get_db()
+        conn.execute("SELECT 1")
+
+    with app_module.get_db_connection() as conn:
+        assert conn.isolation_level is None
@@ -0,0 +1,79 @@
+import contextlib
+import uuid
+
+import pytest
+
+psycopg = pytest.importorskip("psycopg")
+
+
+# =====
+# Without Postgres
+# =====
+class ConflictingConnection:
+    """A connection whose claim loses a REPEATABLE READ race."""
+
+    @contextlib.contextmanager
+    def transaction(self):
+        raise psycopg.errors.SerializationFailure("could not serialize access")
+        yield
+
+
+def test_slot_lost_to_a_concurrent_request_is_not_claimed(app_code):
+    assert app_code.claim_email_slot(ConflictingConnection(), "activation", "a@example.org", 600) is False
+
+
+def test_nothing_is_queued_inside_the_window(app_code, monkeypatch):
+    monkeypatch.setattr(app_code, "get_db", lambda: None)
+    monkeypatch.setattr(app_code, "claim_email_slot", lambda *args: False)
+    monkeypatch.setattr(app_code, "enqueue_email", lambda *args: pytest.fail("queued inside the window"))
+
+    with app_code.app.test_request_context("/check"):
+        assert app_code.queue_activation_email("a@example.org") is False
+
+
+def test_activation_message_says_whether_mail_was_just_sent(app_code):
+    assert "just sent" in app_code.activation_message(True)
+    assert "a few minutes ago" in app_code.activation_message(False)
+
+
+# =====
+# Against Postgres
+# =====
+@pytest.fixture
+def recipient(db):
+    email = f"{uuid.uuid4().hex[:10]}@example.org"
+    yield email
+    db.execute("DELETE FROM email_dedupe WHERE recipient = %s", (email,))
+    db.execute("DELETE FROM email_outbox WHERE recipient = %s", (email,))
+
+
+def test_one_slot_per_window(app_module, db, recipient):
+    claim = app_module.claim_email_slot
+    assert claim(db, "activation", recipient, 600)
+    assert not claim(db, "activation", recipient, 600)
+    # Other kinds of mail have their own window
+    assert claim(db, "admin_activation", recipient, 600)
+
+    db.execute(
+        "UPDATE email_dedupe SET queued_at = now() - interval '601 seconds' WHERE recipient = %s",
+        (recipient,),
+    )
+    assert claim(db, "activation", recipient, 600)
+
+
+def test_rolled_back_claim_frees_the_slot(app_module, db, recipient):
+    with db.transaction(force_rollback=True):
+        assert app_module.claim_email_slot(db, "activation", recipient, 600)
+    assert app_module.claim_email_slot(db, "activation", recipient, 600)
+
+
+def test_repeated_checks_queue_one_activation_email(app_module, db, recipient):
+    client = app_module.app.test_client()
+    for _ in range(3):
+        assert client.get("/check", query_string={"email": recipient}).status_code == 200
+
+    queued = db.execute(
+        "SELECT COUNT(*) AS n FROM email_outbox WHERE recipient = %s AND kind = 'activation'",
+        (recipient,),
+    ).fetchone()["n"]
+    assert queued == 1
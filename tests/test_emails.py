@@ -0,0 +1,16 @@
+def test_email_urls_use_the_public_host_not_the_first_request(app_code, monkeypatch):
+    monkeypatch.setattr(app_code, "PUBLIC_BASE_URL", "https://volunteer.example.org")
+
+    # An internal health check over plain http is the first request served
+    with app_code.app.test_request_context("/healthz", base_url="http://10.0.0.5:8000"):
+        assert app_code.email_logo_url() == "https://volunteer.example.org/static/kras_logo.png"
+
+    with app_code.app.test_request_context("/", base_url="https://kras-volunteer-app.onrender.com"):
+        assert app_code.email_logo_url() == "https://volunteer.example.org/static/kras_logo.png"
+        opp = {"id": 1, "image_hash": "ab" * 32, "image_mime": "image/png"}
+        assert app_code.opportunity_email_image_url(opp).startswith("https://volunteer.example.org/images/")
+
+
+def test_email_urls_work_outside_a_request(app_code):
+    with app_code.app.app_context():
+        assert app_code.email_logo_url() == app_code.PUBLIC_BASE_URL + "/static/kras_logo.png"
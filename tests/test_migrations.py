@@ -0,0 +1,140 @@
+import io
+import os
+import uuid
+from datetime import datetime, timezone
+
+import pytest
+
+psycopg = pytest.importorskip("psycopg")
+Image = pytest.importorskip("PIL.Image")
+
+from psycopg.rows import dict_row  # noqa: E402
+
+import migrations  # noqa: E402
+
+
+def png_bytes(width: int, height: int, mode: str = "RGB") -> bytes:
+    buf = io.BytesIO()
+    Image.new(mode, (width, height)).save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def test_frozen_image_pipeline_renders_every_variant():
+    image = migrations.process_stored_image(png_bytes(2000, 1000))
+
+    # An opaque PNG is stored as JPEG, scaled to the 1600px master size
+    assert image["mime"] == "image/jpeg"
+    assert (image["width"], image["height"]) == (1600, 800)
+    assert sorted((v[0], v[1], v[3]) for v in image["variants"]) == [
+        ("card", 96, "jpg"), ("card", 96, "webp"),
+        ("card", 192, "jpg"), ("card", 192, "webp"),
+        ("detail", 480, "jpg"), ("detail", 480, "webp"),
+        ("detail", 960, "jpg"), ("detail", 960, "webp"),
+        ("email", 600, "jpg"),
+    ]
+
+
+def test_frozen_image_pipeline_keeps_transparency_as_png():
+    image = migrations.process_stored_image(png_bytes(50, 50, mode="RGBA"))
+    assert image["mime"] == "image/png"
+    assert {v[3] for v in image["variants"]} == {"png", "webp"}
+
+
+def test_frozen_image_pipeline_rejects_unreadable_data():
+    with pytest.raises(migrations.UnreadableImage):
+        migrations.process_stored_image(b"not an image")
+
+
+# =====
+# Against Postgres
+# =====
+@pytest.fixture
+def scratch_database(db):
+    """An empty database on the test server; yields its conninfo."""
+    from psycopg import errors
+    from psycopg.conninfo import conninfo_to_dict, make_conninfo
+
+    name = f"kras_migrations_{uuid.uuid4().hex[:8]}"
+    try:
+        db.execute(f"CREATE DATABASE {name} TEMPLATE template0 ENCODING 'UTF8' LOCALE 'C'")
+    except errors.InsufficientPrivilege:
+        pytest.skip("the test role may not create databases")
+
+    params = conninfo_to_dict(os.environ["TEST_DATABASE_URL"])
+    params["dbname"] = name
+    yield make_conninfo(**params)
+
+    db.execute(f"DROP DATABASE {name} WITH (FORCE)")
+
+
+def test_fresh_database_migrates_once(scratch_database):
+    latest = max(version for version, _, _ in migrations.MIGRATIONS)
+
+    assert migrations.apply_migrations(scratch_database) == list(range(1, latest + 1))
+    assert migrations.apply_migrations(scratch_database) == []
+
+
+def test_legacy_rows_survive_every_migration(scratch_database, monkeypatch):
+    all_migrations = migrations.MIGRATIONS
+    monkeypatch.setattr(migrations, "MIGRATIONS", [m for m in all_migrations if m[0] == 1])
+    migrations.apply_migrations(scratch_database)
+
+    with psycopg.connect(scratch_database, autocommit=True, row_factory=dict_row) as conn:
+        # Same title twice: the open opportunity should win the backfill
+        conn.execute("INSERT INTO opportunities (title, closed) VALUES ('Helper', TRUE), ('Helper', FALSE)")
+        open_id = conn.execute(
+            "SELECT id FROM opportunities WHERE closed IS FALSE"
+        ).fetchone()["id"]
+        app_id = conn.execute(
+            """
+            INSERT INTO applications (first_name, email, title, status, timestamp, history, notes)
+            VALUES ('Ann', 'ann@example.org', ' helper ', 'Pending', '2025-01-02 03:04',
+                    '[{"event": "Application submitted", "timestamp": "2025-01-02 03:04"},
+                      {"event": "Status changed", "timestamp": "2025-01-02 garbage"}]',
+                    'a note written as plain text')
+            RETURNING id
+            """
+        ).fetchone()["id"]
+        undated_id = conn.execute(
+            "INSERT INTO applications (first_name, timestamp) VALUES ('Bob', 'not a date') RETURNING id"
+        ).fetchone()["id"]
+        # Looks like a date but does not cast; must not abort the migration
+        malformed_ids = [
+            conn.execute(
+                "INSERT INTO applications (first_name, timestamp) VALUES ('Cy', %s) RETURNING id", (value,)
+            ).fetchone()["id"]
+            for value in ("2023-13-45", "2023-01-01 garbage", "2023-01-01 25:00")
+        ]
+        conn.execute("INSERT INTO opportunities (title, closed, closed_date) VALUES ('Old', TRUE, '2023-02-30')")
+
+    monkeypatch.setattr(migrations, "MIGRATIONS", all_migrations)
+    migrations.apply_migrations(scratch_database)
+
+    with psycopg.connect(scratch_database, row_factory=dict_row) as conn:
+        row = conn.execute(
+            "SELECT opportunity_id, timestamp FROM applications WHERE id = %s", (app_id,)
+        ).fetchone()
+        assert row["opportunity_id"] == open_id
+        assert row["timestamp"] == datetime(2025, 1, 2, 3, 4, tzinfo=timezone.utc)
+
+        undated = conn.execute(
+            "SELECT timestamp FROM applications WHERE id = %s", (undated_id,)
+        ).fetchone()
+        assert undated["timestamp"] == datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+        malformed = conn.execute(
+            "SELECT timestamp FROM applications WHERE id = ANY(%s)", (malformed_ids,)
+        ).fetchall()
+        assert [r["timestamp"] for r in malformed] == [datetime(1970, 1, 1, tzinfo=timezone.utc)] * 3
+        closed = conn.execute("SELECT closed_date FROM opportunities WHERE title = 'Old'").fetchone()
+        assert closed["closed_date"] is None
+
+        events = conn.execute(
+            "SELECT kind, body FROM application_events WHERE application_id = %s ORDER BY id",
+            (app_id,),
+        ).fetchall()
+        assert [(e["kind"], e["body"]) for e in events] == [
+            ("event", "Application submitted"),
+            ("event", "Status changed"),
+            ("note", "a note written as plain text"),
+        ]
@@ -0,0 +1,72 @@
+import os
+import re
+import uuid
+
+import pytest
+
+TEMPLATES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "templates")
+
+# Added by normalize_opportunity or the route, not selected
+DERIVED = {"desc", "frequency", "volunteers", "get"}
+
+
+def selected(columns: str) -> set[str]:
+    return {part.rsplit(" AS ", 1)[-1].strip() for part in columns.split(", ")}
+
+
+def card_fields(template: str) -> set[str]:
+    with open(os.path.join(TEMPLATES, template)) as f:
+        source = f.read()
+    fields = set(re.findall(r"\bopp\.(\w+)", source)) - DERIVED
+    if "opportunity_picture(opp" in source:
+        fields |= {"image_hash", "image_mime"}
+    return fields
+
+
+@pytest.mark.parametrize("template, columns", [
+    ("_opportunity_card.html", "OPPORTUNITY_LIST_COLUMNS"),
+    ("_manage_opportunity_card.html", "OPPORTUNITY_LIST_COLUMNS"),
+    ("_closed_opportunity_card.html", "CLOSED_OPPORTUNITY_LIST_COLUMNS"),
+])
+def test_list_columns_cover_what_the_cards_render(app_code, template, columns):
+    columns = selected(getattr(app_code, columns))
+    assert card_fields(template) <= columns
+    # opportunity_fragment's cache key
+    assert {"id", "updated_at"} <= columns
+
+
+def test_list_columns_are_narrower_than_detail(app_code):
+    detail = selected(app_code.OPPORTUNITY_DETAIL_COLUMNS)
+    assert selected(app_code.OPPORTUNITY_LIST_COLUMNS) < detail
+    assert selected(app_code.CLOSED_OPPORTUNITY_LIST_COLUMNS) < detail
+
+
+# =====
+# Against Postgres
+# =====
+def test_list_pages_render(app_module, db):
+    suffix = uuid.uuid4().hex[:8]
+    ids = [
+        db.execute(
+            # Closed just now, so it is on the first page of /closed
+            "INSERT INTO opportunities (title, closed, closed_date) "
+            "VALUES (%s, %s, CASE WHEN %s THEN now() END) RETURNING id",
+            (f"{state} {suffix}", closed, closed),
+        ).fetchone()["id"]
+        for state, closed in (("Open", False), ("Closed", True))
+    ]
+    app_module.cache.clear()
+
+    client = app_module.app.test_client()
+    with client.session_transaction() as sess:
+        sess["admin_verified"] = True
+        sess["email_verified"] = True
+        sess["verified_email"] = "admin@kraskickers.org"
+    try:
+        for path, title in (("/", "Open"), ("/manage", "Open"), ("/closed", "Closed")):
+            response = client.get(path)
+            assert response.status_code == 200, path
+            assert f"{title} {suffix}" in response.get_data(as_text=True), path
+    finally:
+        db.execute("DELETE FROM opportunities WHERE id = ANY(%s)", (ids,))
+        app_module.cache.clear()
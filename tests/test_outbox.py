@@ -0,0 +1,406 @@
+"""
+Unit tests for outbox delivery that run without Postgres or an SMTP server:
+the database steps and the SMTP pool are replaced with fakes that record
+what happened.
+"""
+import contextlib
+import smtplib
+import threading
+from contextlib import nullcontext
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("psycopg")
+pytest.importorskip("jinja2")
+pytest.importorskip("tenacity")
+
+import outbox  # noqa: E402
+from email.message import EmailMessage  # noqa: E402
+
+
+def make_message(n: int) -> bytes:
+    msg = EmailMessage()
+    msg["To"] = f"volunteer{n}@example.org"
+    msg["Subject"] = f"Message {n}"
+    msg.set_content("Hello")
+    return msg.as_bytes()
+
+
+class FakeDatabase:
+    """
+    Stands in for the email_outbox table and the connect() factory. Tracks
+    how many connections are checked out so tests can assert that none is
+    held while mail is being sent.
+    """
+
+    def __init__(self, count: int):
+        self.rows = [{"id": n, "message": make_message(n), "attempts": 1} for n in range(1, count + 1)]
+        self.open = 0
+        self.renewals = []
+        self.sent = []
+        self.failed = []
+        self.lost = set()
+        self.batch_size = outbox.BATCH_SIZE
+
+    @contextlib.contextmanager
+    def connect(self):
+        self.open += 1
+        try:
+            yield self
+        finally:
+            self.open -= 1
+
+    def install(self, monkeypatch):
+        claimed = []
+
+        def claim_batch(conn, limit=outbox.BATCH_SIZE):
+            assert conn is self and self.open == 1
+            batch = [row for row in self.rows if row["id"] not in claimed][:min(limit, self.batch_size)]
+            claimed.extend(row["id"] for row in batch)
+            return batch
+
+        def renew_lease(conn, outbox_id, attempts):
+            assert conn is self and self.open == 1
+            self.renewals.append(outbox_id)
+            return outbox_id not in self.lost
+
+        def mark_sent(conn, outbox_id):
+            assert conn is self and self.open == 1
+            self.sent.append(outbox_id)
+
+        def mark_failed(conn, outbox_id, attempts, error):
+            assert conn is self and self.open == 1
+            self.failed.append((outbox_id, error))
+
+        monkeypatch.setattr(outbox, "claim_batch", claim_batch)
+        monkeypatch.setattr(outbox, "renew_lease", renew_lease)
+        monkeypatch.setattr(outbox, "mark_sent", mark_sent)
+        monkeypatch.setattr(outbox, "mark_failed", mark_failed)
+        monkeypatch.setattr(outbox, "deliver_campaign_batch", lambda connect: 0)
+
+
+class FakeSMTPPool:
+    """Records sends; errors maps a recipient to the exception it gets."""
+
+    def __init__(self, db: FakeDatabase, errors=None):
+        self.db = db
+        self.errors = errors or {}
+        self.delivered = []
+
+    def send_many(self, messages, before_send=None):
+        results = []
+        for i, msg in enumerate(messages):
+            if before_send is not None and not before_send(i):
+                results.append(outbox.SendSkipped())
+                continue
+            assert self.db.open == 0, "a database connection is held during an SMTP send"
+            error = self.errors.get(msg["To"])
+            if error is None:
+                self.delivered.append(msg["To"])
+            results.append(error)
+        return results
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    db = FakeDatabase(5)
+    db.install(monkeypatch)
+    return db
+
+
+def test_no_connection_held_while_sending(fake_db, monkeypatch):
+    smtp = FakeSMTPPool(fake_db)
+    monkeypatch.setattr(outbox, "smtp_pool", smtp)
+
+    assert outbox.deliver_due(fake_db.connect) == 5
+    assert fake_db.sent == [1, 2, 3, 4, 5]
+    assert len(smtp.delivered) == 5
+    assert fake_db.open == 0
+
+
+def test_no_connection_held_while_retrying(fake_db, monkeypatch):
+    down = smtplib.SMTPServerDisconnected("gone")
+    smtp = FakeSMTPPool(fake_db, errors={"volunteer2@example.org": down})
+    monkeypatch.setattr(outbox, "smtp_pool", smtp)
+
+    def deliver(msg):
+        assert fake_db.open == 0, "a database connection is held during a retry"
+        raise down
+
+    monkeypatch.setattr(outbox, "deliver", deliver)
+
+    outbox.deliver_due(fake_db.connect)
+    assert fake_db.sent == [1, 3, 4, 5]
+    assert [outbox_id for outbox_id, _ in fake_db.failed] == [2]
+    assert fake_db.open == 0
+
+
+def test_stop_ends_delivery_after_the_batch_in_progress(fake_db, monkeypatch):
+    smtp = FakeSMTPPool(fake_db)
+    monkeypatch.setattr(outbox, "smtp_pool", smtp)
+    fake_db.batch_size = 2
+    stop = threading.Event()
+
+    def mark_sent(conn, outbox_id):
+        fake_db.sent.append(outbox_id)
+        stop.set()
+
+    monkeypatch.setattr(outbox, "mark_sent", mark_sent)
+
+    assert outbox.deliver_due(fake_db.connect, stop=stop) == 2
+    assert fake_db.sent == [1, 2]
+
+
+# =====
+# Leases and retries (user-019)
+# =====
+def test_lease_is_renewed_right_before_each_send(fake_db, monkeypatch):
+    smtp = FakeSMTPPool(fake_db)
+    monkeypatch.setattr(outbox, "smtp_pool", smtp)
+
+    outbox.deliver_due(fake_db.connect)
+    assert fake_db.renewals == [1, 2, 3, 4, 5]
+
+
+def test_message_whose_lease_was_lost_is_neither_sent_nor_marked(fake_db, monkeypatch):
+    smtp = FakeSMTPPool(fake_db)
+    monkeypatch.setattr(outbox, "smtp_pool", smtp)
+    fake_db.lost = {3}
+
+    outbox.deliver_due(fake_db.connect)
+    assert "volunteer3@example.org" not in smtp.delivered
+    assert fake_db.sent == [1, 2, 4, 5]
+    assert fake_db.failed == []
+
+
+def test_transient_failure_is_retried_under_a_renewed_lease(fake_db, monkeypatch):
+    busy = smtplib.SMTPResponseException(421, b"try later")
+    smtp = FakeSMTPPool(fake_db, errors={"volunteer2@example.org": busy})
+    monkeypatch.setattr(outbox, "smtp_pool", smtp)
+    retried = []
+    monkeypatch.setattr(outbox, "deliver", lambda msg: retried.append(msg["To"]))
+
+    outbox.deliver_due(fake_db.connect)
+    assert retried == ["volunteer2@example.org"]
+    assert fake_db.renewals.count(2) == 2
+    assert fake_db.sent == [1, 2, 3, 4, 5]
+
+
+def test_permanent_failure_is_not_retried(fake_db, monkeypatch):
+    rejected = smtplib.SMTPResponseException(550, b"no such user")
+    smtp = FakeSMTPPool(fake_db, errors={"volunteer2@example.org": rejected})
+    monkeypatch.setattr(outbox, "smtp_pool", smtp)
+    monkeypatch.setattr(outbox, "deliver", lambda msg: pytest.fail("retried a permanent failure"))
+
+    outbox.deliver_due(fake_db.connect)
+    assert fake_db.failed == [(2, rejected)]
+
+
+@pytest.mark.parametrize("error, transient", [
+    (smtplib.SMTPResponseException(421, b"busy"), True),
+    (smtplib.SMTPResponseException(550, b"rejected"), False),
+    (smtplib.SMTPRecipientsRefused({}), False),
+    (smtplib.SMTPAuthenticationError(535, b"bad login"), True),
+    (smtplib.SMTPServerDisconnected("gone"), True),
+    (ConnectionRefusedError(), True),
+    (ValueError("bug"), False),
+])
+def test_is_transient(error, transient):
+    assert outbox.is_transient(error) is transient
+
+
+def test_backoff_doubles_up_to_the_cap():
+    assert [outbox.backoff_seconds(n) for n in (1, 2, 3)] == [60, 120, 240]
+    assert outbox.backoff_seconds(50) == outbox.MAX_BACKOFF_SECONDS
+
+
+
+# =====
+# Campaign throttle (user-024)
+# =====
+class FakeCampaign:
+    """
+    Stands in for one sending campaign and a clock that only moves when
+    deliver_campaign_batch sleeps, so a batch's pacing can be read off
+    exactly.
+    """
+
+    def __init__(self, rate: float, count: int):
+        self.campaign = {"id": 1, "subject": "Hi", "body": "Hello", "logo_url": None, "rate": rate}
+        self.recipients = [
+            {"id": n, "email": f"volunteer{n}@example.org", "first_name": "V", "last_name": str(n), "attempts": 0}
+            for n in range(1, count + 1)
+        ]
+        self.now = 0.0
+        self.sent_at = []
+        self.slept = 0.0
+        self.released = None
+
+    def install(self, monkeypatch):
+        monkeypatch.setattr(outbox, "time", SimpleNamespace(monotonic=lambda: self.now, sleep=self.sleep))
+        monkeypatch.setattr(outbox, "claim_campaign", lambda conn, token: self.campaign)
+        monkeypatch.setattr(outbox, "renew_campaign_lease", lambda conn, campaign_id, token: True)
+        monkeypatch.setattr(outbox, "pending_recipients", self.pending_recipients)
+        monkeypatch.setattr(outbox, "finish_campaign", lambda conn, campaign_id: None)
+        monkeypatch.setattr(outbox, "_record_campaign_results", self.record)
+        monkeypatch.setattr(outbox, "release_campaign", self.release)
+        monkeypatch.setattr(outbox, "smtp_pool", SimpleNamespace(send_many=self.send_many))
+
+    def sleep(self, seconds):
+        assert seconds >= 0
+        self.slept += seconds
+        self.now += seconds
+
+    def pending_recipients(self, conn, campaign_id, limit):
+        return self.recipients[:limit]
+
+    def send_many(self, messages, before_send=None):
+        self.sent_at.extend(self.now for _ in messages)
+        return [None] * len(messages)
+
+    def record(self, conn, results):
+        done = {recipient["id"] for recipient, _ in results}
+        self.recipients = [r for r in self.recipients if r["id"] not in done]
+
+    def release(self, conn, campaign_id, token, hold_seconds=0.0):
+        self.released = hold_seconds
+
+
+def test_campaign_is_sent_at_its_rate_for_one_turn(monkeypatch):
+    campaign = FakeCampaign(rate=2, count=100)
+    campaign.install(monkeypatch)
+
+    assert outbox.deliver_campaign_batch(nullcontext) == 2 * outbox.CAMPAIGN_BATCH_SECONDS
+    assert campaign.slept <= outbox.CAMPAIGN_BATCH_SECONDS
+    assert campaign.sent_at[:4] == [0.0, 0.0, 1.0, 1.0]
+
+
+def test_slow_campaign_leaves_its_throttle_wait_on_the_lease(monkeypatch):
+    campaign = FakeCampaign(rate=0.01, count=5)
+    campaign.install(monkeypatch)
+
+    # One message, then back to the outbox instead of sleeping 100s
+    assert outbox.deliver_campaign_batch(nullcontext) == 1
+    assert campaign.slept == 0
+    assert campaign.released == pytest.approx(100)
+
+
+def test_campaign_turn_never_overruns_its_budget(monkeypatch):
+    campaign = FakeCampaign(rate=0.3, count=10)
+    campaign.install(monkeypatch)
+
+    outbox.deliver_campaign_batch(nullcontext)
+    assert campaign.slept <= outbox.CAMPAIGN_BATCH_SECONDS
+    # Sends 1/0.3s apart fit three into the turn; the next is due later
+    assert len(campaign.sent_at) == 3
+    assert campaign.now + campaign.released == pytest.approx(3 / 0.3)
+
+
+
+@pytest.mark.parametrize("stored, rate", [
+    (None, outbox.CAMPAIGN_RATE),
+    (float("nan"), outbox.CAMPAIGN_RATE),
+    (float("inf"), outbox.CAMPAIGN_RATE),
+    (0.0, outbox.CAMPAIGN_MIN_RATE),
+    (-3.0, outbox.CAMPAIGN_MIN_RATE),
+    (1e9, outbox.CAMPAIGN_MAX_RATE),
+    (2.5, 2.5),
+])
+def test_stored_campaign_rate_is_clamped(stored, rate):
+    assert outbox.campaign_rate(stored) == rate
+
+
+def test_campaign_with_an_unusable_rate_is_still_sent(monkeypatch):
+    campaign = FakeCampaign(rate=float("nan"), count=3)
+    campaign.install(monkeypatch)
+
+    assert outbox.deliver_campaign_batch(nullcontext) == 3
+
+
+# Against Postgres: the claim and lease SQL itself
+@pytest.fixture
+def outbox_rows(db):
+    """Two due messages, in an outbox otherwise emptied of due mail."""
+    db.execute("UPDATE email_outbox SET status = 'failed' WHERE status IN ('pending', 'sending')")
+    ids = [
+        db.execute(
+            "INSERT INTO email_outbox (kind, recipient, message) VALUES ('test', %s, %s) RETURNING id",
+            (f"volunteer{n}@example.org", make_message(n)),
+        ).fetchone()["id"]
+        for n in (1, 2)
+    ]
+    yield ids
+    db.execute("DELETE FROM email_outbox WHERE id = ANY(%s)", (ids,))
+
+
+def test_claim_takes_each_due_message_once(db, outbox_rows):
+    first = outbox.claim_batch(db, limit=1)
+    second = outbox.claim_batch(db, limit=5)
+    assert [r["id"] for r in first + second] == outbox_rows
+    assert outbox.claim_batch(db) == []
+
+
+def test_expired_lease_is_claimed_again_and_the_old_holder_loses_it(db, outbox_rows):
+    row = outbox.claim_batch(db, limit=1)[0]
+    assert outbox.renew_lease(db, row["id"], row["attempts"])
+
+    db.execute("UPDATE email_outbox SET locked_until = now() - interval '1 second' WHERE id = %s", (row["id"],))
+    reclaimed = outbox.claim_batch(db, limit=1)[0]
+    assert reclaimed["id"] == row["id"]
+    assert reclaimed["attempts"] == row["attempts"] + 1
+
+    # The first worker can no longer renew, send or fail it
+    assert not outbox.renew_lease(db, row["id"], row["attempts"])
+    outbox.mark_failed(db, row["id"], row["attempts"], smtplib.SMTPServerDisconnected("gone"))
+    status = db.execute("SELECT status FROM email_outbox WHERE id = %s", (row["id"],)).fetchone()["status"]
+    assert status == "sending"
+
+
+def test_transient_failure_is_queued_again_with_backoff(db, outbox_rows):
+    row = outbox.claim_batch(db, limit=1)[0]
+    outbox.mark_failed(db, row["id"], row["attempts"], smtplib.SMTPServerDisconnected("gone"))
+
+    queued = db.execute(
+        """
+        SELECT status, last_error, next_attempt_at > now() + interval '50 seconds' AS delayed
+        FROM email_outbox WHERE id = %s
+        """,
+        (row["id"],),
+    ).fetchone()
+    assert queued["status"] == "pending"
+    assert queued["delayed"]
+    assert queued["last_error"].startswith("SMTPServerDisconnected")
+
+
+def test_message_out_of_attempts_is_failed(db, outbox_rows):
+    db.execute("UPDATE email_outbox SET attempts = %s WHERE id = %s", (outbox.MAX_ATTEMPTS - 1, outbox_rows[0]))
+    row = outbox.claim_batch(db, limit=1)[0]
+    outbox.mark_failed(db, row["id"], row["attempts"], smtplib.SMTPServerDisconnected("gone"))
+    status = db.execute("SELECT status FROM email_outbox WHERE id = %s", (row["id"],)).fetchone()["status"]
+    assert status == "failed"
+
+
+@pytest.fixture
+def sending_campaign(db):
+    """The only sending campaign; yields its id."""
+    db.execute("UPDATE email_campaigns SET status = 'cancelled' WHERE status = 'sending'")
+    campaign_id = db.execute(
+        "INSERT INTO email_campaigns (subject, body, status) VALUES ('Hi', 'Hello', 'sending') RETURNING id"
+    ).fetchone()["id"]
+    yield campaign_id
+    db.execute("DELETE FROM email_campaigns WHERE id = %s", (campaign_id,))
+
+
+def test_campaign_released_with_a_hold_is_not_claimed_until_it_passes(db, sending_campaign):
+    assert outbox.claim_campaign(db, "first")["id"] == sending_campaign
+    outbox.release_campaign(db, sending_campaign, "first", hold_seconds=60)
+    assert outbox.claim_campaign(db, "second") is None
+
+    db.execute(
+        "UPDATE email_campaigns SET locked_until = now() - interval '1 second' WHERE id = %s",
+        (sending_campaign,),
+    )
+    assert outbox.claim_campaign(db, "second")["id"] == sending_campaign
+    outbox.release_campaign(db, sending_campaign, "second")
+    assert outbox.claim_campaign(db, "third")["id"] == sending_campaign
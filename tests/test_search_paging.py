@@ -0,0 +1,65 @@
+import uuid
+
+import pytest
+
+
+@pytest.fixture
+def search_rows(db):
+    """Applications matching a unique word with tied and non-integral ranks."""
+    word = "zq" + uuid.uuid4().hex[:8]
+    rows = [
+        # Identical name matches: tied ranks
+        (word, "Alpha", None),
+        (word, "Alpha", None),
+        (word, "Alpha", None),
+        # Name plus comment match: higher, non-integral rank
+        (word, "Beta", f"{word} {word}"),
+        (word, "Beta", f"{word} {word}"),
+        # Comment-only matches: low ranks
+        ("Gamma", "Delta", word),
+        ("Gamma", "Delta", f"about {word} and more"),
+    ]
+    ids = []
+    for first_name, last_name, comments in rows:
+        cur = db.execute(
+            """
+            INSERT INTO applications (first_name, last_name, email, comments, status)
+            VALUES (%s, %s, %s, %s, 'Pending')
+            RETURNING id
+            """,
+            (first_name, last_name, f"{uuid.uuid4().hex[:10]}@example.org", comments),
+        )
+        ids.append(cur.fetchone()["id"])
+
+    yield word, ids
+
+    db.execute("DELETE FROM applications WHERE id = ANY(%s)", (ids,))
+
+
+def test_search_pages_cover_every_match_once(app_module, search_rows):
+    word, ids = search_rows
+    client = app_module.app.test_client()
+    with client.session_transaction() as sess:
+        sess["admin_verified"] = True
+
+    seen = []
+    ranks = []
+    cursor = None
+    for _ in range(len(ids) + 1):
+        query = {"q": word, "limit": 2}
+        if cursor:
+            query["cursor"] = cursor
+        response = client.get("/api/search", query_string=query)
+        assert response.status_code == 200
+        data = response.get_json()
+        seen.extend(r["id"] for r in data["results"])
+        ranks.extend(r["rank"] for r in data["results"])
+        cursor = data["next_cursor"]
+        if not cursor:
+            break
+
+    assert sorted(seen) == sorted(ids)
+    assert len(seen) == len(set(seen))
+    assert ranks == sorted(ranks, reverse=True)
+    assert any(rank != int(rank) for rank in ranks)
+    assert len(set(ranks)) < len(ranks)
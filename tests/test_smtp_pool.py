@@ -0,0 +1,131 @@
+import smtplib
+from email.message import EmailMessage
+
+import pytest
+
+pytest.importorskip("psycopg")
+pytest.importorskip("jinja2")
+pytest.importorskip("tenacity")
+
+import outbox  # noqa: E402
+
+
+class FakeServer:
+    """An smtplib.SMTP stand-in; fail maps a recipient to what sending raises."""
+
+    def __init__(self, fail=None):
+        self.fail = fail or {}
+        self.sent = []
+        self.closed = False
+        self.quit_called = False
+        self.noop_code = 250
+
+    def send_message(self, msg):
+        error = self.fail.pop(msg["To"], None)
+        if error is not None:
+            raise error
+        self.sent.append(msg["To"])
+
+    def noop(self):
+        return (self.noop_code, b"OK")
+
+    def quit(self):
+        self.quit_called = True
+        self.closed = True
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    pool = outbox.SMTPConnectionPool(max_connections=1, max_idle=60, max_messages=3)
+    pool.opened = []
+    pool.fail = {}
+
+    def open_session():
+        server = FakeServer(pool.fail)
+        pool.opened.append(server)
+        return outbox._Session(server)
+
+    monkeypatch.setattr(pool, "_open", open_session)
+    return pool
+
+
+def messages(*numbers):
+    result = []
+    for n in numbers:
+        msg = EmailMessage()
+        msg["To"] = f"volunteer{n}@example.org"
+        msg.set_content("Hello")
+        result.append(msg)
+    return result
+
+
+def test_connection_is_reused_between_batches(pool):
+    assert pool.send_many(messages(1)) == [None]
+    assert pool.send_many(messages(2)) == [None]
+    assert len(pool.opened) == 1
+    assert pool.opened[0].sent == ["volunteer1@example.org", "volunteer2@example.org"]
+
+
+def test_connection_is_retired_after_max_messages(pool):
+    assert pool.send_many(messages(1, 2, 3, 4)) == [None] * 4
+    assert len(pool.opened) == 2
+    assert pool.opened[0].quit_called
+    assert pool.opened[1].sent == ["volunteer4@example.org"]
+
+
+def test_dropped_connection_is_replaced_and_the_message_retried_once(pool):
+    pool.fail["volunteer2@example.org"] = smtplib.SMTPServerDisconnected("gone")
+    assert pool.send_many(messages(1, 2, 3)) == [None] * 3
+    assert len(pool.opened) == 2
+    assert pool.opened[1].sent == ["volunteer2@example.org", "volunteer3@example.org"]
+
+
+def test_rejected_message_keeps_the_connection(pool):
+    refused = smtplib.SMTPRecipientsRefused({"volunteer2@example.org": (550, b"no such user")})
+    pool.fail["volunteer2@example.org"] = refused
+    assert pool.send_many(messages(1, 2, 3)) == [None, refused, None]
+    assert len(pool.opened) == 1
+
+
+def test_before_send_can_skip_a_message(pool):
+    results = pool.send_many(messages(1, 2), before_send=lambda i: i != 0)
+    assert isinstance(results[0], outbox.SendSkipped)
+    assert results[1] is None
+    assert pool.opened[0].sent == ["volunteer2@example.org"]
+
+
+def test_idle_connection_is_closed_and_replaced(pool):
+    pool.send_many(messages(1))
+    pool._idle[0].last_used -= pool.max_idle + 1
+    pool.send_many(messages(2))
+    assert len(pool.opened) == 2
+    assert pool.opened[0].closed
+
+
+def test_unhealthy_connection_fails_noop_and_is_replaced(pool):
+    pool.send_many(messages(1))
+    pool._idle[0].last_used -= outbox.SMTP_NOOP_AFTER_SECONDS + 1
+    pool.opened[0].noop_code = 421
+    pool.send_many(messages(2))
+    assert len(pool.opened) == 2
+    assert pool.opened[1].sent == ["volunteer2@example.org"]
+
+
+def test_connections_inherited_through_fork_are_not_reused(pool):
+    pool.send_many(messages(1))
+    pool._pid = -1  # as if this process were a fork of the one that opened it
+    pool.send_many(messages(2))
+    assert len(pool.opened) == 2
+
+
+def test_unreachable_server_fails_the_whole_batch(pool, monkeypatch):
+    down = ConnectionRefusedError()
+
+    def refuse():
+        raise down
+
+    monkeypatch.setattr(pool, "_open", refuse)
+    assert pool.send_many(messages(1, 2)) == [down, down]
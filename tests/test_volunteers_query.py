@@ -0,0 +1,40 @@
+import pytest
+from werkzeug.datastructures import MultiDict
+
+
+class CapturingCursor:
+    """Records the query query_volunteers would run instead of running it."""
+
+    def execute(self, sql, params):
+        self.sql = sql
+        self.params = params
+
+    def fetchall(self):
+        return []
+
+
+def plan_for(app_module, db, disable=("seqscan", "sort"), **args):
+    cur = CapturingCursor()
+    app_module.query_volunteers(cur, MultiDict(args))
+    with db.transaction():
+        # Any sequential scan or sort left in the plan is one no index covers
+        for setting in disable:
+            db.execute(f"SET LOCAL enable_{setting} = off")
+        rows = db.execute("EXPLAIN " + cur.sql, cur.params).fetchall()
+    return "\n".join(row["QUERY PLAN"] for row in rows)
+
+
+@pytest.mark.parametrize("sort", ["date", "name", "email", "phone", "contact", "opportunity", "status"])
+@pytest.mark.parametrize("direction", ["asc", "desc"])
+def test_every_sort_reads_from_an_index(app_module, db, sort, direction):
+    plan = plan_for(app_module, db, sort=sort, dir=direction)
+    assert "Sort" not in plan, plan
+    assert "Seq Scan" not in plan, plan
+
+
+def test_global_search_uses_trigram_indexes(app_module, db):
+    # Without plain index scans the filter must be answered by a bitmap
+    # of every column's trigram index, or fall back to a sequential scan
+    plan = plan_for(app_module, db, disable=("seqscan", "indexscan"), q="pending")
+    assert "Seq Scan" not in plan, plan
+    assert "BitmapOr" in plan, plan